@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from wechatter.database.engine_profile import create_sqlite_engine
+
+
+class TestEngineProfile(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "test.sqlite")
+
+    def _pragma(self, engine, name: str):
+        with engine.connect() as conn:
+            return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+    def test_default_pragmas_are_applied(self):
+        engine = create_sqlite_engine(self.path)
+        self.addCleanup(engine.dispose)
+        self.assertEqual(self._pragma(engine, "journal_mode"), "wal")
+        # NORMAL = 1
+        self.assertEqual(self._pragma(engine, "synchronous"), 1)
+        self.assertEqual(self._pragma(engine, "busy_timeout"), 5000)
+        # MEMORY = 2
+        self.assertEqual(self._pragma(engine, "temp_store"), 2)
+
+    def test_pragmas_can_be_overridden_or_skipped(self):
+        engine = create_sqlite_engine(
+            self.path, pragmas={"busy_timeout": 1000, "journal_mode": None}
+        )
+        self.addCleanup(engine.dispose)
+        self.assertEqual(self._pragma(engine, "busy_timeout"), 1000)
+        self.assertEqual(self._pragma(engine, "journal_mode"), "delete")
+
+    def test_pool_settings(self):
+        engine = create_sqlite_engine(self.path, pool={"pool_size": 3})
+        self.addCleanup(engine.dispose)
+        self.assertEqual(engine.pool.size(), 3)
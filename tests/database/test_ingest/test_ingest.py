@@ -0,0 +1,171 @@
+import unittest
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from wechatter.database import (
+    Group as DbGroup,
+    Message as DbMessage,
+    Person as DbPerson,
+)
+from wechatter.database.ingest import _ingest_rows, _write_ingest
+from wechatter.database.tables import Base
+from wechatter.database.tables.person_group_relation import PersonGroupRelation
+from wechatter.models.wechat import (
+    Gender,
+    Group,
+    GroupMember,
+    Message,
+    MessageType,
+    Person,
+)
+from wechatter.utils import IdentityCache
+
+
+def _person(id: str, name: str) -> Person:
+    return Person(
+        id=id, name=name, alias="", gender=Gender.male, is_star=False, is_friend=True
+    )
+
+
+def _group(id: str, name: str, members=()) -> Group:
+    return Group(
+        id=id,
+        name=name,
+        member_list=[GroupMember(id=m, name=m, alias="") for m in members],
+    )
+
+
+def _message(
+    id: int, person: Person, group: Group = None, content: str = "hi"
+) -> Message:
+    return Message(
+        id=id, type=MessageType.text, person=person, group=group, content=content
+    )
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+
+    def _write(self, *messages: Message):
+        with self.session_factory() as session:
+            _write_ingest(session, [_ingest_rows(message) for message in messages])
+            session.commit()
+
+    def test_batch_upserts_persons_groups_and_messages(self):
+        alice = _person("p1", "alice")
+        group = _group("g1", "team", members=["p1", "p2"])
+        self._write(
+            _message(1, alice, group), _message(2, _person("p1", "alice2"), group)
+        )
+        self._write(_message(3, _person("p1", "alice3")))
+
+        with self.session_factory() as session:
+            persons = {p.id: p.name for p in session.scalars(select(DbPerson))}
+            self.assertEqual(persons, {"p1": "alice3", "p2": "p2"})
+            self.assertEqual(session.scalars(select(DbGroup.name)).all(), ["team"])
+            messages = session.scalars(select(DbMessage).order_by(DbMessage.id)).all()
+            self.assertEqual([m.id for m in messages], [1, 2, 3])
+            self.assertEqual([m.group_id for m in messages], ["g1", "g1", None])
+
+    def _relations(self):
+        with self.session_factory() as session:
+            return sorted(
+                session.execute(
+                    select(PersonGroupRelation.group_id, PersonGroupRelation.person_id)
+                ).all()
+            )
+
+    def test_members_and_relations_are_synced(self):
+        self._write(
+            _message(1, _person("p1", "alice"), _group("g1", "team", ["p2", "p3"]))
+        )
+        self.assertEqual(self._relations(), [("g1", "p2"), ("g1", "p3")])
+
+        statements = []
+        engine = self.session_factory.kw["bind"]
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        self.addCleanup(event.remove, engine, "before_cursor_execute", listener)
+        # p2 改名，p3 退群，p4 入群
+        group = Group(
+            id="g1",
+            name="team2",
+            member_list=[
+                GroupMember(id="p2", name="bob", alias=""),
+                GroupMember(id="p4", name="p4", alias=""),
+            ],
+        )
+        self._write(_message(2, _person("p1", "alice"), group))
+
+        self.assertEqual(self._relations(), [("g1", "p2"), ("g1", "p4")])
+        with self.session_factory() as session:
+            persons = {p.id: p.name for p in session.scalars(select(DbPerson))}
+            self.assertEqual(
+                persons, {"p1": "alice", "p2": "bob", "p3": "p3", "p4": "p4"}
+            )
+            self.assertEqual(session.scalars(select(DbGroup.name)).all(), ["team2"])
+        # 变化的成员在一条语句中写入，另一条为消息发送者
+        person_upserts = [s for s in statements if s.startswith("INSERT INTO person (")]
+        self.assertEqual(len(person_upserts), 2)
+
+    def test_groups_without_member_list_keep_relations(self):
+        self._write(_message(1, _person("p1", "alice"), _group("g1", "team", ["p2"])))
+        self._write(_message(2, _person("p1", "alice"), _group("g1", "team")))
+        self.assertEqual(self._relations(), [("g1", "p2")])
+
+    def test_message_ids_are_assigned_by_database(self):
+        alice = _person("p1", "alice")
+        first, second = _message(None, alice), _message(None, alice, content="again")
+        self._write(first, second)
+        self.assertEqual([first.id, second.id], [1, 2])
+        # 另一个进程写入的消息
+        with self.session_factory() as session:
+            session.add(DbMessage(person_id="p1", type="text", content="other"))
+            session.commit()
+        third = _message(None, alice)
+        self._write(third)
+        self.assertEqual(third.id, 4)
+        with self.session_factory() as session:
+            contents = session.scalars(select(DbMessage.content).order_by(DbMessage.id))
+            self.assertEqual(contents.all(), ["hi", "again", "other", "hi"])
+
+    def test_unchanged_identities_are_skipped(self):
+        person_cache, group_cache = IdentityCache(), IdentityCache()
+        member_cache = IdentityCache()
+        alice = _person("p1", "alice")
+        group = _group("g1", "team", members=["p1", "p2"])
+
+        first = _ingest_rows(
+            _message(1, alice, group), person_cache, group_cache, member_cache
+        )
+        self.assertIsNotNone(first.person)
+        self.assertEqual(len(first.members), 2)
+        second = _ingest_rows(
+            _message(2, alice, group), person_cache, group_cache, member_cache
+        )
+        self.assertIsNone(second.person)
+        self.assertIsNone(second.group)
+        self.assertIsNone(second.members)
+        renamed = _ingest_rows(
+            _message(3, _person("p1", "alice2"), group),
+            person_cache,
+            group_cache,
+            member_cache,
+        )
+        self.assertEqual(renamed.person["name"], "alice2")
+        self.assertEqual(person_cache.hit_count, 1)
+
+        with self.session_factory() as session:
+            _write_ingest(session, [first, second, renamed])
+            session.commit()
+            self.assertEqual(session.get(DbPerson, "p1").name, "alice2")
+            self.assertEqual(len(session.scalars(select(DbMessage)).all()), 3)
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect, text
+
+from wechatter.database.migrations import (
+    MIGRATIONS,
+    Migration,
+    get_schema_version,
+    run_migrations,
+)
+from wechatter.database.tables import Base
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(directory.name, 'test.sqlite')}"
+        )
+        self.addCleanup(self.engine.dispose)
+
+    def _index_names(self, table: str) -> set:
+        return {index["name"] for index in inspect(self.engine).get_indexes(table)}
+
+    def test_indexes_are_added_to_existing_tables(self):
+        Base.metadata.create_all(self.engine)
+        # 模拟添加索引之前创建的数据库
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_message_msg_id"))
+            conn.execute(
+                text("DROP INDEX ix_gpt_chat_info_person_id_model_is_chatting")
+            )
+        self.assertNotIn("ix_message_msg_id", self._index_names("message"))
+
+        self.assertEqual(run_migrations(self.engine), len(MIGRATIONS))
+        self.assertEqual(get_schema_version(self.engine), MIGRATIONS[-1].version)
+        self.assertIn("ix_message_msg_id", self._index_names("message"))
+        self.assertIn(
+            "ix_gpt_chat_info_person_id_model_is_chatting",
+            self._index_names("gpt_chat_info"),
+        )
+        # 已执行的迁移不会重复执行
+        self.assertEqual(run_migrations(self.engine), 0)
+
+    def test_outbox_priority_column_is_added(self):
+        Base.metadata.create_all(self.engine)
+        # 模拟发件箱保存优先级之前创建的数据库
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO qq_outbox (id, channel, target, content, is_image, "
+                    "retry_count, state) VALUES ('1', 'group', 'g1', 'hi', 0, 0, 'pending')"
+                )
+            )
+            conn.execute(text("ALTER TABLE qq_outbox DROP COLUMN priority"))
+        run_migrations(self.engine)
+        with self.engine.connect() as conn:
+            priority = conn.execute(text("SELECT priority FROM qq_outbox")).scalar()
+        self.assertEqual(priority, "interactive")
+
+    def test_migrations_run_in_version_order(self):
+        migrations = [
+            Migration(2, "add column", ["ALTER TABLE t ADD COLUMN b INTEGER"]),
+            Migration(1, "create table", ["CREATE TABLE t (a INTEGER)"]),
+        ]
+        self.assertEqual(run_migrations(self.engine, migrations), 2)
+        self.assertEqual(get_schema_version(self.engine), 2)
+        columns = [column["name"] for column in inspect(self.engine).get_columns("t")]
+        self.assertEqual(columns, ["a", "b"])
+
+    def test_failed_migration_keeps_version(self):
+        migrations = [
+            Migration(1, "create table", ["CREATE TABLE t (a INTEGER)"]),
+            Migration(2, "broken", ["ALTER TABLE missing ADD COLUMN b INTEGER"]),
+        ]
+        with self.assertRaises(Exception):
+            run_migrations(self.engine, migrations)
+        self.assertEqual(get_schema_version(self.engine), 1)
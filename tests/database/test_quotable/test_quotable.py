@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from wechatter.database import QuotableSequence, QuotedResponse as DbQuotedResponse
+from wechatter.database.quotable import (
+    ID_SPACE,
+    QuotableIdAllocator,
+    decode_quotable_id,
+    encode_quotable_id,
+)
+from wechatter.database.tables import Base
+
+
+class TestQuotableIdAllocator(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+
+    def _add_responses(self, quotable_ids):
+        with self.session_factory() as session:
+            session.add_all(
+                DbQuotedResponse(
+                    quotable_id=quotable_id, command="weather", response=""
+                )
+                for quotable_id in quotable_ids
+            )
+            session.commit()
+
+    def _high_water(self) -> int:
+        with self.session_factory() as session:
+            return session.get(QuotableSequence, 1).next_value
+
+    def test_encode_wraps_around(self):
+        self.assertEqual(encode_quotable_id(0), "000")
+        self.assertEqual(encode_quotable_id(61), "00Z")
+        self.assertEqual(encode_quotable_id(62), "010")
+        self.assertEqual(encode_quotable_id(ID_SPACE - 1), "ZZZ")
+        self.assertEqual(encode_quotable_id(ID_SPACE), "000")
+        self.assertEqual(decode_quotable_id("ZZZ"), ID_SPACE - 1)
+        self.assertIsNone(decode_quotable_id("a-b"))
+
+    def test_reserves_blocks_and_persists_high_water_mark(self):
+        allocator = QuotableIdAllocator(self.session_factory, block_size=10)
+        self.assertEqual(
+            [allocator.allocate() for _ in range(3)], ["000", "001", "002"]
+        )
+        self.assertEqual(self._high_water(), 10)
+
+        # 重启后从未预留的序号开始，不会分配上一个进程预留过的 id
+        restarted = QuotableIdAllocator(self.session_factory, block_size=10)
+        self.assertEqual(restarted.allocate(), "00a")
+        self.assertEqual(self._high_water(), 20)
+
+    def test_continues_after_existing_responses(self):
+        self._add_responses(["00A", "00B"])
+        allocator = QuotableIdAllocator(self.session_factory, block_size=10)
+        self.assertEqual(allocator.allocate(), "00C")
+
+    def test_concurrent_allocations_are_unique(self):
+        # 两个分配器模拟两个进程，各自使用独立的数据库连接
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory.name, 'test.sqlite')}"
+        )
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        allocators = [
+            QuotableIdAllocator(sessionmaker(engine), block_size=7) for _ in range(2)
+        ]
+        results = [[] for _ in range(8)]
+
+        def allocate(index):
+            for _ in range(50):
+                results[index].append(allocators[index % 2].allocate())
+
+        threads = [threading.Thread(target=allocate, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ids = [quotable_id for result in results for quotable_id in result]
+        self.assertEqual(len(ids), 400)
+        self.assertEqual(len(set(ids)), 400)
+
+    def test_wraparound_skips_live_ids(self):
+        # 最后一条是 ZZY，回绕后 000、001 仍在最近的 live_count 条中
+        self._add_responses(["000", "001", "ZZY"])
+        allocator = QuotableIdAllocator(
+            self.session_factory, block_size=4, live_count=3
+        )
+        self.assertEqual(
+            [allocator.allocate() for _ in range(3)], ["ZZZ", "002", "003"]
+        )
+        self.assertEqual(allocator.skipped_count, 2)
+
+        # 不再是最近的 live_count 条后可以再次使用
+        self._add_responses(["x01", "x02", "x03"])
+        allocator = QuotableIdAllocator(
+            self.session_factory, block_size=2, live_count=3
+        )
+        with self.session_factory() as session:
+            session.get(QuotableSequence, 1).next_value = ID_SPACE * 2
+            session.commit()
+        self.assertEqual(allocator.allocate(), "000")
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from wechatter.database import GptChatMessage, Group, Message
+from wechatter.database.engine_profile import create_sqlite_engine
+from wechatter.database.retention import Retention, iter_archive, parse_policies
+from wechatter.database.tables import Base
+
+
+class TestRetention(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive_dir = os.path.join(directory.name, "archive")
+        engine = create_sqlite_engine(os.path.join(directory.name, "test.sqlite"))
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+
+        now = datetime.utcnow()
+        rows = [
+            # id, group_id, 天数
+            (1, None, 40),
+            (2, "g1", 40),
+            (3, "g2", 40),
+            (4, "g2", 10),
+            (5, None, 5),
+            (6, None, 40),
+        ]
+        with self.session_factory() as session:
+            session.execute(insert(Group), [{"id": "g2", "name": "team"}])
+            session.execute(
+                insert(Message),
+                [
+                    {
+                        "id": id,
+                        "person_id": "p1",
+                        "group_id": group_id,
+                        "type": "text",
+                        "content": f"message {id}",
+                        "created_time": now - timedelta(days=days),
+                    }
+                    for id, group_id, days in rows
+                ],
+            )
+            # GPT 对话引用的消息
+            session.execute(
+                insert(GptChatMessage),
+                [{"message_id": 6, "gpt_chat_id": 1, "gpt_response": "hi"}],
+            )
+            session.commit()
+
+    def _retention(self, policies) -> Retention:
+        return Retention(
+            parse_policies(policies),
+            self.archive_dir,
+            session_factory=self.session_factory,
+            batch_size=2,
+            batch_pause=0,
+        )
+
+    def test_archive_expired_messages(self):
+        retention = self._retention(
+            {"message": {"days": 30, "group_days": {"g1": 0, "team": 7}}}
+        )
+        self.assertEqual(retention.run(), {"message": 3})
+
+        with self.session_factory() as session:
+            remaining = session.scalars(select(Message.id).order_by(Message.id)).all()
+        # g1 永久保留，team（g2）保留 7 天，GPT 对话引用的消息不归档
+        self.assertEqual(remaining, [2, 5, 6])
+
+        archived = []
+        message_dir = os.path.join(self.archive_dir, "message")
+        for name in sorted(os.listdir(message_dir)):
+            self.assertTrue(name.endswith(".jsonl.gz"))
+            archived.extend(iter_archive(os.path.join(message_dir, name)))
+        self.assertEqual(sorted(row["id"] for row in archived), [1, 3, 4])
+        self.assertEqual(archived[0]["content"], f"message {archived[0]['id']}")
+        self.assertEqual(archived[0]["type"], "text")
+
+        # 已归档的数据不会重复归档
+        self.assertEqual(retention.run(), {})
+
+    def test_incremental_vacuum(self):
+        with self.session_factory() as session:
+            session.execute(
+                insert(Message),
+                [
+                    {
+                        "id": 100 + i,
+                        "person_id": "p1",
+                        "type": "text",
+                        "content": "x" * 2000,
+                        "created_time": datetime(2000, 1, 1),
+                    }
+                    for i in range(200)
+                ],
+            )
+            session.commit()
+        retention = self._retention({"message": {"days": 3650}})
+        retention.batch_size = 500
+        self.assertEqual(retention.run(), {"message": 200})
+        with self.session_factory() as session:
+            self.assertEqual(session.execute(text("PRAGMA freelist_count")).scalar(), 0)
+        self.assertEqual(
+            os.listdir(os.path.join(self.archive_dir, "message")), ["2000-01.jsonl.gz"]
+        )
+
+    def test_unknown_table(self):
+        with self.assertRaises(ValueError):
+            parse_policies({"person": {"days": 1}})
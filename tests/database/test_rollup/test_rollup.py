@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from wechatter.database import ActivityDaily, ActivityHourly
+from wechatter.database.rollup import (
+    add_hourly_counts,
+    compact_hourly,
+    count_activity,
+    top_activity,
+)
+from wechatter.database.tables import Base
+
+
+class TestRollup(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+
+    def _add(self, time: datetime, delta):
+        with self.session_factory() as session:
+            add_hourly_counts(session, time, delta)
+            session.commit()
+
+    def test_counts_accumulate_per_hour(self):
+        self._add(
+            datetime(2024, 5, 1, 10, 5),
+            {("g1", "p1", "weather"): 2, ("g1", "p1", ""): 1},
+        )
+        self._add(datetime(2024, 5, 1, 10, 55), {("g1", "p1", "weather"): 3})
+        self._add(datetime(2024, 5, 1, 11, 0), {("g1", "p1", "weather"): 1})
+
+        with self.session_factory() as session:
+            rows = session.execute(
+                select(
+                    ActivityHourly.bucket_hour,
+                    ActivityHourly.command,
+                    ActivityHourly.message_count,
+                ).order_by(ActivityHourly.bucket_hour, ActivityHourly.command)
+            ).all()
+        self.assertEqual(
+            rows,
+            [
+                (datetime(2024, 5, 1, 10), "", 1),
+                (datetime(2024, 5, 1, 10), "weather", 5),
+                (datetime(2024, 5, 1, 11), "weather", 1),
+            ],
+        )
+
+    def test_compact_and_query(self):
+        self._add(
+            datetime(2024, 5, 1, 10), {("g1", "p1", "weather"): 2, ("", "p2", ""): 4}
+        )
+        self._add(
+            datetime(2024, 5, 1, 20),
+            {("g1", "p1", "weather"): 1, ("g1", "p2", "gpt"): 1},
+        )
+        self._add(
+            datetime(2024, 5, 3, 9), {("g1", "p2", "gpt"): 3, ("g2", "p1", ""): 1}
+        )
+
+        with self.session_factory() as session:
+            self.assertEqual(compact_hourly(session, datetime(2024, 5, 2, 12)), 4)
+            session.commit()
+            self.assertEqual(
+                session.scalar(select(func.count()).select_from(ActivityHourly)), 2
+            )
+            daily = session.execute(
+                select(
+                    ActivityDaily.person_id,
+                    ActivityDaily.command,
+                    ActivityDaily.message_count,
+                )
+                .where(ActivityDaily.bucket_day == datetime(2024, 5, 1))
+                .order_by(ActivityDaily.person_id, ActivityDaily.command)
+            ).all()
+            self.assertEqual(
+                daily, [("p1", "weather", 3), ("p2", "", 4), ("p2", "gpt", 1)]
+            )
+
+            since = datetime(2024, 5, 1, 15)
+            # 已合并的日期按天统计
+            self.assertEqual(count_activity(session, since), (12, 7))
+            self.assertEqual(count_activity(session, since, group_id="g1"), (7, 7))
+            self.assertEqual(count_activity(session, since, person_id="p1"), (4, 3))
+            self.assertEqual(
+                top_activity(session, "command", since),
+                [("gpt", 4), ("weather", 3)],
+            )
+            self.assertEqual(
+                top_activity(session, "person_id", since, group_id="g1", limit=1),
+                [("p2", 4)],
+            )
+            self.assertEqual(
+                top_activity(session, "group_id", since), [("g1", 7), ("g2", 1)]
+            )
+            # 未合并的部分按小时统计
+            self.assertEqual(count_activity(session, datetime(2024, 5, 3, 10)), (0, 0))
+            with self.assertRaises(ValueError):
+                top_activity(session, "content", since)
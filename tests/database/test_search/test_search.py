@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, delete, insert, inspect, update
+from sqlalchemy.orm import sessionmaker
+
+from wechatter.database import Message
+from wechatter.database.migrations import MIGRATIONS, run_migrations
+from wechatter.database.search import search_messages
+from wechatter.database.tables import Base
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory.name, 'test.sqlite')}"
+        )
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+        # 迁移前已有的消息由迁移建立索引
+        self._insert((1, "p1", "g1", "明天广州的天气预报说会下雨"))
+        run_migrations(engine)
+        self._insert(
+            (2, "p2", "g1", "天气预报不准，天气预报经常不准"),
+            (3, "p1", "g2", "另一个群的天气预报"),
+            (4, "p1", None, "私聊：天气预报"),
+            (5, "p2", "g1", "/ss 天气预报"),
+            (6, "p2", "g1", "今天吃什么"),
+            (7, "bot", "g1", "天气预报：晴"),
+        )
+
+    def _insert(self, *rows):
+        with self.session_factory() as session:
+            session.execute(
+                insert(Message),
+                [
+                    {
+                        "id": id,
+                        "person_id": person_id,
+                        "group_id": group_id,
+                        "type": "text",
+                        "content": content,
+                    }
+                    for id, person_id, group_id, content in rows
+                ],
+            )
+            session.commit()
+
+    def _search(self, keywords, **kwargs):
+        with self.session_factory() as session:
+            return search_messages(session, keywords, **kwargs)
+
+    def test_search_ranks_and_highlights(self):
+        result = self._search(
+            "天气预报", group_id="g1", exclude_prefix="/", exclude_person_id="bot"
+        )
+        # 关键词出现次数多的排在前面
+        self.assertEqual([hit.message_id for hit in result.hits], [2, 1])
+        self.assertIn("【天气预报】", result.hits[0].snippet)
+        self.assertFalse(result.has_more)
+
+    def test_scope_by_person(self):
+        result = self._search("天气预报", person_id="p1")
+        self.assertEqual(sorted(hit.message_id for hit in result.hits), [1, 3, 4])
+
+    def test_pagination(self):
+        first = self._search("天气预报", page_size=2)
+        second = self._search("天气预报", page=2, page_size=2)
+        third = self._search("天气预报", page=3, page_size=2)
+        self.assertTrue(first.has_more)
+        ids = [hit.message_id for page in (first, second, third) for hit in page.hits]
+        self.assertEqual(sorted(ids), [1, 2, 3, 4, 5, 7])
+        self.assertFalse(third.has_more)
+
+    def test_short_keywords(self):
+        # 少于 3 个字的关键词逐条匹配
+        result = self._search("天气", group_id="g1", exclude_person_id="bot")
+        self.assertEqual([hit.message_id for hit in result.hits], [5, 2, 1])
+        self.assertIn("【天气】", result.hits[0].snippet)
+        # 与 3 个字及以上的关键词组合时先用全文索引过滤
+        result = self._search("天气预报 广州")
+        self.assertEqual([hit.message_id for hit in result.hits], [1])
+        self.assertEqual(self._search("吃").hits[0].message_id, 6)
+
+    def test_short_keywords_ignore_case(self):
+        # LIKE 不区分 ASCII 字母的大小写，摘要高亮消息中的原文
+        self._insert((8, "p3", "g3", "Hi there"))
+        result = self._search("hi", group_id="g3")
+        self.assertEqual([hit.message_id for hit in result.hits], [8])
+        self.assertEqual(result.hits[0].snippet, "【Hi】 there")
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.session_factory() as session:
+            session.execute(
+                update(Message).where(Message.id == 6).values(content="今天的天气预报")
+            )
+            session.execute(delete(Message).where(Message.id == 2))
+            session.commit()
+        result = self._search(
+            "天气预报", group_id="g1", exclude_prefix="/", exclude_person_id="bot"
+        )
+        self.assertEqual(sorted(hit.message_id for hit in result.hits), [1, 6])
+        self.assertEqual(self._search("今天吃什么").hits, [])
+
+    def test_without_fts_falls_back_to_like(self):
+        # SQLite 不支持 trigram 分词时跳过全文索引的迁移
+        engine = create_engine("sqlite://")
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+        self._insert((1, "p1", "g1", "天气预报说会下雨"), (2, "p1", "g1", "今天吃什么"))
+        unsupported = [m._replace(supported=lambda conn: False) for m in MIGRATIONS]
+        self.assertEqual(run_migrations(engine, unsupported), len(MIGRATIONS))
+        self.assertFalse(inspect(engine).has_table("message_fts"))
+
+        result = self._search("天气预报 下雨", group_id="g1")
+        self.assertEqual([hit.message_id for hit in result.hits], [1])
+        self.assertIn("【天气预报】", result.hits[0].snippet)
+
+    def test_query_syntax_is_escaped(self):
+        self._insert((8, "p3", None, 'say "hello-world" OR *'))
+        self.assertEqual(self._search('"hello-world"').hits[0].message_id, 8)
+        self.assertEqual(self._search("OR *").hits[0].message_id, 8)
+        self.assertEqual(self._search("100%").hits, [])
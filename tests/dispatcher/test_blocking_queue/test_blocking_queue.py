@@ -0,0 +1,37 @@
+import unittest
+
+from wechatter.dispatcher import BlockingQueues
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+
+class TestBlockingQueues(unittest.TestCase):
+    def setUp(self):
+        self.queues = BlockingQueues()
+
+    def _push(self, target, content, channel=QQChannel.group):
+        self.queues.push(
+            OutboundMessage(channel=channel, target=target, content=content)
+        )
+
+    def test_pop_only_releases_target(self):
+        self._push("A", "a1")
+        self._push("B", "b1")
+        self._push("A", "a2")
+        self._push("A", "a3")
+        released = self.queues.pop(QQChannel.group, "A", 2)
+        self.assertListEqual([m.content for m in released], ["a1", "a2"])
+        self.assertEqual(self.queues.count(), 2)
+        self.assertListEqual(self.queues.pop(QQChannel.group, "C", 5), [])
+        self.assertListEqual(self.queues.pop(QQChannel.c2c, "B", 5), [])
+
+    def test_backlog(self):
+        self._push("A", "a1")
+        self._push("u", "u1", channel=QQChannel.c2c)
+        backlog = self.queues.backlog()
+        self.assertEqual(len(backlog), 2)
+        self.assertEqual(self.queues.count(QQChannel.c2c), 1)
+        self.queues.pop(QQChannel.group, "A", 5)
+        self.assertEqual(
+            [(c, t, n) for c, t, n, _ in self.queues.backlog()],
+            [(QQChannel.c2c, "u", 1)],
+        )
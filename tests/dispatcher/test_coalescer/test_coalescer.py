@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from wechatter.dispatcher import Coalescer, QQDispatcher
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+
+class TestCoalescer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sent = []
+
+        async def handler(message):
+            self.sent.append((message.target, message.content, message.msg_id))
+
+        self.coalescer = Coalescer(window=0.05, max_length=10)
+        self.dispatcher = QQDispatcher(coalescer=self.coalescer)
+        self.dispatcher.start({channel: handler for channel in QQChannel})
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+
+    def _message(self, content, target="t1", **kwargs):
+        return OutboundMessage(
+            channel=QQChannel.group, target=target, content=content, **kwargs
+        )
+
+    async def _drain(self):
+        await asyncio.sleep(0.1)
+        await self.dispatcher.join()
+
+    async def test_first_message_sent_immediately(self):
+        self.dispatcher.enqueue(self._message("a"))
+        await self.dispatcher.join()
+        self.assertListEqual(self.sent, [("t1", "a", None)])
+        self.assertEqual(self.coalescer.buffered_count(), 0)
+
+    async def test_merge_within_window(self):
+        self.dispatcher.enqueue(self._message("a", msg_id="m1"))
+        self.dispatcher.enqueue(self._message("b"))
+        self.dispatcher.enqueue(self._message("c", msg_id="m1"))
+        self.dispatcher.enqueue(self._message("d", target="t2"))
+        await self._drain()
+        self.assertCountEqual(
+            self.sent,
+            [("t1", "a", "m1"), ("t1", "b\nc", "m1"), ("t2", "d", None)],
+        )
+        self.assertEqual(self.coalescer.merged_count, 1)
+
+    async def test_idle_target_not_delayed(self):
+        self.dispatcher.enqueue(self._message("a"))
+        await self._drain()
+        # 窗口结束时没有缓冲的消息，之后的消息立即发出
+        self.dispatcher.enqueue(self._message("b"))
+        await self.dispatcher.join()
+        self.assertListEqual(self.sent, [("t1", "a", None), ("t1", "b", None)])
+
+    async def test_queued_count_includes_buffered_messages(self):
+        for content in "abc":
+            self.dispatcher.enqueue(self._message(content))
+        # 仍在合并器中的消息也会占用回复次数，合并后只占用一次
+        self.assertEqual(self.dispatcher.queued_count(QQChannel.group, "t1"), 3)
+        self.coalescer.flush()
+        self.assertEqual(self.dispatcher.queued_count(QQChannel.group, "t1"), 2)
+        await self._drain()
+        self.assertEqual(self.dispatcher.queued_count(QQChannel.group, "t1"), 0)
+
+    async def test_respect_max_length(self):
+        for content in ("a", "12345", "67890"):
+            self.dispatcher.enqueue(self._message(content))
+        await self._drain()
+        self.assertListEqual(
+            [content for _, content, _ in self.sent], ["a", "12345", "67890"]
+        )
+
+    async def test_image_flushes_buffer_in_order(self):
+        self.dispatcher.enqueue(self._message("a"))
+        self.dispatcher.enqueue(self._message("b"))
+        self.dispatcher.enqueue(self._message("img", is_image=True))
+        self.dispatcher.enqueue(self._message("c"))
+        await self._drain()
+        self.assertListEqual(
+            [content for _, content, _ in self.sent], ["a", "b", "img", "c"]
+        )
+
+    async def test_different_msg_id_not_merged(self):
+        self.dispatcher.enqueue(self._message("a", msg_id="m1"))
+        self.dispatcher.enqueue(self._message("b", msg_id="m2"))
+        self.dispatcher.enqueue(self._message("c", msg_id="m3"))
+        await self._drain()
+        self.assertListEqual(
+            self.sent, [("t1", "a", "m1"), ("t1", "b", "m2"), ("t1", "c", "m3")]
+        )
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import unittest
+
+from wechatter.dispatcher import QQDispatcher
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+
+class TestQQDispatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sent = []
+
+        async def handler(message):
+            self.sent.append(message.content)
+
+        self.handlers = {channel: handler for channel in QQChannel}
+        self.dispatcher = QQDispatcher()
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+
+    def _message(self, content, channel=QQChannel.group):
+        return OutboundMessage(channel=channel, target="target", content=content)
+
+    async def test_enqueue_before_start(self):
+        self.dispatcher.enqueue(self._message("1"))
+        self.dispatcher.start(self.handlers)
+        await self.dispatcher.join()
+        self.assertListEqual(self.sent, ["1"])
+
+    async def test_start_twice(self):
+        # 网关重连后再次启动时不会再创建一组工作协程
+        self.dispatcher.start(self.handlers)
+        tasks = list(self.dispatcher._tasks)
+        self.dispatcher.start(self.handlers)
+        self.assertListEqual(self.dispatcher._tasks, tasks)
+        self.dispatcher.enqueue(self._message("1"))
+        await self.dispatcher.join()
+        self.assertListEqual(self.sent, ["1"])
+
+    async def test_enqueue_keeps_order(self):
+        self.dispatcher.start(self.handlers)
+        for i in range(10):
+            self.dispatcher.enqueue(self._message(str(i)))
+        await self.dispatcher.join()
+        self.assertListEqual(self.sent, [str(i) for i in range(10)])
+
+    async def test_enqueue_from_other_thread(self):
+        self.dispatcher.start(self.handlers)
+        thread = threading.Thread(
+            target=self.dispatcher.enqueue, args=(self._message("t", QQChannel.c2c),)
+        )
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.01)
+        await self.dispatcher.join()
+        self.assertListEqual(self.sent, ["t"])
+
+    async def test_slow_target_does_not_block_others(self):
+        release = asyncio.Event()
+        sent = []
+
+        async def handler(message):
+            if message.target == "slow":
+                await release.wait()
+            sent.append(message.target)
+
+        dispatcher = QQDispatcher(worker_count=4)
+        dispatcher.start({channel: handler for channel in QQChannel})
+        slow_shard = dispatcher.shard_of(QQChannel.group, "slow")
+        fast = next(
+            f"fast-{i}"
+            for i in range(100)
+            if dispatcher.shard_of(QQChannel.group, f"fast-{i}") != slow_shard
+        )
+        dispatcher.enqueue(
+            OutboundMessage(channel=QQChannel.group, target="slow", content="s")
+        )
+        dispatcher.enqueue(
+            OutboundMessage(channel=QQChannel.group, target=fast, content="f")
+        )
+        await asyncio.sleep(0.01)
+        self.assertListEqual(sent, [fast])
+        release.set()
+        await dispatcher.join()
+        self.assertListEqual(sent, [fast, "slow"])
+        await dispatcher.stop()
+
+    async def test_shard_depths(self):
+        dispatcher = QQDispatcher(worker_count=3)
+        dispatcher.start(self.handlers)
+        self.assertListEqual(dispatcher.shard_depths(), [0, 0, 0])
+        await dispatcher.stop()
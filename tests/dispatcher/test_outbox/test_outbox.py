@@ -0,0 +1,129 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from wechatter.database import QQOutbox as DbQQOutbox
+from wechatter.database.tables import Base
+from wechatter.dispatcher.outbox import Outbox
+from wechatter.models.qq import OutboundMessage, OutboxState, QQChannel, SendPriority
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(engine)
+
+    def _new_outbox(self) -> Outbox:
+        outbox = Outbox(session_factory=self.session_factory)
+        self.addCleanup(outbox.writer.close)
+        return outbox
+
+    def _message(self, content: str) -> OutboundMessage:
+        return OutboundMessage(channel=QQChannel.group, target="g1", content=content)
+
+    def test_state_changes_are_group_committed(self):
+        outbox = self._new_outbox()
+        message = self._message("hello")
+        outbox.save(message, OutboxState.pending)
+        outbox.save(message, OutboxState.in_flight)
+        outbox.save(message, OutboxState.sent)
+        outbox.writer.flush()
+        self.assertEqual(outbox.writer.batch_count, 1)
+        with self.session_factory() as session:
+            row = session.scalars(select(DbQQOutbox)).one()
+        self.assertEqual(row.state, OutboxState.sent)
+
+    def test_recover_unfinished_messages(self):
+        outbox = self._new_outbox()
+        pending, in_flight, blocked, sent = (self._message(str(i)) for i in range(4))
+        outbox.save(pending, OutboxState.pending)
+        outbox.save(in_flight, OutboxState.in_flight)
+        outbox.save(blocked, OutboxState.blocked)
+        outbox.save(sent, OutboxState.sent)
+        outbox.writer.flush()
+
+        # 模拟重启
+        recovered = self._new_outbox().recover()
+        self.assertEqual(
+            {(m.content, state) for m, state in recovered},
+            {
+                ("0", OutboxState.pending),
+                ("1", OutboxState.in_flight),
+                ("2", OutboxState.blocked),
+            },
+        )
+        self.assertEqual(
+            {m.outbox_id for m, _ in recovered},
+            {pending.outbox_id, in_flight.outbox_id, blocked.outbox_id},
+        )
+
+    def test_recover_keeps_priority(self):
+        outbox = self._new_outbox()
+        scheduled = self._message("scheduled")
+        scheduled.priority = SendPriority.scheduled
+        outbox.save(scheduled, OutboxState.pending)
+        outbox.save(self._message("reply"), OutboxState.blocked)
+        outbox.writer.flush()
+
+        # 模拟重启，定时任务的消息不会按回复消息的优先级恢复
+        recovered = self._new_outbox().recover()
+        self.assertEqual(
+            {m.content: m.priority for m, _ in recovered},
+            {"scheduled": SendPriority.scheduled, "reply": SendPriority.interactive},
+        )
+
+    def test_recover_skips_messages_saved_by_this_process(self):
+        outbox = self._new_outbox()
+        outbox.save(self._message("new"), OutboxState.pending)
+        self.assertEqual(outbox.recover(), [])
+
+    def test_recover_only_once(self):
+        previous = self._new_outbox()
+        previous.save(self._message("old"), OutboxState.pending)
+        previous.writer.flush()
+
+        outbox = self._new_outbox()
+        self.assertEqual(len(outbox.recover()), 1)
+        # 断线重连后再次恢复时，已恢复的消息仍在队列中，不会重复入队
+        outbox.save(self._message("queued"), OutboxState.in_flight)
+        self.assertEqual(outbox.recover(), [])
+
+    def test_purge_sent(self):
+        outbox = self._new_outbox()
+        old, recent, pending = (self._message(str(i)) for i in range(3))
+        outbox.save(old, OutboxState.sent)
+        outbox.save(recent, OutboxState.sent)
+        outbox.save(pending, OutboxState.pending)
+        outbox.writer.flush()
+        expired = datetime.utcnow() - timedelta(days=outbox.retention_days + 1)
+        with self.session_factory() as session:
+            session.get(DbQQOutbox, old.outbox_id).updated_time = expired
+            session.commit()
+
+        self.assertEqual(outbox.purge_sent(), 1)
+        with self.session_factory() as session:
+            ids = set(session.scalars(select(DbQQOutbox.id)))
+        self.assertEqual(ids, {recent.outbox_id, pending.outbox_id})
+
+    def test_dead_letters(self):
+        outbox = self._new_outbox()
+        dead = self._message("dead")
+        outbox.save(dead, OutboxState.dead, "forbidden")
+        outbox.save(self._message("sent"), OutboxState.sent)
+        dead_letters = outbox.dead_letters()
+        self.assertEqual(len(dead_letters), 1)
+        message, error, _ = dead_letters[0]
+        self.assertEqual((message.content, error), ("dead", "forbidden"))
+        self.assertEqual(
+            outbox.dead_letters(id_prefix=dead.outbox_id[:8])[0][0].outbox_id,
+            dead.outbox_id,
+        )
+        self.assertListEqual(outbox.dead_letters(id_prefix="zz"), [])
@@ -0,0 +1,46 @@
+import time
+import unittest
+
+from wechatter.dispatcher.priority import PriorityLanes
+from wechatter.models.qq import OutboundMessage, QQChannel, SendPriority
+
+
+def _message(content, priority, enqueued_at=None):
+    return OutboundMessage(
+        channel=QQChannel.group,
+        target="t",
+        content=content,
+        priority=priority,
+        enqueued_at=time.perf_counter() if enqueued_at is None else enqueued_at,
+    )
+
+
+class TestPriorityLanes(unittest.IsolatedAsyncioTestCase):
+    async def test_weighted_fair(self):
+        lanes = PriorityLanes(
+            weights={SendPriority.interactive: 3, SendPriority.scheduled: 1}
+        )
+        for i in range(8):
+            lanes.put_nowait(_message(f"s{i}", SendPriority.scheduled))
+        for i in range(6):
+            lanes.put_nowait(_message(f"i{i}", SendPriority.interactive))
+        order = [lanes.get_nowait().content for _ in range(8)]
+        # 每 4 条中 3 条命令回复、1 条定时任务，且各通道内保持先进先出
+        self.assertListEqual(order, ["i0", "i1", "s0", "i2", "i3", "i4", "s1", "i5"])
+
+    async def test_starving_lane_served_first(self):
+        lanes = PriorityLanes(max_wait=10)
+        lanes.put_nowait(
+            _message("old", SendPriority.forwarding, time.perf_counter() - 60)
+        )
+        lanes.put_nowait(_message("new", SendPriority.interactive))
+        self.assertEqual(lanes.get_nowait().content, "old")
+
+    async def test_join(self):
+        lanes = PriorityLanes()
+        lanes.put_nowait(_message("a", SendPriority.admin))
+        self.assertEqual(lanes.lane_depths()[SendPriority.admin], 1)
+        await lanes.get()
+        lanes.task_done()
+        await lanes.join()
+        self.assertEqual(lanes.qsize(), 0)
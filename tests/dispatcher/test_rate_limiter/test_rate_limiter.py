@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from botpy.errors import SequenceNumberError, ServerError
+
+from wechatter.dispatcher.rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    is_rate_limit_error,
+)
+from wechatter.models.qq import QQChannel
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=2, burst=3, now=0)
+        for _ in range(3):
+            self.assertEqual(bucket.wait_time(0), 0)
+            bucket.consume()
+        self.assertAlmostEqual(bucket.wait_time(0), 0.5)
+        self.assertEqual(bucket.wait_time(0.5), 0)
+
+    def test_scale_slows_refill(self):
+        bucket = TokenBucket(rate=2, burst=1, now=0)
+        bucket.consume()
+        bucket.scale = 0.5
+        self.assertAlmostEqual(bucket.wait_time(0), 1.0)
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_target_limit_is_per_target(self):
+        limiter = RateLimiter(config={"target": {"rate": 1, "burst": 1}})
+        self.assertEqual(await limiter.acquire(QQChannel.group, "a"), 0)
+        # 不同目标互不影响
+        self.assertEqual(await limiter.acquire(QQChannel.group, "b"), 0)
+        self.assertGreater(await limiter.acquire(QQChannel.group, "a"), 0)
+
+    async def test_on_error_slows_down_and_recovers(self):
+        limiter = RateLimiter(cooldown=0)
+        await limiter.acquire(QQChannel.c2c, "a")
+        self.assertTrue(
+            limiter.on_error(QQChannel.c2c, "a", SequenceNumberError("429"))
+        )
+        bucket = limiter._targets[(QQChannel.c2c, "a")]
+        self.assertEqual(bucket.scale, 0.5)
+        limiter.on_success(QQChannel.c2c, "a")
+        self.assertAlmostEqual(bucket.scale, 0.6)
+        self.assertFalse(
+            limiter.on_error(QQChannel.c2c, "a", ServerError("bad request"))
+        )
+
+    async def test_cooldown_only_blocks_throttled_target(self):
+        limiter = RateLimiter(cooldown=60)
+        await limiter.acquire(QQChannel.group, "a")
+        await limiter.acquire(QQChannel.group, "b")
+        limiter.on_error(QQChannel.group, "a", SequenceNumberError("429"))
+        # 同一渠道的其他目标不需要等待冷却，渠道只降速
+        self.assertEqual(await limiter.acquire(QQChannel.group, "b"), 0)
+        self.assertEqual(limiter._channels[QQChannel.group].scale, 0.5)
+        self.assertGreater(
+            limiter._targets[(QQChannel.group, "a")].wait_time(time.monotonic()), 50
+        )
+
+
+class TestIsRateLimitError(unittest.TestCase):
+    def test_is_rate_limit_error(self):
+        self.assertTrue(is_rate_limit_error(SequenceNumberError("too many")))
+        self.assertTrue(is_rate_limit_error(ServerError("code 22009 msg limit exceed")))
+        self.assertFalse(is_rate_limit_error(ServerError("请求参数错误")))
@@ -0,0 +1,59 @@
+import unittest
+
+from wechatter.dispatcher import ReplyWindowIndex
+from wechatter.models.qq import QQChannel
+
+
+class TestReplyWindowIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ReplyWindowIndex(ttl=300, max_seq=5)
+
+    def test_windows_are_per_target(self):
+        self.index.refresh(QQChannel.group, "A", "msg-a", now=0)
+        self.index.refresh(QQChannel.group, "B", "msg-b", now=0)
+        self.assertEqual(self.index.acquire(QQChannel.group, "B", now=1), ("msg-b", 1))
+        self.assertEqual(self.index.acquire(QQChannel.group, "A", now=1), ("msg-a", 1))
+        self.assertIsNone(self.index.acquire(QQChannel.group, "C", now=1))
+        self.assertIsNone(self.index.acquire(QQChannel.c2c, "A", now=1))
+
+    def test_seq_budget(self):
+        self.index.refresh(QQChannel.c2c, "u", "m1", now=0)
+        seqs = [self.index.acquire(QQChannel.c2c, "u", now=1) for _ in range(6)]
+        self.assertEqual([seq for _, seq in seqs[:5]], [1, 2, 3, 4, 5])
+        self.assertIsNone(seqs[5])
+        self.assertEqual(self.index.remaining(QQChannel.c2c, "u", now=1), 0)
+
+    def test_expired_window(self):
+        self.index.refresh(QQChannel.group, "A", "m1", now=0)
+        self.assertIsNone(self.index.acquire(QQChannel.group, "A", now=300))
+        self.assertIsNone(self.index.acquire(QQChannel.group, "A", "m1", now=300))
+
+    def test_explicit_msg_id_falls_back_to_latest(self):
+        self.index.refresh(QQChannel.group, "A", "m1", now=0)
+        self.index.refresh(QQChannel.group, "A", "m2", now=10)
+        self.assertEqual(
+            self.index.acquire(QQChannel.group, "A", "m1", now=11), ("m1", 1)
+        )
+        for _ in range(4):
+            self.index.acquire(QQChannel.group, "A", "m1", now=11)
+        self.assertEqual(
+            self.index.acquire(QQChannel.group, "A", "m1", now=11), ("m2", 1)
+        )
+        self.assertEqual(
+            self.index.acquire(QQChannel.group, "A", "unknown", now=11), ("m2", 2)
+        )
+
+    def test_falls_back_to_older_windows(self):
+        self.index.refresh(QQChannel.group, "A", "m1", now=0)
+        self.index.refresh(QQChannel.group, "A", "m2", now=10)
+        for _ in range(5):
+            self.index.acquire(QQChannel.group, "A", "m2", now=11)
+        self.assertEqual(self.index.remaining(QQChannel.group, "A", now=11), 5)
+        # 最新的窗口已用完时使用该目标仍未过期的较早窗口
+        self.assertEqual(
+            self.index.acquire(QQChannel.group, "A", "m2", now=11), ("m1", 1)
+        )
+        self.assertEqual(self.index.remaining(QQChannel.group, "A", now=11), 4)
+        # 较早的窗口过期后不再使用
+        self.assertIsNone(self.index.acquire(QQChannel.group, "A", now=300))
+        self.assertEqual(self.index.remaining(QQChannel.group, "A", now=300), 0)
@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+from botpy.errors import ForbiddenError, SequenceNumberError, ServerError
+
+from wechatter.dispatcher import QQDispatcher, RetryPolicy, is_retryable_error
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_is_retryable_error(self):
+        self.assertTrue(is_retryable_error(ServerError("internal error")))
+        self.assertTrue(is_retryable_error(SequenceNumberError("too many requests")))
+        self.assertFalse(is_retryable_error(ForbiddenError("forbidden")))
+        self.assertFalse(is_retryable_error(ServerError("消息内容违规")))
+
+    def test_delay_backoff(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5, jitter=0)
+        self.assertListEqual([policy.delay(n) for n in range(1, 5)], [1, 2, 4, 5])
+        policy = RetryPolicy(base_delay=4, jitter=0.5)
+        for _ in range(20):
+            self.assertTrue(2 <= policy.delay(1) <= 4)
+
+
+class TestDispatcherRetry(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.attempts = []
+        self.dispatcher = QQDispatcher(
+            retry_policy=RetryPolicy(max_retries=2, base_delay=0.01, jitter=0)
+        )
+
+        async def handler(message):
+            self.attempts.append((message.content, message.retry_count))
+            self.dispatcher.report_error(message, ServerError("internal error"))
+
+        self.dispatcher.start({channel: handler for channel in QQChannel})
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+
+    async def test_retry_original_payload_then_dead(self):
+        self.dispatcher.enqueue(
+            OutboundMessage(channel=QQChannel.group, target="t", content="hello")
+        )
+        await asyncio.sleep(0.2)
+        self.assertListEqual(self.attempts, [("hello", 0), ("hello", 1), ("hello", 2)])
+        self.assertEqual(self.dispatcher.dead_count, 1)
+        self.assertEqual(self.dispatcher.retry_pending_count, 0)
@@ -0,0 +1,39 @@
+import unittest
+
+from wechatter.bench.qq_ingest import DIRECT_BUILDERS, LEGACY_BUILDERS, load_fixtures
+
+
+class TestQQMessageFactories(unittest.TestCase):
+    def setUp(self):
+        self.robot, self.events = load_fixtures()
+
+    def test_same_as_source_json(self):
+        for kind, messages in self.events.items():
+            for message in messages:
+                with self.subTest(kind=kind, id=message.id):
+                    self.assertEqual(
+                        DIRECT_BUILDERS[kind](message, self.robot),
+                        LEGACY_BUILDERS[kind](message, self.robot),
+                    )
+
+    def test_fields(self):
+        group = DIRECT_BUILDERS["group"](self.events["group"][0], self.robot)
+        self.assertTrue(group.is_group)
+        self.assertTrue(group.is_mentioned)
+        self.assertEqual(group.content, "/help ")
+        self.assertEqual(group.person.member_openid, "A317B61B65FF0E81CD3C30F45AEBA2CC")
+        self.assertEqual(group.group.msg_id, self.events["group"][0].id)
+        # 只有空白的消息内容
+        empty = DIRECT_BUILDERS["group"](self.events["group"][1], self.robot)
+        self.assertEqual(empty.content, "")
+        self.assertEqual(len(empty.attachments), 1)
+
+        c2c = DIRECT_BUILDERS["c2c"](self.events["c2c"][0], self.robot)
+        self.assertFalse(c2c.is_group)
+        self.assertEqual(c2c.receiver.id, "3889001234")
+        self.assertEqual(c2c.person.user_openid, c2c.person.name)
+
+        direct = DIRECT_BUILDERS["direct"](self.events["direct"][0], self.robot)
+        self.assertEqual(direct.person.id, "12051937476530263213")
+        self.assertEqual(direct.person.guild_id, direct.person.id)
+        self.assertEqual(direct.msg_id, self.events["direct"][0].id)
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from wechatter.sender import sender
+from wechatter.sender.splitter import split_message
+
+
+class TestSplitter(unittest.TestCase):
+    def test_short_message_not_split(self):
+        self.assertListEqual(split_message("hello", 10), ["hello"])
+
+    def test_split_on_paragraphs_and_pack(self):
+        message = "aaa\n\nbbb\n\nccc\n\n" + "d" * 9
+        chunks = split_message(message, 10)
+        self.assertListEqual(chunks, ["aaa\n\nbbb", "ccc", "d" * 9])
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
+
+    def test_split_long_paragraph_on_lines(self):
+        message = "line1\nline2\nline3"
+        self.assertListEqual(split_message(message, 12), ["line1\nline2", "line3"])
+
+    def test_hard_split_long_line(self):
+        chunks = split_message("x" * 25, 10)
+        self.assertListEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertEqual("".join(chunks), "x" * 25)
+
+
+class TestPackQQMessage(unittest.TestCase):
+    def test_image_removed_when_upload_fails(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        image_path = os.path.join(directory.name, "long_text.png")
+
+        def text_to_image(message, file_name, **kwargs):
+            open(image_path, "wb").close()
+            return image_path
+
+        message = "\n\n".join("x" * 8 for _ in range(5))
+        with patch.object(sender, "QQ_MESSAGE_MAX_LENGTH", 10), patch.object(
+            sender, "QQ_MESSAGE_MAX_CHUNKS", 2
+        ), patch.object(sender, "text_to_image", text_to_image), patch.object(
+            sender, "upload_image", side_effect=RuntimeError("upload failed")
+        ):
+            packed = sender._pack_qq_message(message, is_image=False)
+        # 上传失败时改为分段发送，生成的图片被删除
+        self.assertEqual(len(packed), 5)
+        self.assertFalse(any(is_image for _, is_image in packed))
+        self.assertFalse(os.path.exists(image_path))
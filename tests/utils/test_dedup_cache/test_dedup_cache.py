@@ -0,0 +1,44 @@
+import unittest
+
+from wechatter.utils import DedupCache
+
+
+class TestDedupCache(unittest.TestCase):
+    def test_seen_within_ttl(self):
+        cache = DedupCache(ttl=10)
+        self.assertFalse(cache.seen("a", now=0))
+        self.assertTrue(cache.seen("a", now=5))
+        self.assertFalse(cache.seen("b", now=5))
+        # 过期后重新记录
+        self.assertFalse(cache.seen("a", now=11))
+        self.assertTrue(cache.seen("a", now=12))
+        self.assertEqual(cache.hit_count, 2)
+        self.assertEqual(cache.miss_count, 3)
+
+    def test_per_key_ttl(self):
+        cache = DedupCache(ttl=600)
+        self.assertFalse(cache.seen("wechat", ttl=1, now=0))
+        self.assertFalse(cache.seen("wechat", ttl=1, now=2))
+        self.assertFalse(cache.seen("qq", now=0))
+        self.assertTrue(cache.seen("qq", now=2))
+
+    def test_lru_eviction(self):
+        cache = DedupCache(ttl=100, max_size=3)
+        for key in "abc":
+            cache.seen(key, now=0)
+        # 再次出现的 a 变为最近使用
+        self.assertTrue(cache.seen("a", now=1))
+        cache.seen("d", now=2)
+        self.assertEqual(len(cache), 3)
+        self.assertFalse(cache.seen("b", now=3))
+        self.assertTrue(cache.seen("a", now=3))
+
+    def test_load_and_on_add(self):
+        added = []
+        cache = DedupCache(
+            ttl=10, on_add=lambda key, expire_at: added.append((key, expire_at))
+        )
+        self.assertEqual(cache.load([("old", 5), ("live", 20)], now=10), 1)
+        self.assertTrue(cache.seen("live", now=11))
+        self.assertFalse(cache.seen("old", now=11))
+        self.assertListEqual(added, [("old", 21)])
@@ -0,0 +1,35 @@
+import unittest
+
+from wechatter.utils import IdentityCache
+
+
+class TestIdentityCache(unittest.TestCase):
+    def test_changed_only_when_fingerprint_differs(self):
+        cache = IdentityCache()
+        self.assertTrue(cache.changed("p1", ("alice",)))
+        self.assertFalse(cache.changed("p1", ("alice",)))
+        self.assertTrue(cache.changed("p1", ("alice2",)))
+        self.assertFalse(cache.changed("p1", ("alice2",)))
+        self.assertEqual(cache.hit_count, 2)
+        self.assertEqual(cache.miss_count, 2)
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_invalidate(self):
+        cache = IdentityCache()
+        cache.changed("p1", ("alice",))
+        cache.changed("p2", ("bob",))
+        cache.invalidate(["p1", "missing"])
+        self.assertTrue(cache.changed("p1", ("alice",)))
+        self.assertFalse(cache.changed("p2", ("bob",)))
+
+    def test_lru_eviction(self):
+        cache = IdentityCache(max_size=2)
+        cache.changed("a", 1)
+        cache.changed("b", 1)
+        # a 变为最近使用，淘汰 b
+        cache.changed("a", 1)
+        cache.changed("c", 1)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evicted_count, 1)
+        self.assertFalse(cache.changed("a", 1))
+        self.assertTrue(cache.changed("b", 1))
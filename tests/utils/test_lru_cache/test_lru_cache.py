@@ -0,0 +1,28 @@
+import unittest
+
+from wechatter.utils import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = LRUCache()
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        cache.put("a", 2)
+        self.assertEqual(cache.get("a"), 2)
+        self.assertEqual(cache.hit_count, 1)
+        self.assertEqual(cache.miss_count, 1)
+        cache.invalidate(["a"])
+        self.assertIsNone(cache.get("a"))
+
+    def test_lru_eviction(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        # a 变为最近使用，淘汰 b
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evicted_count, 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
@@ -0,0 +1,56 @@
+import threading
+import unittest
+
+from wechatter.utils import ShardedCounter
+
+
+class TestShardedCounter(unittest.TestCase):
+    def test_add_from_threads(self):
+        counter = ShardedCounter()
+        started = threading.Barrier(4)
+
+        def work():
+            started.wait()
+            for _ in range(1000):
+                counter.add("a")
+                counter.add("b", 2)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.collect(), {"a": 4000, "b": 8000})
+
+    def test_collect_and_pending(self):
+        counter = ShardedCounter()
+        counter.add("a", 3)
+        self.assertEqual(counter.pending(), {"a": 3})
+        self.assertEqual(counter.collect(), {"a": 3})
+        self.assertEqual(counter.pending(), {})
+        counter.add("a")
+        counter.add("b")
+        self.assertEqual(counter.collect(), {"a": 1, "b": 1})
+        # 取出后分片中不再保存已取出的 key
+        self.assertEqual(counter._local.shard.counts, {})
+
+    def test_restore(self):
+        counter = ShardedCounter()
+        counter.add("a", 2)
+        delta = counter.collect()
+        counter.add("a")
+        # 保存失败，放回增量
+        counter.restore(delta)
+        self.assertEqual(counter.pending(), {"a": 3})
+        self.assertEqual(counter.collect(), {"a": 3})
+        self.assertEqual(counter.collect(), {})
+
+    def test_dead_thread_shards_are_kept(self):
+        counter = ShardedCounter()
+        thread = threading.Thread(target=counter.add, args=("a", 5))
+        thread.start()
+        thread.join()
+        self.assertEqual(counter.collect(), {"a": 5})
+        self.assertEqual(len(counter._shards), 0)
+        counter.add("a")
+        self.assertEqual(counter.collect(), {"a": 1})
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from wechatter.utils import ConversationWorkerPool, ShedPolicy
+
+
+class TestConversationWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.handled = []
+        self.gate = threading.Event()
+
+    def tearDown(self):
+        self.gate.set()
+        self.pool.stop()
+
+    async def _handle(self, item):
+        key, value = item
+        if value == "block":
+            # 模拟等待网络请求的命令
+            await asyncio.get_running_loop().run_in_executor(None, self.gate.wait, 5)
+        self.handled.append(item)
+
+    def _make_pool(self, **kwargs):
+        self.pool = ConversationWorkerPool(self._handle, **kwargs)
+        return self.pool
+
+    def test_order_within_conversation(self):
+        pool = self._make_pool(worker_count=3, queue_size=1000)
+        pool.start()
+        for i in range(50):
+            for key in ("group:a", "group:b", "c2c:c"):
+                pool.submit(key, (key, i))
+        self.assertTrue(pool.join(5))
+        for key in ("group:a", "group:b", "c2c:c"):
+            self.assertListEqual(
+                [v for k, v in self.handled if k == key], list(range(50))
+            )
+        self.assertEqual(pool.processed_count, 150)
+
+    def test_handlers_share_one_loop(self):
+        loops = set()
+
+        async def handle(item):
+            loops.add((asyncio.get_running_loop(), threading.get_ident()))
+
+        self.pool = ConversationWorkerPool(handle, worker_count=3)
+        self.pool.start()
+        for key in ("group:a", "group:b", "c2c:c"):
+            self.pool.submit(key, key)
+        self.assertTrue(self.pool.join(5))
+        # 命令不会在多个线程中并发执行，也不需要切换事件循环
+        self.assertEqual(len(loops), 1)
+        self.assertNotEqual(next(iter(loops))[1], threading.get_ident())
+
+    def test_waiting_conversation_does_not_stall_others(self):
+        pool = self._make_pool(worker_count=2)
+        slow, fast = "slow", "fast"
+        while pool.worker_of(slow) == pool.worker_of(fast):
+            fast += "_"
+        pool.start()
+        pool.submit(slow, (slow, "block"))
+        pool.submit(fast, (fast, 1))
+        deadline = time.monotonic() + 2
+        while (fast, 1) not in self.handled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIn((fast, 1), self.handled)
+        self.assertNotIn((slow, "block"), self.handled)
+        self.gate.set()
+        self.assertTrue(pool.join(5))
+
+    def _fill(self, pool):
+        pool.start()
+        pool.submit("a", ("a", "block"))
+        # 等待工作协程取走阻塞的消息
+        while pool.depths()[0]:
+            time.sleep(0.01)
+        for i in range(3):
+            self.assertTrue(pool.submit("a", ("a", i)))
+
+    def test_drop_newest(self):
+        pool = self._make_pool(
+            worker_count=1, queue_size=3, shed_policy=ShedPolicy.drop_newest
+        )
+        self._fill(pool)
+        self.assertFalse(pool.submit("a", ("a", 3)))
+        self.gate.set()
+        pool.join(5)
+        self.assertListEqual(
+            self.handled, [("a", "block"), ("a", 0), ("a", 1), ("a", 2)]
+        )
+        self.assertEqual(pool.shed_count, 1)
+
+    def test_drop_oldest(self):
+        pool = self._make_pool(
+            worker_count=1, queue_size=3, shed_policy=ShedPolicy.drop_oldest
+        )
+        self._fill(pool)
+        self.assertTrue(pool.submit("a", ("a", 3)))
+        self.gate.set()
+        pool.join(5)
+        self.assertListEqual(
+            self.handled, [("a", "block"), ("a", 1), ("a", 2), ("a", 3)]
+        )
+        self.assertEqual(pool.shed_count, 1)
+
+    def test_block_timeout(self):
+        pool = self._make_pool(
+            worker_count=1,
+            queue_size=3,
+            shed_policy=ShedPolicy.block,
+            block_timeout=0.05,
+        )
+        self._fill(pool)
+        self.assertFalse(pool.submit("a", ("a", 3)))
+        # 队列腾出空间后可以继续入队
+        threading.Timer(0.05, self.gate.set).start()
+        pool.block_timeout = 2
+        self.assertTrue(pool.submit("a", ("a", 4)))
+        pool.join(5)
+        self.assertEqual(self.handled[-1], ("a", 4))
+
+    def test_submit_async_does_not_block_loop(self):
+        pool = self._make_pool(
+            worker_count=1, queue_size=3, shed_policy=ShedPolicy.block, block_timeout=2
+        )
+        self._fill(pool)
+
+        async def main():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.ensure_future(tick())
+            # 队列已满，等待期间事件循环继续运行；同一会话后到的消息排在后面
+            first = asyncio.ensure_future(pool.submit_async("a", ("a", 3)))
+            second = asyncio.ensure_future(pool.submit_async("a", ("a", 4)))
+            await asyncio.sleep(0.1)
+            self.assertFalse(first.done())
+            self.assertGreater(ticks, 3)
+            self.gate.set()
+            results = await asyncio.gather(first, second)
+            ticker.cancel()
+            return results
+
+        self.assertEqual(asyncio.run(main()), [True, True])
+        pool.join(5)
+        self.assertListEqual([v for _, v in self.handled], ["block", 0, 1, 2, 3, 4])
@@ -1,6 +1,8 @@
-import json
-import os
+import asyncio
+import concurrent.futures
 import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 
 import botpy
 from botpy.message import DirectMessage, GroupMessage, C2CMessage
@@ -10,18 +12,33 @@ from wechatter.bot import BotInfo
 from wechatter.commands import commands, quoted_handlers
 from wechatter.config import config
 from wechatter.database import (
-    Group as DbGroup,
     Message as DbMessage,
     Person as DbPerson,
 )
-from wechatter.models.wechat.group import Group
-from wechatter.database import make_db_session
+from wechatter.database import (
+    BatchWriter,
+    ingest_message,
+    invalidate_identity,
+    make_db_session,
+)
+from wechatter.dispatcher import (
+    BlockingQueues,
+    Coalescer,
+    Outbox,
+    QQDispatcher,
+    RateLimiter,
+    ReplyWindowIndex,
+    RetryPolicy,
+)
 from wechatter.games import games
 from wechatter.message import MessageHandler
+from wechatter.message.dedup import is_duplicate_event
 from wechatter.models.wechat import Message, MessageType
 from wechatter.models.wechat.person import Person, Gender
+from wechatter.models.qq import OutboundMessage, OutboxState, QQChannel, SendPriority
 from wechatter.sender import notifier
-from wechatter.utils.time import get_current_timestamp, get_current_datetime2
+from wechatter.utils import ConversationWorkerPool, ShedPolicy
+from wechatter.utils.time import get_current_datetime2
 
 # 传入命令字典，构造消息处理器
 message_handler = MessageHandler(
@@ -30,8 +47,71 @@ message_handler = MessageHandler(
 
 class QQBot(botpy.Client):
     """QQ机器人处理类"""
-    
-        
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        dispatcher_config = config.get("qq_bot", {}).get("dispatcher") or {}
+        rate_limit_config = config.get("qq_bot", {}).get("rate_limit") or {}
+        outbox_config = config.get("qq_bot", {}).get("outbox") or {}
+        coalesce_config = config.get("qq_bot", {}).get("coalesce") or {}
+        retry_config = config.get("qq_bot", {}).get("retry") or {}
+        workers_config = config.get("qq_bot", {}).get("message_workers") or {}
+        rate_limiter = None
+        if rate_limit_config.get("enabled", True):
+            rate_limiter = RateLimiter(
+                config=rate_limit_config,
+                cooldown=rate_limit_config.get("cooldown", 5),
+            )
+        outbox = None
+        if outbox_config.get("enabled", True):
+            outbox = Outbox(
+                flush_interval=outbox_config.get("flush_interval", 0.05),
+                max_batch=outbox_config.get("max_batch", 500),
+                retention_days=outbox_config.get("retention_days", 3),
+                purge_interval=outbox_config.get("purge_interval", 3600),
+            )
+        coalescer = None
+        if coalesce_config.get("enabled", True):
+            coalescer = Coalescer(
+                window=coalesce_config.get("window", 0.3),
+                max_length=coalesce_config.get("max_length", 2000),
+            )
+        # 网关事件循环及其线程，启动发送调度器时记录
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event_loop_thread_id: Optional[int] = None
+        # 各群/用户的被动回复窗口，收到消息时刷新
+        self.reply_windows = ReplyWindowIndex()
+        # 没有可用被动回复窗口的消息，按群/用户分别排队
+        self.blocking_queues = BlockingQueues()
+        # 消息发送调度器，在 on_ready 中启动，启动前入队的消息会暂存
+        self.dispatcher = QQDispatcher(
+            worker_count=dispatcher_config.get("worker_count", 4),
+            lane_weights={
+                SendPriority(priority): weight
+                for priority, weight in (dispatcher_config.get("lane_weights") or {}).items()
+            },
+            max_lane_wait=dispatcher_config.get("max_lane_wait", 30),
+            rate_limiter=rate_limiter,
+            outbox=outbox,
+            coalescer=coalescer,
+            retry_policy=RetryPolicy(
+                max_retries=retry_config.get("max_retries", 3),
+                base_delay=retry_config.get("base_delay", 1),
+                max_delay=retry_config.get("max_delay", 60),
+                jitter=retry_config.get("jitter", 0.5),
+            ),
+        )
+        # 收到的消息交给消息处理线程，网关事件循环只负责入队，为 None 时在事件循环中直接处理
+        self.message_workers: Optional[ConversationWorkerPool] = None
+        if workers_config.get("enabled", True):
+            self.message_workers = ConversationWorkerPool(
+                handler=lambda item: self._process_message(*item),
+                worker_count=workers_config.get("worker_count", 4),
+                queue_size=workers_config.get("queue_size", 100),
+                shed_policy=ShedPolicy(workers_config.get("shed_policy", "drop_oldest")),
+                block_timeout=workers_config.get("block_timeout", 1.0),
+            )
+
     async def on_ready(self):
         """机器人就绪事件"""
         logger.success(f"机器人 {self.robot.name} 已就绪")
@@ -47,91 +127,116 @@ class QQBot(botpy.Client):
             is_friend=True,
         )
         add_person(self.qqrobot_person)
-        
-        # 初始化qq频道私聊消息队列
-        self._direct_message_queue = []
-        # 初始化qq群聊消息队列
-        self._group_at_message_queue = []
-        # 初始化qq私聊消息队列
-        self._c2c_message_queue = []
-        # 初始化阻塞队列
-        self._blocking_group_queue = []
-        self._blocking_c2c_queue = []
-        # 启动消息处理任务
-        import asyncio
-        self._process_message_task = asyncio.create_task(self._process_message_queue())
+        if self.message_workers is not None:
+            self.message_workers.start()
+        self._start_message_dispatch()
+        notifier.notify_logged_in()
+
+    def _start_message_dispatch(self):
+        """启动消息发送调度器和阻塞队列检查任务"""
+        if self.dispatcher.is_running:
+            # 网关完全重连后会再次收到 ready 事件，调度器和未完成的消息仍在本进程中
+            logger.info("QQ机器人重新连接，消息发送调度器已在运行")
+            return
+        self._event_loop = asyncio.get_running_loop()
+        self._event_loop_thread_id = threading.get_ident()
+        # 恢复上次运行时未发送完的消息
+        if self.dispatcher.outbox is not None:
+            self._recover_outbox()
+        # 启动消息发送调度器
+        self.dispatcher.start(self._build_send_handlers())
         # 启动阻塞队列定期检查任务
         self._check_blocking_queue_task = asyncio.create_task(self._check_blocking_queues())
-        notifier.notify_logged_in()
 
-    async def _process_message_queue(self):
-        """处理所有消息队列的异步任务"""
-        import asyncio
-        from collections import OrderedDict
-        from time import time
-
-        class MessageSeqManager:
-            def __init__(self, expiry_time=300):
-                self.msg_seq_map = OrderedDict()  # 使用OrderedDict来维护插入顺序
-                self.msg_time_map = {}  # 记录每个msg_id的最后使用时间
-                self.expiry_time = expiry_time
-                self.last_cleanup_time = time()
-                self.cleanup_interval = 60  # 每60秒检查一次过期消息
-
-            def get_seq(self, msg_id):
-                current_time = time()
-                # 检查是否需要清理过期消息
-                if current_time - self.last_cleanup_time > self.cleanup_interval:
-                    self._cleanup_expired()
-                    self.last_cleanup_time = current_time
-
-                # 如果msg_id不存在，初始化为1
-                if msg_id not in self.msg_seq_map:
-                    self.msg_seq_map[msg_id] = 1
-                    self.msg_time_map[msg_id] = current_time
-                    return 1
-
-                # 更新最后使用时间
-                self.msg_time_map[msg_id] = current_time
-                # 获取并递增seq
-                seq = self.msg_seq_map[msg_id] + 1
-                self.msg_seq_map[msg_id] = seq
-                return seq
-
-            def _cleanup_expired(self):
-                current_time = time()
-                # 创建需要删除的msg_id列表
-                expired_ids = [
-                    msg_id for msg_id, last_time in self.msg_time_map.items()
-                    if current_time - last_time > self.expiry_time
-                ]
-                # 删除过期的msg_id
-                for msg_id in expired_ids:
-                    del self.msg_seq_map[msg_id]
-                    del self.msg_time_map[msg_id]
-
-            def get_current_state(self):
-                return {
-                    'msg_seq_map': dict(self.msg_seq_map),
-                    'msg_time_map': self.msg_time_map
-                }
+    def _recover_outbox(self):
+        """从发件箱恢复未完成的消息，被阻塞的消息放回阻塞队列，其余重新入队"""
+        try:
+            recovered = self.dispatcher.outbox.recover()
+        except Exception as e:
+            logger.error(f"恢复QQ发件箱失败：{str(e)}")
+            return
+        for message, state in recovered:
+            if state == OutboxState.blocked:
+                self.blocking_queues.push(message)
+            else:
+                self.enqueue_message(message)
 
-        # 创建消息序列管理器实例
-        seq_manager = MessageSeqManager(expiry_time=300)  # 5分钟过期
-        last_group_msg_id = ""
-        last_group_msg_time = 0
-        
-        last_c2c_msg_id = ""
-        last_c2c_msg_time = 0
+    def enqueue_message(self, message: OutboundMessage) -> None:
+        """
+        将消息加入发送队列（线程安全）
+        :param message: 待发送消息
+        """
+        self.dispatcher.enqueue(message)
 
-        async def process_direct_message(msg_data):
+    def dispatch_status(self, timeout: float = 1.0) -> Optional[Dict]:
+        """
+        获取发送队列和阻塞队列的状态（线程安全）。
+        分片、合并器和阻塞队列只能在网关事件循环中访问，在其他线程中调用时交给事件循环读取
+        :param timeout: 在其他线程中调用时最长等待时间（秒）
+        :return: 状态字典，调度器未启动时返回 None
+        """
+        loop = self._event_loop
+        if loop is None or not self.dispatcher.is_running:
+            return None
+        if threading.get_ident() != self._event_loop_thread_id:
+            future = asyncio.run_coroutine_threadsafe(self._dispatch_status(), loop)
+            try:
+                return future.result(timeout)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                logger.warning("获取QQ发送队列状态超时")
+                return None
+        return self._collect_dispatch_status()
+
+    async def _dispatch_status(self) -> Dict:
+        return self._collect_dispatch_status()
+
+    def _collect_dispatch_status(self) -> Dict:
+        coalescer = self.dispatcher.coalescer
+        return {
+            "shard_depths": self.dispatcher.shard_depths(),
+            "lane_depths": self.dispatcher.lane_depths(),
+            "blocked": len(self.blocking_queues),
+            "retry_pending": self.dispatcher.retry_pending_count,
+            "dead": self.dispatcher.dead_count,
+            "merged": coalescer.merged_count if coalescer is not None else None,
+        }
+
+    def status_lines(self) -> List[str]:
+        """
+        获取发送队列和消息处理的状态，用于 /bot 命令（线程安全）
+        :return: 状态消息的各行，不同部分之间以空行分隔
+        """
+        lines = []
+        status = self.dispatch_status()
+        if status is not None:
+            lines += [
+                "📮 QQ发送队列",
+                f"工作协程: {len(status['shard_depths'])}个",
+                f"各分片积压: {status['shard_depths']}",
+                "各优先级积压: "
+                + "，".join(
+                    f"{priority.value} {depth}"
+                    for priority, depth in status["lane_depths"].items()
+                ),
+                f"阻塞消息: {status['blocked']}条",
+                f"等待重试: {status['retry_pending']}条",
+                f"发送失败: {status['dead']}条",
+            ]
+            if status["merged"] is not None:
+                lines.append(f"已合并消息: {status['merged']}条")
+        if self.message_workers is not None:
+            if lines:
+                lines.append("")
+            lines += self.message_workers.status_lines()
+        return lines
+
+    def _build_send_handlers(self) -> Dict[QQChannel, Callable]:
+        """构建各发送渠道的消息发送函数"""
+
+        async def process_direct_message(message: OutboundMessage):
             post_dms = ""
-            # 参数兼容处理
-            if len(msg_data) == 4:
-                content, guild_id, msg_id, is_image = msg_data
-                retry_count = 0
-            else:
-                content, guild_id, msg_id, is_image, retry_count = msg_data
+            content, guild_id, msg_id, is_image = message.content, message.target, message.msg_id, message.is_image
             try:
                 params = {
                     "content": content,
@@ -149,18 +254,12 @@ class QQBot(botpy.Client):
                 #     os.remove(content)
                 logger.debug(f"这是post_dms：\n{post_dms}")
                 logger.success(f"QQ频道私信发送成功，内容：{content}，guild_id: {guild_id}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                self.dispatcher.report_success(message)
             except Exception as e:
                 logger.error(f"QQ频道私信发送失败: {str(e)}")
-                # 加入消息队列说发送失败
-                failed_content = f"\n❗️ 错误：消息发送失败：{desensitize_message(str(e))}"
-                retry_count += 1
-                MAX_RETRY = 3
-                if retry_count <= MAX_RETRY:
-                    # 重新加入队列，带上重试次数
-                    self._direct_message_queue.append((failed_content, guild_id, msg_id, is_image, retry_count))
-                    logger.warning(f"QQ频道私信发送失败，已重试{retry_count}次，将再次尝试。")
-                else:
-                    logger.error(f"QQ频道私信发送失败，重试已达上限({MAX_RETRY})，不再重试。内容：{failed_content}")
+                # 按重试策略重新发送原始消息，或记录为死信
+                self.dispatcher.report_error(message, e)
+                return
                 
             try:    
                 # 主动发送返回的post_dms:to_A:{'code': 304023, 'message': '消息提交安全审核成功', 'data': {'message_audit': {'audit_id': 'a542254e-7390-4ec0-81a9-9b03e5df41e5'}}, 'err_code': 40034120, 'trace_id': '490b134028f32983479ee42ccc7d1424'}
@@ -172,55 +271,31 @@ class QQBot(botpy.Client):
                     content=content,
                     msg_id=_msg_id,
                 )
-                message_obj.id = add_message(message_obj)
-                logger.debug(f"qq机器人的消息已保存，id：{message_obj.id}")
+                save_bot_message(message_obj)
             except  Exception as e:
                 logger.error(f"保存qq机器人消息失败: {str(e)}")
 
             
-        async def process_group_at_message(msg_data):
-            nonlocal last_group_msg_id, last_group_msg_time
+        async def process_group_at_message(message: OutboundMessage):
             post_group_message = ""
-            # 参数兼容处理
-            if len(msg_data) == 5:
-                content, group_openid, msg_id, group, is_image = msg_data
-                retry_count = 0
-            else:
-                content, group_openid, msg_id, group, is_image, retry_count = msg_data
-                
-            # 获取当前时间戳
-            _current_time = get_current_timestamp()
-            
-            # 如果收到新消息(msg_id不为None)，而且msg_id与上次的msg_id不同，则发送消息
-            if msg_id is not None and msg_id != last_group_msg_id:
-                last_group_msg_id = msg_id
-                last_group_msg_time = _current_time
-                # 获取新的seq
-                msg_seq = seq_manager.get_seq(msg_id)
-            # 如果msg_id为空，代表这个消息任务是主动发送的
-            elif last_group_msg_id and (_current_time - last_group_msg_time < 300):
-                # 获取当前msg_id的seq
-                msg_seq = seq_manager.get_seq(last_group_msg_id)
-                if msg_seq > 5:
-                    current_time = get_current_datetime2()
-                    modified_content = f"{content}\n\n⚠️ 注意：此消息非实时发送，实际发生的时间为：\n⌚️ {current_time}"
-                    qq_bot_instance._blocking_group_queue.append((modified_content, group_openid, msg_id, group, is_image))
-                    logger.warning(f"msg_seq已达到上限(5)，添加到阻塞消息队列(_blocking_group_queue)，信息是：{modified_content}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
-                    return f"信息已加入阻塞队列，请耐心等待发送完成，需要群里有新消息才能激活发送。"
-                
-                msg_id = last_group_msg_id
-            else:
+            content, group_openid, msg_id, group, is_image = message.content, message.target, message.msg_id, message.group, message.is_image
+
+            # 为该群选择仍然有效的被动回复窗口
+            reply_window = self.reply_windows.acquire(QQChannel.group, group_openid, msg_id)
+            if reply_window is None:
                 current_time = get_current_datetime2()
                 modified_content = f"{content}\n\n⚠️ 注意：此消息非实时发送，实际发生的时间为：\n⌚️ {current_time}"
-                qq_bot_instance._blocking_group_queue.append((modified_content, group_openid, msg_id, group, is_image))
-                logger.warning(f"QQ消息已加入阻塞消息队列(_blocking_group_queue)，信息是：{modified_content}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
-                logger.critical(f"这是msg_seq_map状态:{seq_manager.get_current_state()}")
-                return f"信息已加入阻塞队列，请耐心等待发送完成，需要群里@机器人，或者私聊机器人，即可发送。"
+                blocked_message = message.model_copy(update={"content": modified_content})
+                self.blocking_queues.push(blocked_message)
+                self.dispatcher.report_blocked(blocked_message)
+                logger.warning(f"该群没有可用的msg_id或msg_seq已达到上限，QQ消息已加入阻塞消息队列，信息是：{modified_content}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
+                return f"信息已加入阻塞队列，请耐心等待发送完成，需要群里@机器人，即可发送。"
+            msg_id, msg_seq = reply_window
 
             try:
                 params = {
                     "group_openid": group_openid,
-                    "msg_id": str(last_group_msg_id),
+                    "msg_id": str(msg_id),
                     "msg_seq": msg_seq
                 }
                 if is_image is True:
@@ -239,16 +314,12 @@ class QQBot(botpy.Client):
                 post_group_message = await self.api.post_group_message(**params)
                 logger.debug(f"这是post_group_message：\n{post_group_message}")
                 logger.success(f"QQ群聊@消息发送成功")
+                self.dispatcher.report_success(message)
             except Exception as e:
                 logger.error(f"QQ群聊@消息发送失败: {str(e)}")
-                failed_content = f"\n❗️ 错误：消息发送失败：{desensitize_message(str(e))}"
-                retry_count += 1
-                MAX_RETRY = 3
-                if retry_count <= MAX_RETRY:
-                    self._group_at_message_queue.append((failed_content, group_openid, msg_id, group, is_image, retry_count))
-                    logger.warning(f"QQ群聊@消息发送失败，已重试{retry_count}次，将再次尝试。")
-                else:
-                    logger.error(f"QQ群聊@消息发送失败，重试已达上限({MAX_RETRY})，不再重试。内容：{failed_content}")
+                # 按重试策略重新发送原始消息，或记录为死信
+                self.dispatcher.report_error(message, e)
+                return
 
             try:
                 # 由于qq的api无法接收机器人自己的消息，所以需要手动添加
@@ -261,52 +332,30 @@ class QQBot(botpy.Client):
                     content=_content,
                     msg_id=_msg_id,
                 )
-                message_obj.id = add_message(message_obj)
-                logger.debug(f"qq机器人的消息已保存，id：{message_obj.id}")
+                save_bot_message(message_obj)
             except  Exception as e:
                 logger.error(f"保存qq机器人消息失败: {str(e)}")
 
-        async def process_c2c_message(msg_data):
-            nonlocal last_c2c_msg_id, last_c2c_msg_time
+        async def process_c2c_message(message: OutboundMessage):
             post_c2c_message = ""
             # 实现私聊消息发送逻辑
-            # 参数兼容处理
-            if len(msg_data) == 4:
-                content, user_openid, msg_id, is_image = msg_data
-                retry_count = 0
-            else:
-                content, user_openid, msg_id, is_image, retry_count = msg_data        
-            # 获取当前时间戳
-            _current_time = get_current_timestamp()
-            # 如果收到新消息(msg_id不为None)，而且msg_id与上次的msg_id不同，则发送消息，更新最后消息ID和时间
-            if msg_id is not None and msg_id != last_c2c_msg_id:
-                last_c2c_msg_id = msg_id
-                last_c2c_msg_time = _current_time
-                # 为新msg_id初始化msg_seq
-                msg_seq = seq_manager.get_seq(msg_id)
-            # 如果msg_id为空，代表这个消息任务是主动发送的，检查上一条消息ID是否在有效期内
-            elif last_c2c_msg_id and (_current_time - last_c2c_msg_time < 300):
-                if seq_manager.get_seq(last_c2c_msg_id) >= 5:
-                    current_time = get_current_datetime2()
-                    modified_content = f"{content}\n\n⚠️ 注意：此消息非实时发送，实际发生的时间为：\n⌚️ {current_time}"
-                    qq_bot_instance._blocking_c2c_queue.append((modified_content, user_openid, msg_id, is_image))
-                    logger.warning(f"msg_seq已达到上限(5)，添加到阻塞消息队列(_blocking_c2c_queue)，信息是：{modified_content}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
-                    return f"信息已加入阻塞队列，请耐心等待发送完成，需要有新消息才能激活发送。"
-                msg_id = last_c2c_msg_id
-                # 获取并递增当前msg_id对应的msg_seq
-                msg_seq = seq_manager.get_seq(msg_id)
-            # 如果上一条消息ID没有或已过期，将消息添加到阻塞队列
-            else:
+            content, user_openid, msg_id, is_image = message.content, message.target, message.msg_id, message.is_image
+            # 为该用户选择仍然有效的被动回复窗口
+            reply_window = self.reply_windows.acquire(QQChannel.c2c, user_openid, msg_id)
+            if reply_window is None:
                 current_time = get_current_datetime2()
                 modified_content = f"{content}\n\n⚠️ 注意：此消息非实时发送，实际发生的时间为：\n⌚️ {current_time}"
-                qq_bot_instance._blocking_c2c_queue.append((modified_content, user_openid, msg_id, is_image))
-                logger.warning(f"QQ消息已加入阻塞消息队列(_blocking_c2c_queue)，信息是：{modified_content}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                blocked_message = message.model_copy(update={"content": modified_content})
+                self.blocking_queues.push(blocked_message)
+                self.dispatcher.report_blocked(blocked_message)
+                logger.warning(f"该用户没有可用的msg_id或msg_seq已达到上限，QQ消息已加入阻塞消息队列，信息是：{modified_content}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
                 return f"信息已加入阻塞队列，请耐心等待发送完成，需要私聊机器人，即可发送。"
-        
+            msg_id, msg_seq = reply_window
+
             try:
                 params = {
                     "openid": user_openid,
-                    "msg_id": str(last_c2c_msg_id),
+                    "msg_id": str(msg_id),
                     "msg_seq": msg_seq
                 }
                 if is_image is True:
@@ -324,16 +373,12 @@ class QQBot(botpy.Client):
                 post_c2c_message = await self.api.post_c2c_message(**params)
                 logger.debug(f"这是post_c2c_message：\n{post_c2c_message}")
                 logger.success(f"QQ私聊消息发送成功，内容：{content}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                self.dispatcher.report_success(message)
             except Exception as e:
                 logger.error(f"QQ私聊消息发送失败: {str(e)}")
-                failed_content = f"\n❗️ 错误：消息发送失败：{desensitize_message(str(e))}"
-                retry_count += 1
-                MAX_RETRY = 3
-                if retry_count <= MAX_RETRY:
-                    self._c2c_message_queue.append((failed_content, user_openid, msg_id, is_image, retry_count))
-                    logger.warning(f"QQ私聊消息发送失败，已重试{retry_count}次，将再次尝试。")
-                else:
-                    logger.error(f"QQ私聊消息发送失败，重试已达上限({MAX_RETRY})，不再重试。内容：{failed_content}")
+                # 按重试策略重新发送原始消息，或记录为死信
+                self.dispatcher.report_error(message, e)
+                return
         
             try:
                 # 由于qq的api无法接收机器人自己的消息，所以需要手动添加
@@ -344,64 +389,91 @@ class QQBot(botpy.Client):
                     content=content,
                     msg_id=_msg_id,
                 )
-                message_obj.id = add_message(message_obj)
-                logger.debug(f"qq机器人的消息已保存，id：{message_obj.id}")
+                save_bot_message(message_obj)
             except Exception as e:
                 logger.error(f"保存qq机器人消息失败: {str(e)}")
 
-    
-        # 消息队列与处理函数的映射
-        queue_handlers = {
-            '_direct_message_queue': process_direct_message,
-            '_group_at_message_queue': process_group_at_message,
-            '_c2c_message_queue': process_c2c_message
+        # 发送渠道与处理函数的映射
+        return {
+            QQChannel.direct: process_direct_message,
+            QQChannel.group: process_group_at_message,
+            QQChannel.c2c: process_c2c_message,
         }
-    
-        while True:
-            processed_any = False
-    
-            # 轮询处理所有队列
-            for queue_name, handler in queue_handlers.items():
-                queue = getattr(self, queue_name, [])
-                if queue:
-                    # 获取并处理一条消息
-                    logger.warning(f"正在处理队列任务：{queue_name}:\n{queue}")
-                    msg_data = queue.pop(0)
-                    await handler(msg_data)
-                    processed_any = True
-                    logger.success(f"处理完成队列任务：{queue_name}:\n{queue}")
-    
-            # 如果所有队列都为空，等待一段时间再检查
-            if not processed_any:
-                await asyncio.sleep(1)
-            else:
-                # 短暂暂停避免消息发送过快
-                await asyncio.sleep(0.1)
+
+    async def _submit_message(
+        self,
+        key: str,
+        message_obj: Message,
+        release: Optional[Tuple[QQChannel, str]] = None,
+    ):
+        """
+        将收到的消息交给消息处理线程，同一会话的消息按顺序处理
+        :param key: 会话标识
+        :param message_obj: 消息对象
+        :param release: 处理完成后需要释放阻塞消息的发送渠道和目标
+        """
+        if self.message_workers is None:
+            await self._process_message(message_obj, release)
+            return
+        # 队列已满且策略为 block 时在线程池中等待，不阻塞网关事件循环
+        await self.message_workers.submit_async(key, (message_obj, release))
+
+    async def _process_message(
+        self, message_obj: Message, release: Optional[Tuple[QQChannel, str]] = None
+    ):
+        """
+        保存并处理收到的消息，在消息处理线程中执行
+        """
+        # 保存该消息，并添加或更新发送者和所在群组（批量写入数据库，写入后得到消息 id）
+        ingest_message(message_obj)
+        # DEBUG
+        logger.debug(str(message_obj))
+        # 用户发来的消息均送给消息解析器处理
+        await message_handler.handle_message(message_obj)
+        if release is not None:
+            # 释放该群/用户的阻塞消息，数量不超过剩余的回复次数
+            # 回复窗口和阻塞队列只在网关事件循环中访问
+            self._event_loop.call_soon_threadsafe(self._release_blocked_messages, *release)
+
+    def _release_blocked_messages(self, channel: QQChannel, target: str):
+        """收到目标的新消息后，将该目标的阻塞消息重新加入发送队列"""
+        # 先为已入队、尚未发送的回复（如仍在合并器中的命令回复）预留 msg_seq，
+        # 释放的阻塞消息只使用剩下的回复次数，不会占用新回复的位置
+        budget = self.reply_windows.remaining(channel, target) - self.dispatcher.queued_count(
+            channel, target
+        )
+        if budget <= 0:
+            return
+        released = self.blocking_queues.pop(channel, target, budget)
+        for blocked_message in released:
+            self.enqueue_message(blocked_message)
+        if released:
+            logger.warning(
+                f"收到新消息，已释放 {channel.value} {target} 的 {len(released)} 条阻塞消息，"
+                f"剩余 {self.blocking_queues.count(channel)} 条阻塞消息"
+            )
 
     async def _check_blocking_queues(self):
         """定期检查阻塞队列，尝试处理其中的消息"""
-        import asyncio
-    
         # 每隔多少秒检查一次阻塞队列
         CHECK_INTERVAL = 180  # 3分钟检查一次
     
         while True:
             # 等待指定时间
             await asyncio.sleep(CHECK_INTERVAL)
+
+            # 检查发送队列各分片的积压情况
+            shard_depths = self.dispatcher.shard_depths()
+            if any(shard_depths):
+                logger.warning(f"定期检查：发送队列各分片积压消息数：{shard_depths}")
     
-            # 检查群聊阻塞队列
-            if hasattr(self, '_blocking_group_queue') and self._blocking_group_queue:
-                blocked_count = len(self._blocking_group_queue)
-                logger.warning(f"定期检查：群聊阻塞队列中有 {blocked_count} 条消息待处理")
-                logger.debug(f"qq群聊阻塞队列（_blocking_group_queue）：{self._blocking_group_queue}")
-    
-    
-            # 检查私聊阻塞队列
-            if hasattr(self, '_blocking_c2c_queue') and self._blocking_c2c_queue:
-                blocked_count = len(self._blocking_c2c_queue)
-                logger.warning(f"定期检查：私聊阻塞队列中有 {blocked_count} 条消息待处理")
-                logger.debug(f"qq私聊阻塞队列（_blocking_c2c_queue）：{self._blocking_c2c_queue}")
-                
+            # 检查各群/用户阻塞消息的积压情况
+            for channel, target, count, age in self.blocking_queues.backlog():
+                logger.warning(
+                    f"定期检查：{channel.value} {target} 有 {count} 条阻塞消息待处理，"
+                    f"最早一条已阻塞 {int(age)} 秒"
+                )
+
     async def on_direct_message_create(self, message: DirectMessage):
         """
         当收到qq频道私信消息时
@@ -422,6 +494,10 @@ class QQBot(botpy.Client):
             'event_id': 'DIRECT_MESSAGE_CREATE:08d3f7ccb4a59990f0121095afd2e9e398e3870138890148cae985c106'
         }
         """
+        # 断线重连后 botpy 可能重复投递事件
+        if is_duplicate_event(f"qq:{message.id}"):
+            logger.info(f"忽略重复的频道私信事件：{message.id}")
+            return
         logger.info(f"收到私信: {message.content}")
         # 适配wechatter的消息对象
         _type = MessageType.text
@@ -437,76 +513,13 @@ class QQBot(botpy.Client):
                 _type = MessageType.file
 
                     
-        # 构建source
-        # message.author.id没有用，message.guild_id才有用，用作qq频道私信fa发送信息的的guild_id
-        author_dict = json.loads(json.dumps({"id": message.guild_id, "username": message.author.username, "avatar": message.author.avatar}))
-
-        # 构建source字典
-        source_dict = {
-            "from": {
-                "id": author_dict["id"],
-                "payload": {
-                    "alias": "",
-                    "avatar": author_dict["avatar"],
-                    "city": "",
-                    "friend": True,
-                    "gender": 1,  # 默认为男性
-                    "id": author_dict["id"],
-                    "name": author_dict["username"],
-                    "phone": [],
-                    "province": "",
-                    "star": False,
-                    "type": 1
-                },
-                "_events": {},
-                "_eventsCount": 0,
-            },
-            # 这是私信消息，不是群消息，所以room为空字符串
-            "room": "",
-            # 接收者信息(机器人)
-            # 可以不用设置to，因为qq机器人无法接受自己的消息，这个to为了_receiver，而_receiver是为了转发消息，但是qq机器人不支持
-            "to": {
-                "id": str(self.robot.id),
-                "payload": {
-                    "alias": "",
-                    "avatar": str(self.robot.avatar),
-                    "friend": False,
-                    "gender": 1,
-                    "id": str(self.robot.id),
-                    "name": str(self.robot.name),
-                    "phone": [],
-                    "signature": "",
-                    "star": False,
-                    "type": 1
-                },
-                "_events": {},
-                "_eventsCount": 0,
-            }
-        }
-        
-        # 转换为JSON字符串
-        source = json.dumps(source_dict)
-        is_mentioned = "0"
-        is_from_self = "0"
-        # 解析命令
-        # 构造消息对象
-        message_obj = Message.from_api_direct_message(
+        # 直接映射 botpy 消息字段，不再构建 source 并进行 JSON 序列化
+        message_obj = Message.from_qq_direct_message(
             type=_type,
             qq_directmessage=message,
-            content=message.content or ".",
-            source=source,
-            is_mentioned=is_mentioned,
-            is_from_self=is_from_self,
-            attachments=message.attachments,
+            robot=self.robot,
         )
-        # 向用户表中添加该用户
-        add_person(message_obj.person)
-        # 向消息表中添加该消息
-        message_obj.id = add_message(message_obj)
-        # DEBUG
-        logger.debug(str(message_obj))
-        # 用户发来的消息均送给消息解析器处理
-        await message_handler.handle_message(message_obj)
+        await self._submit_message(f"direct:{message.guild_id}", message_obj)
 
     async def on_group_at_message_create(self, message: GroupMessage):
         """
@@ -524,6 +537,10 @@ class QQBot(botpy.Client):
             'event_id': 'GROUP_AT_MESSAGE_CREATE:hgda5vcocxiqddr28qjydk1wdgg79js8xq7yjlrq8ypuv957wseidnfe0ixfc6s'
         }
         """
+        # 断线重连后 botpy 可能重复投递事件
+        if is_duplicate_event(f"qq:{message.id}"):
+            logger.info(f"忽略重复的群消息事件：{message.id}")
+            return
         logger.info(f"收到私信:{message.content}")
         # 适配wechatter的消息对象
         _type = MessageType.text
@@ -537,83 +554,19 @@ class QQBot(botpy.Client):
                 if attachment.content_type and attachment.content_type == "voice":
                     logger.info(f"收到语音：{attachment.filename}，attachment：{attachment}")
                 _type = MessageType.file
-        # 构建source
-        author_dict = json.loads(json.dumps({"member_openid": message.author.member_openid}))
-
-        # 构建source字典
-        source_dict = {
-            "from": {
-                "id": author_dict["member_openid"],
-                "payload": {
-                    "alias": "",
-                    "avatar": "",
-                    "city": "",
-                    "friend": True,
-                    "gender": 1,  # 默认为男性
-                    "id": author_dict["member_openid"],
-                    "name": "",
-                    "phone": [],
-                    "province": "",
-                    "star": False,
-                    "type": 1
-                },
-                "_events": {},
-                "_eventsCount": 0,
-            },
-            "room": {
-                "id":message.group_openid,
-                "topic": message.group_openid, #qq不支持查看群名，因此暂时把群名设置成群id
-                "payload": {
-                    "id": "",
-                    "adminIdList": [],
-                    "avatar": "",
-                    "memberList": [],
-                },
-                "_events": {},
-                "_eventsCount": 0,
-            },
-            "to": ""
-        }
-
-        # 转换为JSON字符串
-        source = json.dumps(source_dict)
-        is_mentioned = "1"
-        is_from_self = "0"
-        # 解析命令
-        # 构造消息对象
-        message_obj = Message.from_api_group_at_message(
+        # 直接映射 botpy 消息字段，不再构建 source 并进行 JSON 序列化
+        message_obj = Message.from_qq_group_message(
             type=_type,
             qq_groupmessage=message,
-            content=message.content or ".",
-            source=source,
-            is_mentioned=is_mentioned,
-            is_from_self=is_from_self,
-            attachments=message.attachments,
         )
-        # 向群组表中添加该群组
-        add_group(message_obj.group)
-        # 向用户表中添加该用户
-        add_person(message_obj.person)
-        # 向消息表中添加该消息
-        message_obj.id = add_message(message_obj)
-        # DEBUG
-        logger.debug(str(message_obj))
-        # 用户发来的消息均送给消息解析器处理
-        await message_handler.handle_message(message_obj)
-
-        # 处理阻塞队列中的消息
-        if hasattr(self, '_blocking_group_queue') and self._blocking_group_queue:
-            logger.warning(f"收到新消息，尝试处理qq群阻塞消息队列(_blocking_group_queue)中的消息，当前队列长度：{len(self._blocking_group_queue)}")
-            logger.debug(f"qq群阻塞消息队列(_blocking_group_queue):{self._blocking_group_queue}")
-            # 最多处理5条消息（因为一个msg_id最多只能回复5次）
-            messages_to_process = min(5, len(self._blocking_group_queue))
-            logger.warning(f"本次将处理 {messages_to_process} 条qq群阻塞消息队列")
-    
-            # 将部分阻塞队列消息添加到正常队列
-            for i in range(messages_to_process):
-                blocked_msg = self._blocking_group_queue.pop(0)  # 从队列头部取出消息
-                self._group_at_message_queue.append(blocked_msg)
-            logger.warning(f"处理后qq群阻塞消息队列剩余 {len(self._blocking_group_queue)} 条消息")
+        # 刷新该群的被动回复窗口
+        self.reply_windows.refresh(QQChannel.group, message.group_openid, message.id)
+        # 处理完成后释放该群的阻塞消息
+        await self._submit_message(
+            f"group:{message.group_openid}",
+            message_obj,
+            release=(QQChannel.group, message.group_openid),
+        )
 
     async def on_c2c_message_create(self, message: C2CMessage):
         """
@@ -631,6 +584,10 @@ class QQBot(botpy.Client):
         }
 
         """
+        # 断线重连后 botpy 可能重复投递事件
+        if is_duplicate_event(f"qq:{message.id}"):
+            logger.info(f"忽略重复的私聊消息事件：{message.id}")
+            return
         logger.info(f"收到私信: {message.content}")
         # 适配wechatter的消息对象
         _type = MessageType.text
@@ -644,123 +601,21 @@ class QQBot(botpy.Client):
                 if attachment.content_type and attachment.content_type == "voice":
                     logger.info(f"收到语音：{attachment.filename}，attachment：{attachment}")
                 _type = MessageType.file
-        # 构建source
-        author_dict = json.loads(json.dumps({"id": message.author.user_openid}))
-
-        # 构建source字典
-        source_dict = {
-            "from": {
-                "id": author_dict["id"],
-                "payload": {
-                    "alias": "",
-                    "avatar": "",
-                    "city": "",
-                    "friend": True,
-                    "gender": 1,  # 默认为男性
-                    "id": author_dict["id"],
-                    "name": author_dict["id"],
-                    "phone": [],
-                    "province": "",
-                    "star": False,
-                    "type": 1
-                },
-                "_events": {},
-                "_eventsCount": 0,
-            },
-            # 这是私信消息，不是群消息，所以room为空字符串
-            "room": "",
-            # 接收者信息(机器人)
-            # 不用设置to，因为qq机器人无法接受自己的消息
-            "to": {
-                "id": str(self.robot.id),
-                "payload": {
-                    "alias": "",
-                    "avatar": str(self.robot.avatar),
-                    "friend": False,
-                    "gender": 1,
-                    "id": str(self.robot.id),
-                    "name": str(self.robot.name),
-                    "phone": [],
-                    "signature": "",
-                    "star": False,
-                    "type": 1
-                },
-                "_events": {},
-                "_eventsCount": 0,
-            }
-        }
-
-        # 转换为JSON字符串
-        source = json.dumps(source_dict)
-        is_mentioned = "0"
-        is_from_self = "0"
-        # 解析命令
-        # 构造消息对象
-        message_obj = Message.from_api_c2c_message(
+        # 直接映射 botpy 消息字段，不再构建 source 并进行 JSON 序列化
+        message_obj = Message.from_qq_c2c_message(
             type=_type,
             qq_c2cmessage=message,
-            content=message.content or ".",
-            source=source,
-            is_mentioned=is_mentioned,
-            is_from_self=is_from_self,
-            attachments=message.attachments,
+            robot=self.robot,
+        )
+        # 刷新该用户的被动回复窗口
+        self.reply_windows.refresh(QQChannel.c2c, message.author.user_openid, message.id)
+        # 处理完成后释放该用户的阻塞消息
+        await self._submit_message(
+            f"c2c:{message.author.user_openid}",
+            message_obj,
+            release=(QQChannel.c2c, message.author.user_openid),
         )
-        # 向用户表中添加该用户
-        add_person(message_obj.person)
-        # 向消息表中添加该消息
-        message_obj.id = add_message(message_obj)
-        # DEBUG
-        logger.debug(str(message_obj))
-        # 用户发来的消息均送给消息解析器处理
-        await message_handler.handle_message(message_obj)
-
-        # 处理阻塞队列中的消息
-        if hasattr(self, '_blocking_c2c_queue') and self._blocking_c2c_queue:
-            logger.warning(f"收到新消息，尝试处理qq私聊阻塞消息队列(_blocking_c2c_queue)中的消息，当前队列长度：{len(self._blocking_c2c_queue)}")
-            logger.debug(f"qq私聊阻塞消息队列(_blocking_c2c_queue):{self._blocking_c2c_queue}")
-            # 最多处理5条消息（因为一个msg_id最多只能回复5次）
-            messages_to_process = min(5, len(self._blocking_c2c_queue))
-            logger.warning(f"本次将处理 {messages_to_process} 条qq私聊阻塞消息")
-
-            # 将部分阻塞队列消息添加到正常队列
-            for i in range(messages_to_process):
-                blocked_msg = self._blocking_c2c_queue.pop(0)  # 从队列头部取出消息
-                self._c2c_message_queue.append(blocked_msg)
-            logger.warning(f"处理后qq私聊阻塞消息队列剩余 {len(self._blocking_c2c_queue)} 条消息")
-
-def add_group(group: Group) -> None:
-    """
-    判断群组表中是否有该群组，若没有，则添加该群组
-    """
-    if group is None:
-        return
-    with make_db_session() as session:
-        _group = session.query(DbGroup).filter(DbGroup.id == group.id).first()
-        if _group is None:
-            _group = DbGroup.from_model(group)
-            session.add(_group)
-            # 逐个添加群组成员，若存在则更新
-            for member in group.member_list:
-                _person = (
-                    session.query(DbPerson).filter(DbPerson.id == member.id).first()
-                )
-                if _person is None:
-                    _person = DbPerson.from_member_model(member)
-                    session.add(_person)
-                    session.commit()
-                    logger.debug(f"用户 {member.name} 已添加到数据库")
-                else:
-                    # 更新用户信息
-                    _person.name = member.name
-                    _person.alias = member.alias
-                    session.commit()
 
-            session.commit()
-            logger.debug(f"群组 {group.name} 已添加到数据库")
-        else:
-            # 更新群组信息
-            _group.update(group)
-            session.commit()
 def add_person(person: Person) -> None:
     """
     判断用户表中是否有该用户，若没有，则添加该用户
@@ -776,6 +631,8 @@ def add_person(person: Person) -> None:
             # 更新用户信息
             _person.update(person)
             session.commit()
+    # 收到该用户的消息时重新写入用户信息
+    invalidate_identity(person_ids=[person.id])
 
 
 def add_message(message: Message) -> int:
@@ -790,6 +647,38 @@ def add_message(message: Message) -> int:
         return _message.id
 
 
+def _write_bot_messages(session, messages) -> None:
+    rows = [DbMessage.from_model(message) for message in messages]
+    session.add_all(rows)
+    # 消息 id 由数据库分配，写入后回填到消息对象
+    session.flush()
+    for message, row in zip(messages, rows):
+        message.id = row.id
+
+
+_write_behind_config = config.get("qq_bot", {}).get("write_behind") or {}
+# 机器人发出的消息先缓冲在内存中，由后台线程批量写入数据库，为 None 时同步写入
+sent_message_writer = None
+if _write_behind_config.get("enabled", True):
+    sent_message_writer = BatchWriter(
+        "sent_message",
+        _write_bot_messages,
+        flush_interval=_write_behind_config.get("flush_interval", 0.5),
+        max_batch=_write_behind_config.get("max_batch", 200),
+    )
+
+
+def save_bot_message(message: Message) -> None:
+    """
+    保存机器人发出的消息，不在事件循环中等待数据库提交
+    """
+    if sent_message_writer is None:
+        message.id = add_message(message)
+        logger.debug(f"qq机器人的消息已保存，id：{message.id}")
+        return
+    sent_message_writer.submit(message)
+
+
 # 创建一个全局变量存储QQBot实例
 qq_bot_instance = None
 def create_qq_bot():
@@ -6,17 +6,10 @@ from loguru import logger
 # from wechatter.bot import BotInfo
 from wechatter.commands import commands, quoted_handlers
 from wechatter.config import config
-from wechatter.database import (
-    Group as DbGroup,
-    Message as DbMessage,
-    Person as DbPerson,
-    make_db_session,
-)
+from wechatter.database import ingest_message
 from wechatter.games import games
 from wechatter.message import MessageHandler
 from wechatter.models.wechat import Message
-from wechatter.models.wechat.group import Group
-from wechatter.models.wechat.person import Person
 from wechatter.sender import notifier
 
 router = APIRouter()
@@ -65,12 +58,8 @@ async def recv_wechat_msg(
         is_mentioned=is_mentioned,
         is_from_self=is_from_self,
     )
-    # 向群组表中添加该群组
-    add_group(message_obj.group)
-    # 向用户表中添加该用户
-    add_person(message_obj.person)
-    # 向消息表中添加该消息
-    message_obj.id = add_message(message_obj)
+    # 保存该消息，并添加或更新发送者和所在群组（批量写入数据库）
+    ingest_message(message_obj)
 
     # DEBUG
     print(str(message_obj))
@@ -95,67 +84,3 @@ def handle_system_event(event: str) -> None:
         pass
     else:
         pass
-
-
-def add_group(group: Group) -> None:
-    """
-    判断群组表中是否有该群组，若没有，则添加该群组
-    """
-    if group is None:
-        return
-    with make_db_session() as session:
-        _group = session.query(DbGroup).filter(DbGroup.id == group.id).first()
-        if _group is None:
-            _group = DbGroup.from_model(group)
-            session.add(_group)
-            # 逐个添加群组成员，若存在则更新
-            for member in group.member_list:
-                _person = (
-                    session.query(DbPerson).filter(DbPerson.id == member.id).first()
-                )
-                if _person is None:
-                    _person = DbPerson.from_member_model(member)
-                    session.add(_person)
-                    session.commit()
-                    logger.debug(f"用户 {member.name} 已添加到数据库")
-                else:
-                    # 更新用户信息
-                    _person.name = member.name
-                    _person.alias = member.alias
-                    session.commit()
-
-            session.commit()
-            logger.debug(f"群组 {group.name} 已添加到数据库")
-        else:
-            # 更新群组信息
-            _group.update(group)
-            session.commit()
-
-
-def add_person(person: Person) -> None:
-    """
-    判断用户表中是否有该用户，若没有，则添加该用户
-    """
-    with make_db_session() as session:
-        _person = session.query(DbPerson).filter(DbPerson.id == person.id).first()
-        if _person is None:
-            _person = DbPerson.from_model(person)
-            session.add(_person)
-            session.commit()
-            logger.debug(f"用户 {person.name} 已添加到数据库")
-        else:
-            # 更新用户信息
-            _person.update(person)
-            session.commit()
-
-
-def add_message(message: Message) -> int:
-    """
-    添加消息到消息表
-    """
-    with make_db_session() as session:
-        _message = DbMessage.from_model(message)
-        session.add(_message)
-        session.commit()
-        logger.debug(f"消息 {_message.id} 已添加到数据库")
-        return _message.id
@@ -0,0 +1 @@
+# 性能测试工具，不会被机器人运行时导入
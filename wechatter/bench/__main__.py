@@ -0,0 +1,3 @@
+from wechatter.bench.load_test import main
+
+main()
@@ -0,0 +1,231 @@
+"""
+索引迁移测试：在百万条消息的数据库上，对比执行迁移（添加索引）前后常用查询的耗时。
+
+数据库先按旧的表结构（没有迁移中的索引）建表并填充数据，再执行 run_migrations。
+
+用法：python -m wechatter.bench.db_indexes [--messages 1000000] [--persons 10000] [--repeat 20]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import Engine, select, text
+
+from wechatter.bench.utils import quiet_logger, use_temp_database
+
+BATCH_SIZE = 50000
+
+
+def _index_migrations():
+    """
+    只测试添加索引的迁移（全文索引见 message_search）
+    """
+    from wechatter.database.migrations import MIGRATIONS
+
+    return [migration for migration in MIGRATIONS if migration.version == 1]
+
+
+def _insert_rows(engine: Engine, table: str, rows: List[tuple]) -> None:
+    placeholders = ", ".join("?" * len(rows[0]))
+    with engine.begin() as conn:
+        for i in range(0, len(rows), BATCH_SIZE):
+            conn.exec_driver_sql(
+                f'INSERT INTO "{table}" VALUES ({placeholders})',
+                rows[i : i + BATCH_SIZE],
+            )
+
+
+def build_database(engine: Engine, args) -> None:
+    """
+    建表后删除迁移中的索引（模拟已有的旧数据库），再填充测试数据
+    """
+    from wechatter.database.tables import Base
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for migration in _index_migrations():
+            for statement in migration.statements:
+                name = re.search(r"IF NOT EXISTS (\w+)", statement).group(1)
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text("PRAGMA user_version = 0"))
+
+    rng = random.Random(0)
+    _insert_rows(
+        engine,
+        "person",
+        [
+            (
+                f"person-{i}",
+                f"name-{i}",
+                None,
+                "unknown",
+                None,
+                None,
+                False,
+                True,
+                False,
+                False,
+            )
+            for i in range(args.persons)
+        ],
+    )
+    _insert_rows(
+        engine,
+        "message",
+        [
+            (
+                i + 1,
+                f"person-{rng.randrange(args.persons)}",
+                None,
+                "text",
+                f"message-{i}",
+                "2024-01-01 00:00:00",
+                False,
+                False,
+                f"msg-{i}",
+            )
+            for i in range(args.messages)
+        ],
+    )
+    quoted = args.messages // 10
+    _insert_rows(
+        engine,
+        "quoted_response",
+        [(i + 1, f"q{i}", "weather", "response") for i in range(quoted)],
+    )
+    _insert_rows(
+        engine,
+        "gpt_chat_info",
+        [
+            (
+                i + 1,
+                f"person-{i % args.persons}",
+                "topic",
+                f"model-{i % 5}",
+                "2024-01-01 00:00:00",
+                "2024-01-01 00:00:00",
+                i % 20 == 0,
+            )
+            for i in range(args.persons * 5)
+        ],
+    )
+    _insert_rows(
+        engine,
+        "game_states",
+        [
+            (
+                i + 1,
+                f"person-{i % args.persons}",
+                f"group-{i % 1000}",
+                "Game",
+                "{}",
+                i % 50 != 0,
+                "2024-01-01 00:00:00",
+            )
+            for i in range(args.persons * 5)
+        ],
+    )
+    _insert_rows(
+        engine,
+        "command_stats",
+        [(i + 1, f"command-{i}", i, None) for i in range(200)],
+    )
+
+
+def make_queries(args) -> Dict[str, Callable]:
+    from wechatter.database import (
+        CommandStats,
+        GameStates,
+        GptChatInfo,
+        Message,
+        Person,
+        QuotedResponse,
+    )
+
+    rng = random.Random(1)
+    return {
+        "引用消息 message.msg_id": lambda: select(Message.id).where(
+            Message.msg_id == f"msg-{rng.randrange(args.messages)}"
+        ),
+        "引用回复 quoted_response.quotable_id": lambda: select(QuotedResponse.id)
+        .where(QuotedResponse.quotable_id == f"q{rng.randrange(args.messages // 10)}")
+        .order_by(QuotedResponse.id.desc())
+        .limit(1),
+        "当前对话 gpt_chat_info": lambda: select(GptChatInfo.id).where(
+            GptChatInfo.person_id == f"person-{rng.randrange(args.persons)}",
+            GptChatInfo.model == "model-0",
+            GptChatInfo.is_chatting.is_(True),
+        ),
+        "未结束的游戏 game_states": lambda: select(GameStates.id).where(
+            GameStates.host_group_id == f"group-{rng.randrange(1000)}",
+            GameStates.is_over.is_(False),
+        ),
+        "群发 person.name": lambda: select(Person.id).where(
+            Person.name == f"name-{rng.randrange(args.persons)}"
+        ),
+        "命令统计 command_stats.command_name": lambda: select(CommandStats.id).where(
+            CommandStats.command_name == f"command-{rng.randrange(200)}"
+        ),
+    }
+
+
+def time_queries(
+    engine: Engine, queries: Dict[str, Callable], repeat: int
+) -> Dict[str, float]:
+    """
+    :return: 每个查询耗时的中位数（毫秒）
+    """
+    results = {}
+    with engine.connect() as conn:
+        for name, make_stmt in queries.items():
+            timings = []
+            for _ in range(repeat):
+                stmt = make_stmt()
+                start = time.perf_counter()
+                conn.execute(stmt).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="索引迁移前后的查询耗时")
+    parser.add_argument("--messages", type=int, default=1000000, help="消息表行数")
+    parser.add_argument("--persons", type=int, default=10000, help="用户表行数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询执行的次数")
+    args = parser.parse_args()
+
+    quiet_logger()
+    from wechatter.database import make_db_session
+    from wechatter.database.migrations import get_schema_version, run_migrations
+
+    path = use_temp_database()
+    engine = make_db_session.kw["bind"]
+    start = time.perf_counter()
+    build_database(engine, args)
+    print(
+        f"临时数据库：{path}，填充 {args.messages} 条消息耗时 {time.perf_counter() - start:.1f}s"
+    )
+
+    queries = make_queries(args)
+    before = time_queries(engine, queries, args.repeat)
+    start = time.perf_counter()
+    run_migrations(engine, _index_migrations())
+    print(
+        f"迁移到版本 {get_schema_version(engine)} 耗时 {time.perf_counter() - start:.1f}s"
+    )
+    after = time_queries(engine, queries, args.repeat)
+
+    for name in queries:
+        print(
+            f"{name}：{before[name]:.3f}ms -> {after[name]:.3f}ms"
+            f"（{before[name] / max(after[name], 1e-6):.0f} 倍）"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+数据库写入吞吐测试：SQLAlchemy 默认配置与性能配置（WAL、synchronous=NORMAL、busy_timeout、
+连接池和 expire_on_commit=False）下，多线程逐条写入消息的吞吐、提交延迟和锁冲突次数。
+
+每个线程模拟收到消息时的数据库操作：查询用户，写入一条消息并提交，读取新消息的 id。
+
+用法：python -m wechatter.bench.db_write [--threads 8] [--count 200] [--persons 50]
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy.exc import OperationalError
+
+from wechatter.bench.utils import percentile, quiet_logger, use_temp_database
+
+
+def _write_messages(
+    thread_index: int, args, latencies: List[float], errors: List[str]
+) -> None:
+    from wechatter.database import (
+        Message as DbMessage,
+        Person as DbPerson,
+        make_db_session,
+    )
+
+    for i in range(args.count):
+        person_id = f"bench-person-{(thread_index * args.count + i) % args.persons}"
+        start = time.perf_counter()
+        try:
+            with make_db_session() as session:
+                session.query(DbPerson).filter(DbPerson.id == person_id).first()
+                message = DbMessage(
+                    person_id=person_id,
+                    type="text",
+                    content=f"bench-{thread_index}-{i}",
+                )
+                session.add(message)
+                session.commit()
+                # 与 add_message 一样在提交后读取 id
+                _ = message.id
+        except OperationalError as e:
+            errors.append(str(e.orig))
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run(args, profiled: bool) -> Dict:
+    from wechatter.database import Person as DbPerson, make_db_session
+
+    path = use_temp_database(profiled=profiled)
+    make_db_session.configure(expire_on_commit=not profiled)
+    with make_db_session() as session:
+        session.add_all(
+            DbPerson(id=f"bench-person-{i}", name=f"bench-person-{i}", gender="unknown")
+            for i in range(args.persons)
+        )
+        session.commit()
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    threads = [
+        threading.Thread(target=_write_messages, args=(i, args, latencies, errors))
+        for i in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    make_db_session.kw["bind"].dispose()
+    return {
+        "mode": "profiled" if profiled else "default",
+        "path": path,
+        "written": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库写入吞吐测试")
+    parser.add_argument("--threads", type=int, default=8, help="并发写入线程数")
+    parser.add_argument("--count", type=int, default=200, help="每个线程写入的消息数")
+    parser.add_argument("--persons", type=int, default=50, help="用户数量")
+    args = parser.parse_args()
+
+    quiet_logger()
+    for profiled in (False, True):
+        r = run(args, profiled)
+        print(
+            f"[{r['mode']}] 写入 {r['written']} 条，锁冲突失败 {r['errors']} 条，耗时 {r['elapsed_s']:.2f}s，"
+            f"吞吐 {r['throughput']:.1f} 条/s，提交延迟 p50 {r['p50_ms']:.2f}ms / p99 {r['p99_ms']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+QQ 消息发送调度器延迟测试：从入队到调用 post_*_message 的端到端延迟
+
+用法：python -m wechatter.bench.dispatcher_latency [--count 200] [--rate 50] [--latency 0.005] [--legacy] [--rate-limit]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from typing import Dict, List
+
+from wechatter.bench.stub_api import StubQQApi
+from wechatter.bench.utils import make_bench_bot, percentile, quiet_logger
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+CHANNELS = [QQChannel.group, QQChannel.c2c, QQChannel.direct]
+
+
+def _make_messages(count: int) -> List[OutboundMessage]:
+    messages = []
+    for i in range(count):
+        channel = CHANNELS[i % len(CHANNELS)]
+        messages.append(
+            OutboundMessage(
+                channel=channel,
+                target=f"{channel.value}-target-{i % 7}",
+                content=f"bench-{i}",
+                # 每条消息都带上新的 msg_id，模拟被动回复
+                msg_id=f"bench-msg-{i}",
+            )
+        )
+    return messages
+
+
+async def _legacy_poll(handlers: Dict, queues: Dict, stop: threading.Event):
+    """
+    旧版轮询逻辑：轮询三个列表，pop(0)，空闲时 sleep(1)，发送后 sleep(0.1)
+    """
+    while not stop.is_set():
+        processed_any = False
+        for channel, queue in queues.items():
+            if queue:
+                await handlers[channel](queue.pop(0))
+                processed_any = True
+        if not processed_any:
+            await asyncio.sleep(1)
+        else:
+            await asyncio.sleep(0.1)
+
+
+async def run(
+    count: int, rate: float, latency: float, legacy: bool, rate_limit: bool = False
+) -> Dict:
+    import wechatter.app.routers.qq_bot as qq_bot
+
+    # 只测量调度延迟，不写数据库
+    qq_bot.add_message = lambda message: None
+    qq_bot.sent_message_writer = None
+
+    api = StubQQApi(latency=latency)
+    bot = make_bench_bot(api)
+    if not rate_limit:
+        bot.dispatcher.rate_limiter = None
+    messages = _make_messages(count)
+    # 模拟先收到用户消息，使被动回复窗口可用
+    for message in messages:
+        if message.channel != QQChannel.direct:
+            bot.reply_windows.refresh(message.channel, message.target, message.msg_id)
+    enqueue_times = {}
+
+    stop = threading.Event()
+    if legacy:
+        queues = {channel: [] for channel in CHANNELS}
+        poll_task = asyncio.create_task(
+            _legacy_poll(bot._build_send_handlers(), queues, stop)
+        )
+
+        def enqueue(message):
+            queues[message.channel].append(message)
+
+    else:
+        bot._start_message_dispatch()
+        enqueue = bot.enqueue_message
+
+    # 在另一个线程中按固定速率入队，模拟 APScheduler / run_in_thread 线程
+    def producer():
+        interval = 1 / rate if rate > 0 else 0
+        for message in messages:
+            enqueue_times[message.content] = time.perf_counter()
+            enqueue(message)
+            if interval:
+                time.sleep(interval)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    while len(api.calls) < count:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    if legacy:
+        poll_task.cancel()
+    else:
+        await bot.dispatcher.stop()
+        bot._check_blocking_queue_task.cancel()
+
+    latencies = [
+        (called_at - enqueue_times[params["content"]]) * 1000
+        for _, params, called_at in api.calls
+    ]
+    return {
+        "mode": "legacy" if legacy else "dispatcher",
+        "count": count,
+        "elapsed_s": elapsed,
+        "throughput": count / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QQ 消息发送调度器延迟测试")
+    parser.add_argument("--count", type=int, default=200, help="发送消息数量")
+    parser.add_argument(
+        "--rate", type=float, default=50, help="每秒入队消息数，0 表示一次性入队"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="模拟 API 耗时（秒）"
+    )
+    parser.add_argument("--legacy", action="store_true", help="同时测试旧版轮询逻辑")
+    parser.add_argument(
+        "--rate-limit", action="store_true", help="启用配置中的发送限流"
+    )
+    args = parser.parse_args()
+
+    quiet_logger()
+    results = [
+        asyncio.run(
+            run(
+                args.count,
+                args.rate,
+                args.latency,
+                legacy=False,
+                rate_limit=args.rate_limit,
+            )
+        )
+    ]
+    if args.legacy:
+        results.append(
+            asyncio.run(run(args.count, args.rate, args.latency, legacy=True))
+        )
+
+    for r in results:
+        print(
+            f"[{r['mode']}] {r['count']} 条消息，耗时 {r['elapsed_s']:.2f}s，"
+            f"吞吐 {r['throughput']:.1f} 条/s，延迟 p50 {r['p50_ms']:.2f}ms / "
+            f"p95 {r['p95_ms']:.2f}ms / p99 {r['p99_ms']:.2f}ms / max {r['max_ms']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+收到消息的入库测试：逐条写入（旧版 add_group / add_person / add_message，每条消息多次提交）
+与批量写入（ingest_message，每个刷新间隔一个事务）时，多个消息处理线程的吞吐和数据库提交次数。
+
+用法：python -m wechatter.bench.ingest_write [--count 2000] [--threads 4] [--groups 20] [--users 50]
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from botpy.message import C2CMessage, GroupMessage
+from botpy.robot import Robot
+from sqlalchemy import event
+
+from wechatter.bench.utils import percentile, quiet_logger, use_temp_database
+from wechatter.models.wechat import Message, MessageType
+
+_legacy_lock = threading.Lock()
+
+
+def _legacy_ingest(message: Message) -> int:
+    """
+    旧版的入库流程：先查询再插入或更新，每一步单独提交
+    """
+    from wechatter.database import (
+        Group as DbGroup,
+        Message as DbMessage,
+        Person as DbPerson,
+        make_db_session,
+    )
+
+    with _legacy_lock:
+        if message.group is not None:
+            with make_db_session() as session:
+                _group = (
+                    session.query(DbGroup)
+                    .filter(DbGroup.id == message.group.id)
+                    .first()
+                )
+                if _group is None:
+                    session.add(DbGroup.from_model(message.group))
+                else:
+                    _group.name = message.group.name
+                    _group.is_gaming = message.group.is_gaming
+                session.commit()
+        with make_db_session() as session:
+            _person = (
+                session.query(DbPerson).filter(DbPerson.id == message.person.id).first()
+            )
+            if _person is None:
+                session.add(DbPerson.from_model(message.person))
+            else:
+                _person.update(message.person)
+            session.commit()
+        with make_db_session() as session:
+            _message = DbMessage.from_model(message)
+            session.add(_message)
+            session.commit()
+            return _message.id
+
+
+def make_messages(args) -> List[Message]:
+    robot = Robot({"id": "10000", "username": "bench-bot", "avatar": ""})
+    messages = []
+    for seq in range(args.count):
+        if seq % 3 == 0:
+            event_ = C2CMessage(
+                None,
+                f"C2C_MESSAGE_CREATE:bench-{seq}",
+                {
+                    "author": {"user_openid": f"bench-user-{seq % args.users}"},
+                    "content": f"/w {seq}",
+                    "id": f"bench-msg-{seq}",
+                },
+            )
+            messages.append(
+                Message.from_qq_c2c_message(MessageType.text, event_, robot)
+            )
+        else:
+            event_ = GroupMessage(
+                None,
+                f"GROUP_AT_MESSAGE_CREATE:bench-{seq}",
+                {
+                    "author": {"member_openid": f"bench-member-{seq % args.users}"},
+                    "group_openid": f"bench-group-{seq % args.groups}",
+                    "content": f"/w {seq}",
+                    "id": f"bench-msg-{seq}",
+                },
+            )
+            messages.append(Message.from_qq_group_message(MessageType.text, event_))
+    return messages
+
+
+def run(args, batched: bool) -> Dict:
+    from wechatter.database import flush_ingest, ingest_message, make_db_session
+    from wechatter.database.ingest import person_cache
+
+    use_temp_database()
+    engine = make_db_session.kw["bind"]
+    commits = []
+    rows = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, context, executemany: rows.append(
+            len(parameters) if executemany else 1
+        ),
+    )
+    ingest = ingest_message if batched else _legacy_ingest
+    messages = make_messages(args)
+    latencies: List[float] = []
+
+    def work(index: int):
+        for message in messages[index :: args.threads]:
+            start = time.perf_counter()
+            ingest(message)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    flush_ingest()
+    elapsed = time.perf_counter() - start
+    with make_db_session() as session:
+        from wechatter.database import Message as DbMessage
+
+        written = session.query(DbMessage).count()
+    return {
+        "mode": "batched" if batched else "legacy",
+        "written": written,
+        "elapsed_s": elapsed,
+        "throughput": args.count / elapsed,
+        "commits": len(commits),
+        "rows": sum(rows),
+        "person_hit_rate": person_cache.hit_rate
+        if batched and person_cache is not None
+        else 0.0,
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="收到消息的入库测试")
+    parser.add_argument("--count", type=int, default=2000, help="消息数量")
+    parser.add_argument("--threads", type=int, default=4, help="消息处理线程数量")
+    parser.add_argument("--groups", type=int, default=20, help="群数量")
+    parser.add_argument("--users", type=int, default=50, help="用户数量")
+    args = parser.parse_args()
+
+    quiet_logger()
+    for batched in (False, True):
+        r = run(args, batched)
+        print(
+            f"[{r['mode']}] 写入 {r['written']} 条消息，耗时 {r['elapsed_s']:.2f}s，"
+            f"吞吐 {r['throughput']:.1f} 条/s，数据库提交 {r['commits']} 次，"
+            f"读写 {r['rows']} 行次，用户信息缓存命中率 {r['person_hit_rate']:.1%}，"
+            f"处理线程等待入库 p99 {r['p99_ms']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+端到端压力测试：按固定速率合成 QQ 群聊和私聊消息事件，经过去重、消息处理线程、命令解析、
+数据库写入和发送调度器，直到调用模拟的 post_*_message 为止，统计吞吐、收到消息到发出回复的延迟、
+队列积压和数据库耗时。
+
+所有命令处理函数都替换为桩函数，不访问网络，不调用爬虫和 LLM，数据库使用临时文件。
+
+用法：python -m wechatter.bench [--count 1000] [--rate 100] [--groups 20] [--users 20]
+      [--c2c-ratio 0.3] [--workers 4] [--api-latency 0.02] [--work-latency 0.05] [--rate-limit]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import re
+import threading
+import time
+from typing import Dict, List
+
+from botpy.message import C2CMessage, GroupMessage
+from botpy.robot import Robot
+from sqlalchemy import event
+
+from wechatter.bench.stub_api import StubQQApi
+from wechatter.bench.utils import (
+    make_bench_bot,
+    percentile,
+    quiet_logger,
+    use_temp_database,
+)
+from wechatter.utils import ConversationWorkerPool
+
+REPLY_PATTERN = re.compile(r"bench-reply (\d+)")
+DEFAULT_COMMANDS = ("weather", "zhihu-hot", "bili-hot", "douyin-hot", "gpt4")
+
+
+class DbTimer:
+    """
+    统计 SQL 语句的执行次数和总耗时（所有线程）
+    """
+
+    def __init__(self, engine):
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("bench_query_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["bench_query_start"].pop()
+        with self._lock:
+            self.total += elapsed
+            self.count += 1
+
+
+def stub_commands(command_names: List[str], work_latency: float) -> List[str]:
+    """
+    将所有命令处理函数替换为桩函数：同步等待 work_latency 秒（模拟爬虫或 LLM 请求）后回复
+    :return: 合成消息使用的命令关键词
+    """
+    from wechatter.commands import commands
+    from wechatter.sender import sender
+
+    for name, info in commands.items():
+
+        def handler(to, message="", message_obj=None):
+            if work_latency:
+                time.sleep(work_latency)
+            sender.send_msg(to, f"bench-reply {message}")
+
+        info["handler"] = handler
+    keys = [commands[name]["keys"][0] for name in command_names if name in commands]
+    if not keys:
+        raise ValueError(f"没有可用的命令：{command_names}")
+    return keys
+
+
+def make_event(seq: int, args, rng: random.Random) -> object:
+    """
+    合成第 seq 条收到的消息事件
+    """
+    key = args.command_keys[seq % len(args.command_keys)]
+    content = f" /{key} {seq}"
+    if rng.random() < args.c2c_ratio:
+        return C2CMessage(
+            None,
+            f"C2C_MESSAGE_CREATE:bench-{seq}",
+            {
+                "author": {"user_openid": f"bench-user-{seq % args.users}"},
+                "content": content,
+                "id": f"bench-msg-{seq}",
+            },
+        )
+    return GroupMessage(
+        None,
+        f"GROUP_AT_MESSAGE_CREATE:bench-{seq}",
+        {
+            "author": {"member_openid": f"bench-member-{seq % args.users}"},
+            "group_openid": f"bench-group-{seq % args.groups}",
+            "content": content,
+            "id": f"bench-msg-{seq}",
+        },
+    )
+
+
+async def run(args) -> Dict:
+    import wechatter.app.routers.qq_bot as qq_bot
+    from wechatter.database import flush_ingest, make_db_session
+
+    use_temp_database()
+    db_timer = DbTimer(make_db_session.kw["bind"])
+    args.command_keys = stub_commands(args.commands.split(","), args.work_latency)
+
+    api = StubQQApi(latency=args.api_latency)
+    robot = Robot({"id": "10000", "username": "bench-bot", "avatar": ""})
+    bot = make_bench_bot(api, robot)
+    if not args.rate_limit:
+        bot.dispatcher.rate_limiter = None
+    if bot.message_workers is not None:
+        workers = bot.message_workers
+        bot.message_workers = ConversationWorkerPool(
+            workers.handler,
+            worker_count=args.workers,
+            queue_size=workers.queue_size,
+            shed_policy=workers.shed_policy,
+            block_timeout=workers.block_timeout,
+        )
+        bot.message_workers.start()
+    qq_bot.qq_bot_instance = bot
+    bot._start_message_dispatch()
+
+    rng = random.Random(0)
+    events = [make_event(seq, args, rng) for seq in range(args.count)]
+    ingest_times: Dict[int, float] = {}
+    callback_times: List[float] = []
+    peaks = {"workers": 0, "dispatcher": 0, "blocked": 0}
+    stop = asyncio.Event()
+
+    async def sample():
+        while not stop.is_set():
+            if bot.message_workers is not None:
+                peaks["workers"] = max(
+                    peaks["workers"], sum(bot.message_workers.depths())
+                )
+            peaks["dispatcher"] = max(
+                peaks["dispatcher"], sum(bot.dispatcher.shard_depths())
+            )
+            peaks["blocked"] = max(peaks["blocked"], len(bot.blocking_queues))
+            await asyncio.sleep(0.02)
+
+    sampler = asyncio.create_task(sample())
+    interval = 1 / args.rate if args.rate > 0 else 0
+    start = time.perf_counter()
+    for seq, message in enumerate(events):
+        if interval:
+            # 按绝对时间安排，避免回调耗时累积导致速率下降
+            delay = start + seq * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        ingest_times[seq] = time.perf_counter()
+        if isinstance(message, GroupMessage):
+            await bot.on_group_at_message_create(message)
+        else:
+            await bot.on_c2c_message_create(message)
+        callback_times.append((time.perf_counter() - ingest_times[seq]) * 1000)
+    ingest_elapsed = time.perf_counter() - start
+
+    def expected() -> int:
+        # 被丢弃的消息不会有回复
+        shed = bot.message_workers.shed_count if bot.message_workers else 0
+        return args.count - shed
+
+    deadline = time.perf_counter() + args.timeout
+    while len(api.calls) < expected() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = (api.calls[-1][2] if api.calls else time.perf_counter()) - start
+    stop.set()
+    await sampler
+
+    if bot.message_workers is not None:
+        bot.message_workers.stop()
+    await bot.dispatcher.stop()
+    bot._check_blocking_queue_task.cancel()
+    if qq_bot.sent_message_writer is not None:
+        qq_bot.sent_message_writer.flush()
+    flush_ingest()
+
+    latencies = []
+    for _, params, called_at in api.calls:
+        match = REPLY_PATTERN.search(params.get("content") or "")
+        if match:
+            latencies.append((called_at - ingest_times[int(match.group(1))]) * 1000)
+    return {
+        "count": args.count,
+        "replied": len(latencies),
+        "elapsed_s": elapsed,
+        "ingest_rate": args.count / ingest_elapsed if ingest_elapsed else 0,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "callback_p99_ms": percentile(callback_times, 99),
+        "peak_worker_queue": peaks["workers"],
+        "peak_dispatcher_queue": peaks["dispatcher"],
+        "peak_blocked": peaks["blocked"],
+        "shed": bot.message_workers.shed_count if bot.message_workers else 0,
+        "db_time_s": db_timer.total,
+        "db_queries": db_timer.count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QQ 机器人端到端压力测试（离线）")
+    parser.add_argument("--count", type=int, default=1000, help="合成的消息数量")
+    parser.add_argument(
+        "--rate", type=float, default=100, help="每秒收到的消息数，0 表示一次性到达"
+    )
+    parser.add_argument("--groups", type=int, default=20, help="群数量")
+    parser.add_argument("--users", type=int, default=20, help="用户数量")
+    parser.add_argument("--c2c-ratio", type=float, default=0.3, help="私聊消息的比例")
+    parser.add_argument("--workers", type=int, default=4, help="消息处理协程数量")
+    parser.add_argument(
+        "--api-latency", type=float, default=0.02, help="模拟 QQ 接口耗时（秒）"
+    )
+    parser.add_argument(
+        "--work-latency", type=float, default=0.05, help="模拟命令处理耗时（秒）"
+    )
+    parser.add_argument(
+        "--commands",
+        default=",".join(DEFAULT_COMMANDS),
+        help="合成消息使用的命令，逗号分隔",
+    )
+    parser.add_argument(
+        "--rate-limit", action="store_true", help="启用配置中的发送限流"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="等待回复的最长时间（秒）"
+    )
+    args = parser.parse_args()
+
+    quiet_logger()
+    # 发送路径中的 print 会影响测试结果
+    with contextlib.redirect_stdout(io.StringIO()):
+        r = asyncio.run(run(args))
+
+    print(
+        f"{r['count']} 条消息，收到回复 {r['replied']} 条，耗时 {r['elapsed_s']:.2f}s，"
+        f"实际入站速率 {r['ingest_rate']:.1f} 条/s，回复吞吐 {r['throughput']:.1f} 条/s"
+    )
+    print(
+        f"收到消息到发出回复延迟 p50 {r['p50_ms']:.1f}ms / p95 {r['p95_ms']:.1f}ms / "
+        f"p99 {r['p99_ms']:.1f}ms，网关回调耗时 p99 {r['callback_p99_ms']:.2f}ms"
+    )
+    print(
+        f"队列峰值：消息处理 {r['peak_worker_queue']} / 发送调度 {r['peak_dispatcher_queue']} / "
+        f"阻塞 {r['peak_blocked']}，丢弃 {r['shed']} 条"
+    )
+    print(
+        f"数据库：{r['db_queries']} 条语句，耗时 {r['db_time_s']:.2f}s，"
+        f"平均每条消息 {r['db_time_s'] / max(r['count'], 1) * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+群成员写入测试：逐个成员查询并提交（旧版 add_group）与批量同步（成员列表指纹 + 一条 INSERT ... ON CONFLICT）
+处理大群消息时每条消息的耗时和数据库提交次数。旧版只在群第一次出现时写入成员，之后的成员变化不会写入。
+
+用法：python -m wechatter.bench.member_sync [--count 200] [--members 500] [--change-every 50]
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+from sqlalchemy import event
+
+from wechatter.bench.utils import percentile, quiet_logger, use_temp_database
+from wechatter.models.wechat import (
+    Gender,
+    Group,
+    GroupMember,
+    Message,
+    MessageType,
+    Person,
+)
+
+
+def _legacy_add_group(group: Group) -> None:
+    """
+    旧版 add_group：群第一次出现时逐个成员查询，每个成员提交一次
+    """
+    from wechatter.database import Group as DbGroup, Person as DbPerson, make_db_session
+
+    with make_db_session() as session:
+        _group = session.query(DbGroup).filter(DbGroup.id == group.id).first()
+        if _group is not None:
+            _group.name = group.name
+            session.commit()
+            return
+        session.add(DbGroup.from_model(group))
+        for member in group.member_list:
+            _person = session.query(DbPerson).filter(DbPerson.id == member.id).first()
+            if _person is None:
+                session.add(DbPerson.from_member_model(member))
+            else:
+                _person.name = member.name
+                _person.alias = member.alias
+            session.commit()
+        session.commit()
+
+
+def make_messages(args) -> List[Message]:
+    sender = Person(
+        id="bench-sender",
+        name="sender",
+        alias="",
+        gender=Gender.male,
+        is_star=False,
+        is_friend=True,
+    )
+    members = [
+        GroupMember(id=f"bench-member-{i}", name=f"member-{i}", alias="")
+        for i in range(args.members)
+    ]
+    messages = []
+    for seq in range(args.count):
+        if seq and seq % args.change_every == 0:
+            # 有人改名、有人入群
+            members = list(members)
+            members[seq % args.members] = GroupMember(
+                id=f"bench-member-{seq % args.members}", name=f"renamed-{seq}", alias=""
+            )
+            members.append(
+                GroupMember(id=f"bench-joined-{seq}", name=f"joined-{seq}", alias="")
+            )
+        group = Group(id="bench-group", name="bench", member_list=members)
+        messages.append(
+            Message(
+                type=MessageType.text, person=sender, group=group, content=f"hi {seq}"
+            )
+        )
+    return messages
+
+
+def run(args, batched: bool) -> Dict:
+    from wechatter.database import make_db_session
+    from wechatter.database.ingest import (
+        _ingest_rows,
+        _write_ingest,
+        group_cache,
+        member_cache,
+        person_cache,
+    )
+    from wechatter.database.tables.person_group_relation import PersonGroupRelation
+
+    use_temp_database()
+    engine = make_db_session.kw["bind"]
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    messages = make_messages(args)
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for message in messages:
+        begin = time.perf_counter()
+        if batched:
+            # 与批量写入线程相同的写入流程，每条消息单独一个事务，便于比较
+            with make_db_session() as session:
+                _write_ingest(
+                    session,
+                    [_ingest_rows(message, person_cache, group_cache, member_cache)],
+                )
+                session.commit()
+        else:
+            _legacy_add_group(message.group)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - start
+    with make_db_session() as session:
+        relations = session.query(PersonGroupRelation).count()
+    return {
+        "mode": "batched" if batched else "legacy",
+        "elapsed_s": elapsed,
+        "commits": len(commits),
+        "relations": relations,
+        "first_ms": latencies[0],
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="群成员写入测试")
+    parser.add_argument("--count", type=int, default=200, help="群消息数量")
+    parser.add_argument("--members", type=int, default=500, help="群成员数量")
+    parser.add_argument(
+        "--change-every", type=int, default=50, help="每隔多少条消息群成员变化一次"
+    )
+    args = parser.parse_args()
+
+    quiet_logger()
+    for batched in (False, True):
+        r = run(args, batched)
+        print(
+            f"[{r['mode']}] {args.count} 条 {args.members} 人群消息，耗时 {r['elapsed_s']:.2f}s，"
+            f"数据库提交 {r['commits']} 次，群第一次出现 {r['first_ms']:.2f}ms，"
+            f"每条 p50 {r['p50_ms']:.2f}ms，p99 {r['p99_ms']:.2f}ms，群成员关系 {r['relations']} 条"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+消息搜索测试：在百万条消息的数据库上，对比 LIKE 逐条匹配与 FTS5 全文索引（trigram）搜索的耗时。
+
+消息由 5000 个三字词按 Zipf 分布随机组成，分别搜索常见、中等和罕见的词。
+LIKE 按 id 倒序找到一页结果即可停止，常见词很快，罕见词需要扫描整个表；
+全文索引只读取包含关键词的消息，并只对最近的一部分匹配计算相关度。
+
+用法：python -m wechatter.bench.message_search [--messages 1000000] [--groups 200] [--repeat 10]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from itertools import accumulate
+from typing import Dict, List
+
+from sqlalchemy import Engine, text
+
+from wechatter.bench.utils import quiet_logger, use_temp_database
+
+BATCH_SIZE = 50000
+
+VOCABULARY_SIZE = 5000
+
+
+def make_vocabulary() -> List[str]:
+    rng = random.Random(42)
+    # 常用汉字区间内随机组成不重复的三字词
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(chr(rng.randrange(0x4E00, 0x4E00 + 2000)) for _ in range(3)))
+    return sorted(words)
+
+
+VOCABULARY = make_vocabulary()
+# 第 n 个词出现的权重为 1/n
+CUM_WEIGHTS = list(accumulate(1 / (rank + 1) for rank in range(VOCABULARY_SIZE)))
+# 搜索的关键词：常见词、中等、罕见词、两个中等词同时出现、两个字（不使用全文索引）
+QUERIES = {
+    "常见词": VOCABULARY[1],
+    "中等": VOCABULARY[100],
+    "罕见词": VOCABULARY[4000],
+    "两个词": f"{VOCABULARY[50]} {VOCABULARY[60]}",
+    "两个字": VOCABULARY[300][:2],
+}
+
+
+def _make_content(rng: random.Random) -> str:
+    return "".join(
+        rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=rng.randint(3, 12))
+    )
+
+
+def build_database(engine: Engine, args) -> None:
+    from wechatter.database.tables import Base
+
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        for start in range(0, args.messages, BATCH_SIZE):
+            rows = []
+            for i in range(start, min(start + BATCH_SIZE, args.messages)):
+                group = rng.randrange(args.groups + 1)
+                rows.append(
+                    (
+                        i + 1,
+                        f"person-{rng.randrange(args.groups * 50)}",
+                        f"group-{group}" if group else None,
+                        "text",
+                        _make_content(rng),
+                        "2024-01-01 00:00:00",
+                        False,
+                        False,
+                        None,
+                    )
+                )
+            conn.exec_driver_sql(
+                "INSERT INTO message VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+
+def time_like(engine: Engine, args, rng: random.Random) -> Dict[str, float]:
+    """
+    没有全文索引时的搜索：在群内用 LIKE 逐条匹配
+    """
+    results = {}
+    with engine.connect() as conn:
+        for name, query in QUERIES.items():
+            timings = []
+            for _ in range(args.repeat):
+                terms = query.split()
+                conditions = " AND ".join(
+                    f"content LIKE :t{i}" for i in range(len(terms))
+                )
+                params = {f"t{i}": f"%{term}%" for i, term in enumerate(terms)}
+                params["group_id"] = f"group-{rng.randrange(1, args.groups + 1)}"
+                start = time.perf_counter()
+                conn.execute(
+                    text(
+                        f"SELECT id, content FROM message WHERE group_id = :group_id AND {conditions} "
+                        "ORDER BY id DESC LIMIT 11"
+                    ),
+                    params,
+                ).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+
+def time_fts(session_factory, args, rng: random.Random) -> Dict[str, float]:
+    from wechatter.database.search import search_messages
+
+    results = {}
+    with session_factory() as session:
+        for name, query in QUERIES.items():
+            timings = []
+            for _ in range(args.repeat):
+                group_id = f"group-{rng.randrange(1, args.groups + 1)}"
+                start = time.perf_counter()
+                search_messages(session, query, group_id=group_id)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LIKE 与全文索引的搜索耗时")
+    parser.add_argument("--messages", type=int, default=1000000, help="消息表行数")
+    parser.add_argument("--groups", type=int, default=200, help="群数量")
+    parser.add_argument("--repeat", type=int, default=10, help="每个关键词搜索的次数")
+    args = parser.parse_args()
+
+    quiet_logger()
+    from wechatter.database import make_db_session
+    from wechatter.database.migrations import run_migrations
+
+    path = use_temp_database()
+    engine = make_db_session.kw["bind"]
+    start = time.perf_counter()
+    build_database(engine, args)
+    print(
+        f"临时数据库：{path}，填充 {args.messages} 条消息耗时 {time.perf_counter() - start:.1f}s"
+    )
+
+    like = time_like(engine, args, random.Random(1))
+    start = time.perf_counter()
+    run_migrations(engine)
+    print(f"建立全文索引耗时 {time.perf_counter() - start:.1f}s")
+    fts = time_fts(make_db_session, args, random.Random(1))
+
+    with engine.connect() as conn:
+        for name, query in QUERIES.items():
+            conditions = " AND ".join(
+                f"content LIKE '%{term}%'" for term in query.split()
+            )
+            matched = conn.execute(
+                text(f"SELECT count(*) FROM message WHERE {conditions}")
+            ).scalar()
+            print(
+                f"{name}「{query}」（{matched} 条消息包含）"
+                f"LIKE {like[name]:.2f}ms -> 全文索引 {fts[name]:.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+QQ 消息接收测试：构建 source 字典并经过 JSON 序列化（旧版）与直接映射 botpy 消息字段时，
+从 botpy 消息对象构造 Message 的耗时
+
+用法：python -m wechatter.bench.qq_ingest [--count 20000]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from botpy.message import C2CMessage, DirectMessage, GroupMessage
+from botpy.robot import Robot
+
+from wechatter.bench.utils import quiet_logger
+from wechatter.models.wechat import Message, MessageType
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "qq_events.json")
+
+
+def load_fixtures() -> Tuple[Robot, Dict[str, List]]:
+    """
+    加载录制的 QQ 事件，并构造为 botpy 消息对象
+    :return: 机器人信息，以及按消息类型分组的 botpy 消息对象
+    """
+    with open(FIXTURES_PATH, encoding="utf-8") as f:
+        fixtures = json.load(f)
+    classes = {"direct": DirectMessage, "group": GroupMessage, "c2c": C2CMessage}
+    events = {
+        kind: [cls(None, event["event_id"], event["data"]) for event in fixtures[kind]]
+        for kind, cls in classes.items()
+    }
+    return Robot(fixtures["robot"]), events
+
+
+def _robot_source(robot: Robot) -> Dict:
+    return {
+        "id": str(robot.id),
+        "payload": {
+            "alias": "",
+            "avatar": str(robot.avatar),
+            "friend": False,
+            "gender": 1,
+            "id": str(robot.id),
+            "name": str(robot.name),
+            "phone": [],
+            "signature": "",
+            "star": False,
+            "type": 1,
+        },
+        "_events": {},
+        "_eventsCount": 0,
+    }
+
+
+def _person_source(id: str, name: str, avatar: str = "") -> Dict:
+    return {
+        "id": id,
+        "payload": {
+            "alias": "",
+            "avatar": avatar,
+            "city": "",
+            "friend": True,
+            "gender": 1,
+            "id": id,
+            "name": name,
+            "phone": [],
+            "province": "",
+            "star": False,
+            "type": 1,
+        },
+        "_events": {},
+        "_eventsCount": 0,
+    }
+
+
+def legacy_direct_message(message: DirectMessage, robot: Robot) -> Message:
+    """
+    旧版 on_direct_message_create 中构造消息对象的方式
+    """
+    author_dict = json.loads(
+        json.dumps(
+            {
+                "id": message.guild_id,
+                "username": message.author.username,
+                "avatar": message.author.avatar,
+            }
+        )
+    )
+    source_dict = {
+        "from": _person_source(
+            author_dict["id"], author_dict["username"], author_dict["avatar"]
+        ),
+        "room": "",
+        "to": _robot_source(robot),
+    }
+    return Message.from_api_direct_message(
+        type=MessageType.text,
+        qq_directmessage=message,
+        content=message.content or ".",
+        source=json.dumps(source_dict),
+        is_mentioned="0",
+        is_from_self="0",
+        attachments=message.attachments,
+    )
+
+
+def legacy_group_message(message: GroupMessage, robot: Robot) -> Message:
+    """
+    旧版 on_group_at_message_create 中构造消息对象的方式
+    """
+    author_dict = json.loads(
+        json.dumps({"member_openid": message.author.member_openid})
+    )
+    source_dict = {
+        "from": _person_source(author_dict["member_openid"], ""),
+        "room": {
+            "id": message.group_openid,
+            "topic": message.group_openid,
+            "payload": {"id": "", "adminIdList": [], "avatar": "", "memberList": []},
+            "_events": {},
+            "_eventsCount": 0,
+        },
+        "to": "",
+    }
+    return Message.from_api_group_at_message(
+        type=MessageType.text,
+        qq_groupmessage=message,
+        content=message.content or ".",
+        source=json.dumps(source_dict),
+        is_mentioned="1",
+        is_from_self="0",
+        attachments=message.attachments,
+    )
+
+
+def legacy_c2c_message(message: C2CMessage, robot: Robot) -> Message:
+    """
+    旧版 on_c2c_message_create 中构造消息对象的方式
+    """
+    author_dict = json.loads(json.dumps({"id": message.author.user_openid}))
+    source_dict = {
+        "from": _person_source(author_dict["id"], author_dict["id"]),
+        "room": "",
+        "to": _robot_source(robot),
+    }
+    return Message.from_api_c2c_message(
+        type=MessageType.text,
+        qq_c2cmessage=message,
+        content=message.content or ".",
+        source=json.dumps(source_dict),
+        is_mentioned="0",
+        is_from_self="0",
+        attachments=message.attachments,
+    )
+
+
+LEGACY_BUILDERS: Dict[str, Callable] = {
+    "direct": legacy_direct_message,
+    "group": legacy_group_message,
+    "c2c": legacy_c2c_message,
+}
+
+DIRECT_BUILDERS: Dict[str, Callable] = {
+    "direct": lambda message, robot: Message.from_qq_direct_message(
+        MessageType.text, message, robot
+    ),
+    "group": lambda message, robot: Message.from_qq_group_message(
+        MessageType.text, message
+    ),
+    "c2c": lambda message, robot: Message.from_qq_c2c_message(
+        MessageType.text, message, robot
+    ),
+}
+
+
+def run(count: int, builders: Dict[str, Callable], robot: Robot, events: Dict) -> Dict:
+    results = {}
+    for kind, messages in events.items():
+        build = builders[kind]
+        start = time.perf_counter()
+        for i in range(count):
+            build(messages[i % len(messages)], robot)
+        elapsed = time.perf_counter() - start
+        results[kind] = elapsed / count * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QQ 消息接收构造耗时测试")
+    parser.add_argument("--count", type=int, default=20000, help="每种消息的构造次数")
+    args = parser.parse_args()
+
+    quiet_logger()
+    robot, events = load_fixtures()
+    # 先确认两种方式的结果一致
+    for kind, messages in events.items():
+        for message in messages:
+            legacy = LEGACY_BUILDERS[kind](message, robot)
+            direct = DIRECT_BUILDERS[kind](message, robot)
+            if legacy != direct:
+                raise AssertionError(f"{kind} 消息的构造结果不一致")
+
+    for mode, builders in (("legacy", LEGACY_BUILDERS), ("direct", DIRECT_BUILDERS)):
+        r = run(args.count, builders, robot, events)
+        print(
+            f"[{mode}] 每条消息耗时 direct {r['direct']:.2f}us / "
+            f"group {r['group']:.2f}us / c2c {r['c2c']:.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
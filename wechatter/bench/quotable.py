@@ -0,0 +1,107 @@
+"""
+可引用消息测试：对比旧版（每次读取最后一条可引用消息计算下一个 id，再用另一个会话写入；引用回复时查询数据库）
+与预留 id 分配器加缓存的方式，多线程发送可引用消息时的耗时和重复的 id 数量，以及引用回复时读取命令和回复的耗时。
+
+用法：python -m wechatter.bench.quotable [--count 2000] [--threads 4]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from wechatter.bench.utils import percentile, quiet_logger, use_temp_database
+from wechatter.models.wechat import QuotedResponse
+
+
+def _legacy_make_quotable(quoted_response: QuotedResponse) -> str:
+    """
+    旧版 make_quotable：读取最后一条可引用消息的 id 加 1，再在另一个会话中写入
+    """
+    from wechatter.database import QuotedResponse as DbQuotedResponse, make_db_session
+    from wechatter.database.quotable import decode_quotable_id, encode_quotable_id
+
+    with make_db_session() as session:
+        last = (
+            session.query(DbQuotedResponse).order_by(DbQuotedResponse.id.desc()).first()
+        )
+        quotable_id = (
+            encode_quotable_id(decode_quotable_id(last.quotable_id) + 1)
+            if last
+            else "000"
+        )
+    quoted_response.quotable_id = quotable_id
+    with make_db_session() as session:
+        session.add(DbQuotedResponse.from_model(quoted_response))
+        session.commit()
+    return quotable_id
+
+
+def _legacy_get_quoted_response(quotable_id: str) -> QuotedResponse:
+    from wechatter.database import QuotedResponse as DbQuotedResponse, make_db_session
+
+    with make_db_session() as session:
+        return (
+            session.query(DbQuotedResponse)
+            .filter_by(quotable_id=quotable_id)
+            .order_by(DbQuotedResponse.id.desc())
+            .first()
+            .to_model()
+        )
+
+
+def run(args, legacy: bool) -> Dict:
+    from wechatter.database import get_quoted_response
+    from wechatter.sender.quotable import make_quotable
+
+    use_temp_database()
+
+    def send(seq: int) -> str:
+        quoted_response = QuotedResponse(command="weather", response=f"response {seq}")
+        if legacy:
+            return _legacy_make_quotable(quoted_response)
+        make_quotable(f"message {seq}", quoted_response)
+        return quoted_response.quotable_id
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        ids = list(executor.map(send, range(args.count)))
+    send_elapsed = time.perf_counter() - start
+
+    # 引用最近发送的消息
+    latencies: List[float] = []
+    for quotable_id in ids[-args.quotes :]:
+        begin = time.perf_counter()
+        if legacy:
+            _legacy_get_quoted_response(quotable_id)
+        else:
+            get_quoted_response(quotable_id)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    return {
+        "mode": "legacy" if legacy else "allocator",
+        "send_s": send_elapsed,
+        "duplicates": len(ids) - len(set(ids)),
+        "quote_p50_ms": percentile(latencies, 50),
+        "quote_p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="可引用消息测试")
+    parser.add_argument("--count", type=int, default=2000, help="发送的可引用消息数量")
+    parser.add_argument("--threads", type=int, default=4, help="同时发送的线程数")
+    parser.add_argument("--quotes", type=int, default=500, help="引用回复的次数")
+    args = parser.parse_args()
+
+    quiet_logger()
+    for legacy in (True, False):
+        r = run(args, legacy)
+        print(
+            f"[{r['mode']}] {args.threads} 个线程发送 {args.count} 条可引用消息耗时 {r['send_s']:.2f}s，"
+            f"重复的 id {r['duplicates']} 个；引用回复 p50 {r['quote_p50_ms']:.3f}ms，"
+            f"p99 {r['quote_p99_ms']:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
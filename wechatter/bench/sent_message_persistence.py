@@ -0,0 +1,87 @@
+"""
+机器人消息持久化测试：同步写入与批量写入（write-behind）时的发送吞吐
+
+用法：python -m wechatter.bench.sent_message_persistence [--count 500] [--targets 20]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict
+
+from wechatter.bench.stub_api import StubQQApi
+from wechatter.bench.utils import make_bench_bot, quiet_logger, use_temp_database
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+
+async def run(count: int, targets: int, write_behind: bool) -> Dict:
+    import wechatter.app.routers.qq_bot as qq_bot
+    from wechatter.database import BatchWriter
+
+    writer = None
+    if write_behind:
+        writer = BatchWriter("bench_sent_message", qq_bot._write_bot_messages)
+    qq_bot.sent_message_writer = writer
+
+    api = StubQQApi(latency=0)
+    bot = make_bench_bot(api)
+    bot.dispatcher.rate_limiter = None
+    # 每个目标都有足够的被动回复窗口
+    messages = []
+    for i in range(count):
+        target = f"group-{i % targets}"
+        msg_id = f"bench-msg-{i // 5}-{target}"
+        bot.reply_windows.refresh(QQChannel.group, target, msg_id)
+        messages.append(
+            OutboundMessage(
+                channel=QQChannel.group,
+                target=target,
+                content=f"bench-{i}",
+                msg_id=msg_id,
+            )
+        )
+
+    bot._start_message_dispatch()
+    start = time.perf_counter()
+    for message in messages:
+        bot.enqueue_message(message)
+    await bot.dispatcher.join()
+    send_elapsed = time.perf_counter() - start
+    if writer is not None:
+        writer.flush()
+    total_elapsed = time.perf_counter() - start
+
+    await bot.dispatcher.stop()
+    bot._check_blocking_queue_task.cancel()
+    if writer is not None:
+        writer.close()
+    return {
+        "mode": "write-behind" if write_behind else "sync",
+        "count": count,
+        "send_elapsed_s": send_elapsed,
+        "total_elapsed_s": total_elapsed,
+        "throughput": count / send_elapsed,
+        "batches": writer.batch_count if writer is not None else count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="机器人消息持久化测试")
+    parser.add_argument("--count", type=int, default=500, help="发送消息数量")
+    parser.add_argument("--targets", type=int, default=20, help="发送目标（群）数量")
+    args = parser.parse_args()
+
+    quiet_logger()
+    path = use_temp_database()
+    print(f"临时数据库：{path}")
+    for write_behind in (False, True):
+        r = asyncio.run(run(args.count, args.targets, write_behind))
+        print(
+            f"[{r['mode']}] {r['count']} 条消息，发送耗时 {r['send_elapsed_s']:.2f}s，"
+            f"吞吐 {r['throughput']:.1f} 条/s，含写入完成耗时 {r['total_elapsed_s']:.2f}s，"
+            f"数据库事务 {r['batches']} 次"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+
+class StubQQApi:
+    """
+    模拟 QQ OpenAPI，记录每次调用的时间，不发起任何网络请求
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        :param latency: 每次接口调用的模拟耗时（秒）
+        """
+        self.latency = latency
+        # (接口名, 参数, 调用时间 time.perf_counter)
+        self.calls: List[Tuple[str, Dict, float]] = []
+
+    async def _call(self, name: str, params: Dict) -> Dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls.append((name, params, time.perf_counter()))
+        return {"id": uuid.uuid4().hex}
+
+    async def post_dms(self, **params) -> Dict:
+        return await self._call("post_dms", params)
+
+    async def post_group_message(self, **params) -> Dict:
+        return await self._call("post_group_message", params)
+
+    async def post_c2c_message(self, **params) -> Dict:
+        return await self._call("post_c2c_message", params)
+
+    async def post_group_file(self, **params) -> Dict:
+        return await self._call("post_group_file", params)
+
+    async def post_c2c_file(self, **params) -> Dict:
+        return await self._call("post_c2c_file", params)
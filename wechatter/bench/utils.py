@@ -0,0 +1,92 @@
+import os
+import sys
+from types import SimpleNamespace
+from typing import List
+
+import botpy
+from botpy.robot import Robot
+from loguru import logger
+
+from wechatter.models.wechat import Gender, Person
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    计算百分位数（最近秩法）
+    :param values: 数据列表
+    :param p: 百分位（0-100）
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def quiet_logger(level: str = "WARNING") -> None:
+    """
+    性能测试时只输出警告及以上级别的日志，避免日志输出影响测试结果
+    """
+    # 先完成配置加载时的日志初始化，否则之后导入会覆盖这里的设置
+    import wechatter.config  # noqa: F401
+
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+
+
+def use_temp_database(profiled: bool = True) -> str:
+    """
+    将全局数据库会话切换到临时 SQLite 文件，避免测试写入 data/wechatter.sqlite
+    :param profiled: 是否使用默认的性能配置（WAL 等 PRAGMA 和连接池），为 False 时使用 SQLAlchemy 默认配置
+    :return: 临时数据库文件路径
+    """
+    import tempfile
+
+    from sqlalchemy import create_engine
+
+    from wechatter.database import make_db_session, quotable_id_allocator
+    from wechatter.database.engine_profile import create_sqlite_engine
+    from wechatter.database.ingest import group_cache, member_cache, person_cache
+    from wechatter.database.quotable import quoted_response_cache
+    from wechatter.database.tables import Base
+
+    path = os.path.join(tempfile.mkdtemp(prefix="wechatter-bench-"), "bench.sqlite")
+    if profiled:
+        engine = create_sqlite_engine(path)
+    else:
+        engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    make_db_session.configure(bind=engine)
+    quotable_id_allocator.reset()
+    # 缓存的用户/群组信息和可引用消息属于之前的数据库
+    for cache in (person_cache, group_cache, member_cache, quoted_response_cache):
+        if cache is not None:
+            cache.clear()
+    return path
+
+
+def make_bench_bot(api, robot: Robot = None):
+    """
+    创建一个使用模拟 API 的 QQBot，不登录、不连接网关
+    :param api: 模拟的 QQ OpenAPI
+    :param robot: 机器人信息，收到频道私信和私聊消息时作为接收者，为 None 时不设置
+    """
+    from wechatter.app.routers.qq_bot import QQBot
+
+    bot = QQBot(intents=botpy.Intents.none(), bot_log=None)
+    bot.api = api
+    if robot is not None:
+        # botpy 从网关连接的状态中读取机器人信息
+        bot._connection = SimpleNamespace(state=SimpleNamespace(robot=robot))
+    # 测试不写入发件箱，也不合并消息
+    bot.dispatcher.outbox = None
+    bot.dispatcher.coalescer = None
+    bot.qqrobot_person = Person(
+        id="bench-bot",
+        name="bench-bot",
+        alias="bench-bot",
+        gender=Gender.unknown,
+        is_star=False,
+        is_friend=True,
+    )
+    return bot
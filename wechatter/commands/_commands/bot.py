@@ -3,8 +3,10 @@ from datetime import datetime, timedelta
 
 from wechatter.commands.handlers import command
 from wechatter.commands.mcp import mcp_server
-from wechatter.database import make_db_session
+from wechatter.database import ingest, make_db_session, quotable
 from wechatter.database.tables.Statistical_table import MessageStats, CommandStats
+from wechatter.message import dedup
+from wechatter.message.stats import live_stats
 from wechatter.models.wechat import SendTo
 from wechatter.sender import sender
 from wechatter.bot import BotInfo
@@ -41,10 +43,12 @@ def get_status_msg():
     minutes = (uptime.seconds % 3600) // 60
     seconds = uptime.seconds % 60
 
-    # 获取消息统计
+    # 获取消息统计：数据库中的累计值加上尚未写入的计数
+    message_delta, command_delta = live_stats()
     with make_db_session() as session:
-        msg_stats = session.query(MessageStats).first()
+        msg_stats = session.query(MessageStats).order_by(MessageStats.id).first()
         if not msg_stats:
+            # 统计表由定时写入创建，这里只用于显示
             msg_stats = MessageStats(
                 total_messages=0,
                 command_messages=0,
@@ -52,11 +56,14 @@ def get_status_msg():
                 private_messages=0,
                 last_updated=datetime.now()
             )
-            session.add(msg_stats)
-            session.commit()
 
         # 获取命令使用统计
-        cmd_stats = session.query(CommandStats).order_by(CommandStats.use_count.desc()).limit(5).all()
+        cmd_counts = {}
+        for cmd in session.query(CommandStats).order_by(CommandStats.id).all():
+            cmd_counts.setdefault(cmd.command_name, cmd.use_count or 0)
+        for command_name, count in command_delta.items():
+            cmd_counts[command_name] = cmd_counts.get(command_name, 0) + count
+        top_cmds = sorted(cmd_counts.items(), key=lambda item: item[1], reverse=True)[:5]
 
     # 获取系统信息
     sys_info = get_system_info()
@@ -73,15 +80,15 @@ def get_status_msg():
 
     # 消息统计
     status_msg += f"📊 消息统计\n"
-    status_msg += f"📨 总消息数：{msg_stats.total_messages}\n"
-    status_msg += f"📝 命令消息：{msg_stats.command_messages}\n"
-    status_msg += f"👥 群消息数：{msg_stats.group_messages}\n"
-    status_msg += f"👤 私聊消息：{msg_stats.private_messages}\n\n"
+    status_msg += f"📨 总消息数：{msg_stats.total_messages + message_delta.get('total_messages', 0)}\n"
+    status_msg += f"📝 命令消息：{msg_stats.command_messages + message_delta.get('command_messages', 0)}\n"
+    status_msg += f"👥 群消息数：{msg_stats.group_messages + message_delta.get('group_messages', 0)}\n"
+    status_msg += f"👤 私聊消息：{msg_stats.private_messages + message_delta.get('private_messages', 0)}\n\n"
 
     # 命令使用统计
     status_msg += f"📈 热门命令（Top 5）\n"
-    for cmd in cmd_stats:
-        status_msg += f"• {cmd.command_name}: {cmd.use_count}次\n"
+    for command_name, count in top_cmds:
+        status_msg += f"• {command_name}: {count}次\n"
     status_msg += "\n"
 
     # 系统资源
@@ -101,6 +108,20 @@ def get_status_msg():
     status_msg += f"发送: {net_info['bytes_sent'] / 1024 / 1024:.1f}MB\n"
     status_msg += f"接收: {net_info['bytes_recv'] / 1024 / 1024:.1f}MB"
 
+    # 各子系统的运行状态，未启用的子系统返回空列表
+    # qq_bot 导入时会加载命令模块，只能在这里导入
+    from wechatter.app.routers.qq_bot import qq_bot_instance
+
+    sections = [
+        qq_bot_instance.status_lines() if qq_bot_instance else [],
+        dedup.status_lines(),
+        ingest.status_lines(),
+        quotable.status_lines(),
+    ]
+    for lines in sections:
+        if lines:
+            status_msg += "\n\n" + "\n".join(lines)
+
     return status_msg
 
 
@@ -0,0 +1,83 @@
+from typing import Union
+
+from wechatter.commands.handlers import command
+from wechatter.config import config
+from wechatter.models.wechat import SendTo
+from wechatter.sender import sender
+
+# 列表中最多显示的死信数量
+LIST_LIMIT = 10
+# 一次最多重发的死信数量
+REPLAY_LIMIT = 100
+
+
+@command(
+    command="dead-letter",
+    keys=["死信", "dead-letter", "dl"],
+    desc="查看或重发发送失败的QQ消息（仅管理员），重发：/dl replay <id前缀|all>。",
+)
+def dead_letter_command_handler(to: Union[str, SendTo], message: str = "") -> None:
+    if not _is_admin(to):
+        sender.send_msg(to, "只有管理员可以使用该命令")
+        return
+
+    from wechatter.app.routers.qq_bot import qq_bot_instance
+
+    if qq_bot_instance is None or qq_bot_instance.dispatcher.outbox is None:
+        sender.send_msg(to, "QQ机器人未启动或未启用发件箱")
+        return
+    outbox = qq_bot_instance.dispatcher.outbox
+
+    args = message.split()
+    if args and args[0] in ("replay", "重发"):
+        if len(args) < 2:
+            sender.send_msg(to, "请指定要重发的死信id前缀，或使用 all 重发全部")
+            return
+        id_prefix = None if args[1] in ("all", "全部") else args[1]
+        # 多读取一条，判断是否还有未重发的死信
+        dead_letters = outbox.dead_letters(limit=REPLAY_LIMIT + 1, id_prefix=id_prefix)
+        remaining = len(dead_letters) > REPLAY_LIMIT
+        dead_letters = dead_letters[:REPLAY_LIMIT]
+        # 按放弃时间的先后顺序重发
+        for dead_message, _, _ in reversed(dead_letters):
+            qq_bot_instance.enqueue_message(
+                dead_message.model_copy(update={"retry_count": 0})
+            )
+        reply = f"已重新发送 {len(dead_letters)} 条死信"
+        if remaining:
+            reply += f"，一次最多重发 {REPLAY_LIMIT} 条，还有更多死信，请再次执行该命令"
+        sender.send_msg(to, reply)
+        return
+
+    dead_letters = outbox.dead_letters(limit=LIST_LIMIT)
+    sender.send_msg(to, _format_dead_letters(dead_letters))
+
+
+def _is_admin(to: Union[str, SendTo]) -> bool:
+    if isinstance(to, str):
+        # 以名字指定的发送对象
+        return to in (config.get("admin_list") or [])
+    person = to.person
+    if person.name in (config.get("admin_list") or []):
+        return True
+    return bool(person.user_openid) and person.user_openid in (
+        config.get("admin_qq_c2c_list") or []
+    )
+
+
+def _format_dead_letters(dead_letters) -> str:
+    if not dead_letters:
+        return "✨=====QQ死信=====✨\n没有发送失败的消息"
+    lines = [f"✨=====QQ死信（最近{len(dead_letters)}条）=====✨"]
+    for i, (dead_message, error, dead_time) in enumerate(dead_letters):
+        content = dead_message.content
+        if len(content) > 30:
+            content = content[:30] + "..."
+        lines.append(
+            f"{i + 1}. [{dead_message.outbox_id[:8]}] {dead_message.channel.value} "
+            f"{dead_message.target}\n"
+            f"   内容：{content}\n"
+            f"   原因：{error}\n"
+            f"   时间：{dead_time:%Y-%m-%d %H:%M:%S}"
+        )
+    return "\n".join(lines)
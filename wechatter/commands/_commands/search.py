@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from typing import Union
+
+from loguru import logger
+
+from wechatter.commands.handlers import command
+from wechatter.config import config
+from wechatter.models.wechat import SendTo
+from wechatter.sender import sender
+
+# 每页显示的消息数量
+PAGE_SIZE = 5
+
+
+@command(
+    command="search",
+    keys=["搜索", "search", "ss"],
+    desc="搜索聊天记录，群聊中搜索本群，私聊中搜索自己发送的消息，可指定页码，如：/ss 天气预报 2。",
+)
+def search_command_handler(to: Union[str, SendTo], message: str = "") -> None:
+    args = message.split()
+    page = 1
+    if len(args) > 1 and args[-1].isdigit():
+        page = max(int(args.pop()), 1)
+    keywords = " ".join(args)
+    if not keywords:
+        sender.send_msg(to, "请输入要搜索的关键词，如：/ss 天气预报")
+        return
+    try:
+        result = get_search_msg(to, keywords, page)
+    except Exception as e:
+        error_message = f"搜索聊天记录失败，错误信息：{str(e)}"
+        logger.error(error_message)
+        sender.send_msg(to, error_message)
+        return
+    sender.send_msg(to, result)
+
+
+def get_search_msg(to: SendTo, keywords: str, page: int) -> str:
+    from wechatter.app.routers.qq_bot import qq_bot_instance
+    from wechatter.database import (
+        Person,
+        flush_ingest,
+        make_db_session,
+        search_messages,
+    )
+
+    # 先写入刚收到的消息
+    flush_ingest()
+    if to.group:
+        scope = {"group_id": to.group.id}
+    else:
+        scope = {"person_id": to.person.id}
+    bot_id = qq_bot_instance.qqrobot_person.id if qq_bot_instance is not None else None
+    with make_db_session() as session:
+        result = search_messages(
+            session,
+            keywords,
+            exclude_prefix=config.get("command_prefix"),
+            exclude_person_id=bot_id,
+            page=page,
+            page_size=PAGE_SIZE,
+            **scope,
+        )
+        person_ids = list({hit.person_id for hit in result.hits})
+        names = dict(
+            session.query(Person.id, Person.name)
+            .filter(Person.id.in_(person_ids))
+            .all()
+        )
+
+    if not result.hits:
+        return f"没有找到包含「{keywords}」的消息" if page == 1 else "没有更多结果了"
+    lines = [f"✨=====「{keywords}」的搜索结果（第{page}页）=====✨"]
+    for i, hit in enumerate(result.hits):
+        lines.append(
+            f"{(page - 1) * PAGE_SIZE + i + 1}. {names.get(hit.person_id) or hit.person_id} "
+            f"{_local_time(hit.created_time)}\n   {hit.snippet}"
+        )
+    if result.has_more:
+        lines.append(
+            f"查看下一页：{config.get('command_prefix') or ''}ss {keywords} {page + 1}"
+        )
+    return "\n".join(lines)
+
+
+def _local_time(created_time: str) -> str:
+    # 消息时间由数据库以 UTC 保存
+    if not created_time:
+        return ""
+    time = (
+        datetime.fromisoformat(created_time).replace(tzinfo=timezone.utc).astimezone()
+    )
+    return f"{time:%Y-%m-%d %H:%M}"
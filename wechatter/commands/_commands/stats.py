@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Union
+
+from loguru import logger
+
+from wechatter.commands.handlers import command
+from wechatter.models.wechat import SendTo
+from wechatter.sender import sender
+
+# 默认统计的天数
+DEFAULT_DAYS = 7
+# 最多统计的天数
+MAX_DAYS = 365
+# 排行榜显示的数量
+TOP_LIMIT = 5
+
+
+@command(
+    command="stats",
+    keys=["统计", "stats"],
+    desc="查看最近几天的消息统计，群聊中统计本群，私聊中统计自己，如：/stats 30。",
+)
+def stats_command_handler(to: Union[str, SendTo], message: str = "") -> None:
+    message = message.strip()
+    if message and not message.isdigit():
+        sender.send_msg(to, "请输入要统计的天数，如：/stats 30")
+        return
+    days = min(max(int(message), 1), MAX_DAYS) if message else DEFAULT_DAYS
+    try:
+        result = get_stats_msg(to, days)
+    except Exception as e:
+        error_message = f"获取消息统计失败，错误信息：{str(e)}"
+        logger.error(error_message)
+        sender.send_msg(to, error_message)
+        return
+    sender.send_msg(to, result)
+
+
+def get_stats_msg(to: SendTo, days: int) -> str:
+    """
+    从活跃度汇总表生成统计信息，查询量与汇总的行数有关，与消息数量无关
+    """
+    from wechatter.database import (
+        Group,
+        Person,
+        count_activity,
+        make_db_session,
+        top_activity,
+    )
+    from wechatter.message.stats import flush_stats
+
+    # 先写入内存中的计数
+    flush_stats()
+    since = datetime.now() - timedelta(days=days)
+    if to.group:
+        title = f"本群最近{days}天的消息统计"
+        scope = {"group_id": to.group.id}
+    else:
+        title = f"你最近{days}天的消息统计"
+        scope = {"person_id": to.person.id}
+
+    with make_db_session() as session:
+        total, command_total = count_activity(session, since, **scope)
+        top_commands = top_activity(session, "command", since, limit=TOP_LIMIT, **scope)
+        if to.group:
+            top_members = top_activity(
+                session, "person_id", since, limit=TOP_LIMIT, **scope
+            )
+            names = _names(session, Person, (person_id for person_id, _ in top_members))
+        else:
+            top_members = top_activity(
+                session, "group_id", since, limit=TOP_LIMIT, **scope
+            )
+            names = _names(session, Group, (group_id for group_id, _ in top_members))
+
+    lines = [
+        f"✨====={title}=====✨",
+        f"📨 消息：{total}条",
+        f"📝 命令：{command_total}条",
+        "",
+        f"📈 热门命令（Top {TOP_LIMIT}）",
+    ]
+    lines.extend(f"• {name}: {count}次" for name, count in top_commands)
+    if not top_commands:
+        lines.append("暂无")
+    lines.append("")
+    lines.append(f"🏆 {'活跃成员' if to.group else '常去的群'}（Top {TOP_LIMIT}）")
+    lines.extend(f"• {names.get(key) or key}: {count}条" for key, count in top_members)
+    if not top_members:
+        lines.append("暂无")
+    return "\n".join(lines)
+
+
+def _names(session, table, ids: Iterable[str]) -> Dict[str, str]:
+    ids = list(ids)
+    if not ids:
+        return {}
+    return dict(session.query(table.id, table.name).filter(table.id.in_(ids)).all())
@@ -11,6 +11,7 @@ from wechatter.config import config
 from wechatter.database import (
     GptChatInfo as DbGptChatInfo,
     GptChatMessage as DbGptChatMessage,
+    flush_ingest,
     make_db_session,
 )
 from wechatter.models.gpt import GptChatInfo
@@ -436,6 +437,8 @@ class BaseChat:
             if is_save:
                 newconv.append({"role": "assistant", "content": content})
                 chat_info.extend_conversation(newconv)
+                # 对话消息关联收到的消息，先确保收到的消息已写入数据库
+                flush_ingest()
                 with make_db_session() as session:
                     _chat_info = session.query(DbGptChatInfo).filter_by(id=chat_info.id).first()
                     _chat_info.talk_time = datetime.now()
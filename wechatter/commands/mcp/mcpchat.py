@@ -9,6 +9,7 @@ from loguru import logger
 from wechatter.database import (
     GptChatInfo as DbGptChatInfo,
     GptChatMessage as DbGptChatMessage,
+    flush_ingest,
     make_db_session,
 )
 from wechatter.models.gpt import GptChatInfo
@@ -132,6 +133,8 @@ class MCPChat:
         newconv.append({"role": "assistant", "content": response})
         chat_info.extend_conversation(newconv)
 
+        # 对话消息关联收到的消息，先确保收到的消息已写入数据库
+        flush_ingest()
         with make_db_session() as session:
             _chat_info = session.query(DbGptChatInfo).filter_by(id=chat_info.id).first()
             _chat_info.talk_time = datetime.now()
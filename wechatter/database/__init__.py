@@ -1,24 +1,51 @@
-from .database import create_tables, make_db_session
+from .batch_writer import BatchWriter
+from .database import create_tables, make_db_session, migrate_tables
+from .ingest import flush_ingest, ingest_message, invalidate_identity
+from .quotable import get_quoted_response, quotable_id_allocator, save_quoted_response
+from .retention import start_retention
+from .rollup import count_activity, top_activity
+from .search import search_messages
 from .tables import person_group_relation  # noqa
 from .tables.Statistical_table import MessageStats, CommandStats
+from .tables.activity_rollup import ActivityDaily, ActivityHourly
 from .tables.game_states import GameStates
 from .tables.gpt_chat_info import GptChatInfo
 from .tables.gpt_chat_message import GptChatMessage
 from .tables.group import Group
+from .tables.inbound_event import InboundEvent
 from .tables.message import Message
 from .tables.person import Person
+from .tables.qq_outbox import QQOutbox
+from .tables.quotable_sequence import QuotableSequence
 from .tables.quoted_response import QuotedResponse
 
 __all__ = [
+    "BatchWriter",
     "make_db_session",
     "create_tables",
+    "migrate_tables",
+    "start_retention",
+    "ingest_message",
+    "flush_ingest",
+    "invalidate_identity",
+    "quotable_id_allocator",
+    "save_quoted_response",
+    "get_quoted_response",
+    "count_activity",
+    "top_activity",
+    "search_messages",
     "GptChatInfo",
     "GptChatMessage",
     "Message",
     "Group",
     "Person",
     "QuotedResponse",
+    "QuotableSequence",
     "GameStates",
     "MessageStats",
     "CommandStats",
+    "ActivityHourly",
+    "ActivityDaily",
+    "QQOutbox",
+    "InboundEvent",
 ]
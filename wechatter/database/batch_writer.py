@@ -0,0 +1,146 @@
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, List
+
+from loguru import logger
+from sqlalchemy.orm import Session, sessionmaker
+
+from wechatter.database.database import make_db_session
+
+BatchHandler = Callable[[Session, List[Any]], None]
+
+
+class _Flush:
+    """
+    刷新标记，写入线程处理到该标记时立即提交并通知等待方
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class BatchWriter:
+    """
+    批量写入器（组提交）
+
+    调用方只把数据放入内存队列，不等待数据库提交；后台线程在收到第一条数据后
+    最多再等待 flush_interval 秒收集更多数据，然后在一个事务中交给 handler 写入并提交一次。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: BatchHandler,
+        session_factory: sessionmaker = make_db_session,
+        flush_interval: float = 0.05,
+        max_batch: int = 500,
+        on_error: Callable[[List[Any]], None] = None,
+    ):
+        """
+        :param name: 写入器名称，用于线程名和日志
+        :param handler: 批量写入函数，接收数据库会话和一批数据，不需要自己提交
+        :param session_factory: 数据库会话工厂
+        :param flush_interval: 收集一批数据的最长等待时间（秒）
+        :param max_batch: 每批最多写入的数据条数
+        :param on_error: 一批数据写入失败（已回滚）时的回调，参数为这批数据
+        """
+        self.name = name
+        self.handler = handler
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.on_error = on_error
+        self.batch_count = 0
+        self.written_count = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: Any) -> None:
+        """
+        提交一条待写入的数据（线程安全，不阻塞）
+        """
+        self._ensure_started()
+        self._queue.put(item)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待此前提交的数据全部写入
+        :return: 是否在超时前完成
+        """
+        if self._thread is None:
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 5) -> None:
+        """
+        写入剩余数据并停止后台线程
+        """
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"batch-writer-{self.name}", daemon=True
+                )
+                self._thread.start()
+                # 进程退出前写入剩余数据
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            batch = []
+            markers = []
+            stop = False
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, _Flush):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.done.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[Any]) -> None:
+        try:
+            with self.session_factory() as session:
+                self.handler(session, batch)
+                session.commit()
+            self.batch_count += 1
+            self.written_count += len(batch)
+        except Exception as e:
+            logger.error(f"批量写入失败（{self.name}，{len(batch)} 条）：{str(e)}")
+            if self.on_error is not None:
+                self.on_error(batch)
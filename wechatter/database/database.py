@@ -1,18 +1,30 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from wechatter.config import config
+from wechatter.database.engine_profile import create_sqlite_engine
+from wechatter.database.migrations import run_migrations
 from wechatter.database.tables import Base
 from wechatter.utils import get_abs_path
 
 DB_PATH = get_abs_path("data/wechatter.sqlite")
 
-engine = create_engine(f"sqlite:///{DB_PATH}")
+_database_config = config.get("database") or {}
+engine = create_sqlite_engine(
+    DB_PATH,
+    pragmas=_database_config.get("pragmas"),
+    pool=_database_config.get("pool"),
+)
+# 提交后不让对象过期：提交后读取属性（如新消息的 id）不再重新查询数据库，
+# 会话关闭后对象仍可读取。数据库默认值（如 created_time）只在查询中使用，提交后不会读取
+make_db_session = sessionmaker(engine, expire_on_commit=False)
 
 
-# 创建数据库会话函数，在上下文管理器中使用
-make_db_session = sessionmaker(engine)
-
-
-# 创建数据库表
 def create_tables():
     Base.metadata.create_all(engine, checkfirst=True)
+
+
+def migrate_tables():
+    """
+    执行尚未执行的数据库迁移（如为已有的表添加索引），在 create_tables 之后调用
+    """
+    run_migrations(engine)
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import Engine, create_engine, event
+
+# SQLite 连接参数（每个新连接建立时执行 PRAGMA）
+DEFAULT_PRAGMAS: Dict[str, object] = {
+    # 删除数据后可以用 PRAGMA incremental_vacuum 分批回收空间（只对新建的数据库生效，
+    # 已有的数据库需要执行一次 VACUUM 才能切换）
+    "auto_vacuum": "INCREMENTAL",
+    # WAL 模式：读写互不阻塞，提交时只追加写 WAL 文件
+    "journal_mode": "WAL",
+    # WAL 模式下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务，数据库不会损坏
+    "synchronous": "NORMAL",
+    # 数据库被其他连接锁定时最多等待的毫秒数，避免并发写入时直接报 database is locked
+    "busy_timeout": 5000,
+    # 页缓存大小，负数表示 KiB（64MB）
+    "cache_size": -64000,
+    # 内存映射读取的最大字节数（256MB）
+    "mmap_size": 268435456,
+    # 临时表和排序使用内存
+    "temp_store": "MEMORY",
+}
+
+# 连接池默认参数：Web 线程、定时任务线程、消息处理线程和批量写入线程各自持有连接
+DEFAULT_POOL: Dict[str, object] = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+}
+
+
+def apply_sqlite_pragmas(
+    engine: Engine, pragmas: Optional[Dict[str, object]] = None
+) -> Dict[str, object]:
+    """
+    为引擎注册连接事件，每个新建立的 SQLite 连接都执行一遍 PRAGMA
+    :param engine: SQLite 引擎
+    :param pragmas: 要设置的 PRAGMA，与默认值合并，值为 None 时不设置该项
+    :return: 实际生效的 PRAGMA
+    """
+    merged = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+    merged = {name: value for name, value in merged.items() if value is not None}
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in merged.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return merged
+
+
+def create_sqlite_engine(
+    path: str,
+    pragmas: Optional[Dict[str, object]] = None,
+    pool: Optional[Dict[str, object]] = None,
+    **kwargs,
+) -> Engine:
+    """
+    创建使用性能配置的 SQLite 文件数据库引擎
+    :param path: 数据库文件路径
+    :param pragmas: PRAGMA 配置，与 DEFAULT_PRAGMAS 合并
+    :param pool: 连接池配置，与 DEFAULT_POOL 合并
+    :param kwargs: 其他传给 create_engine 的参数
+    """
+    merged_pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+    busy_timeout = merged_pragmas.get("busy_timeout") or 5000
+    engine = create_engine(
+        f"sqlite:///{path}",
+        # sqlite3 驱动自身的锁等待时间（秒），与 busy_timeout 保持一致
+        connect_args={"timeout": int(busy_timeout) / 1000},
+        **{**DEFAULT_POOL, **(pool or {})},
+        **kwargs,
+    )
+    applied = apply_sqlite_pragmas(engine, pragmas)
+    logger.debug(f"SQLite 数据库 {path} 使用 PRAGMA：{applied}")
+    return engine
@@ -0,0 +1,274 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Type
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from wechatter.config import config
+from wechatter.database.batch_writer import BatchWriter
+from wechatter.database.database import make_db_session
+from wechatter.database.tables import Base
+from wechatter.database.tables.group import Group as DbGroup
+from wechatter.database.tables.message import Message as DbMessage
+from wechatter.database.tables.person import Person as DbPerson
+from wechatter.database.tables.person_group_relation import PersonGroupRelation
+from wechatter.models.wechat import Message
+from wechatter.utils import IdentityCache
+
+# 用户已存在时更新的字段，与 Person.update 一致
+_PERSON_UPDATE_COLUMNS = (
+    "name",
+    "alias",
+    "gender",
+    "province",
+    "city",
+    "is_star",
+    "is_friend",
+    "is_official_account",
+    "is_gaming",
+)
+# 群成员已存在时只更新名称和备注
+_MEMBER_UPDATE_COLUMNS = ("name", "alias")
+# 群组已存在时更新的字段，与 Group.update 一致
+_GROUP_UPDATE_COLUMNS = ("name", "is_gaming")
+
+
+class IngestRows(NamedTuple):
+    """
+    一条收到的消息需要写入的数据，在提交时生成，之后修改消息对象不影响写入的内容。
+    用户/群组信息与上次写入的相同时为 None，群成员列表与上次同步的相同时为 None
+    """
+
+    person: Optional[dict]
+    group: Optional[dict]
+    members: Optional[List[dict]]
+    message: dict
+    # 收到的消息对象，写入后回填数据库分配的消息 id
+    source: Message
+
+
+def _fingerprint(row: dict) -> tuple:
+    return tuple(row.values())
+
+
+def _member_set_hash(members: List[dict]) -> int:
+    """
+    群成员列表的指纹，与成员的顺序无关
+    """
+    return hash(frozenset((m["id"], m["name"], m["alias"]) for m in members))
+
+
+def _ingest_rows(
+    message: Message,
+    person_cache: Optional[IdentityCache] = None,
+    group_cache: Optional[IdentityCache] = None,
+    member_cache: Optional[IdentityCache] = None,
+) -> IngestRows:
+    """
+    生成需要写入的数据，用户/群组信息和群成员列表与缓存中上次写入的相同时跳过
+    """
+    group = None
+    members = None
+    if message.is_group:
+        group = DbGroup.row_from_model(message.group)
+        if group_cache is not None and not group_cache.changed(
+            group["id"], _fingerprint(group)
+        ):
+            group = None
+        # 没有成员列表（如 QQ 群）时不同步群成员
+        if message.group.member_list:
+            members = [
+                DbPerson.row_from_member_model(m) for m in message.group.member_list
+            ]
+            if member_cache is not None and not member_cache.changed(
+                message.group.id, _member_set_hash(members)
+            ):
+                members = None
+            elif person_cache is not None:
+                # 群成员信息会覆盖用户的名称和备注，这些用户需要重新写入
+                person_cache.invalidate(m["id"] for m in members)
+    person = DbPerson.row_from_model(message.person)
+    if person_cache is not None and not person_cache.changed(
+        person["id"], _fingerprint(person)
+    ):
+        person = None
+    return IngestRows(
+        person=person,
+        group=group,
+        members=members,
+        message=DbMessage.row_from_model(message),
+        source=message,
+    )
+
+
+def _upsert(
+    session: Session, table: Type[Base], rows: Dict[str, dict], update_columns
+) -> None:
+    if not rows:
+        return
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.id],
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+    session.execute(stmt, list(rows.values()))
+
+
+def _sync_members(session: Session, group_members: Dict[str, List[dict]]) -> None:
+    """
+    同步群成员：与数据库中的成员列表比较，只写入新增或名称/备注变化的成员，
+    并添加或删除用户和群组的关系
+    """
+    if not group_members:
+        return
+    current: Dict[str, Dict[str, tuple]] = {group_id: {} for group_id in group_members}
+    for group_id, person_id, name, alias in session.execute(
+        select(PersonGroupRelation.group_id, DbPerson.id, DbPerson.name, DbPerson.alias)
+        .join(DbPerson, DbPerson.id == PersonGroupRelation.person_id)
+        .where(PersonGroupRelation.group_id.in_(list(group_members)))
+    ):
+        current[group_id][person_id] = (name, alias)
+
+    changed: Dict[str, dict] = {}
+    added: List[dict] = []
+    for group_id, members in group_members.items():
+        existing = current[group_id]
+        member_ids = set()
+        for member in members:
+            member_ids.add(member["id"])
+            if existing.get(member["id"]) != (member["name"], member["alias"]):
+                changed[member["id"]] = member
+            if member["id"] not in existing:
+                added.append({"person_id": member["id"], "group_id": group_id})
+        removed = [person_id for person_id in existing if person_id not in member_ids]
+        if removed:
+            session.execute(
+                delete(PersonGroupRelation).where(
+                    PersonGroupRelation.group_id == group_id,
+                    PersonGroupRelation.person_id.in_(removed),
+                )
+            )
+    _upsert(session, DbPerson, changed, _MEMBER_UPDATE_COLUMNS)
+    if added:
+        session.execute(insert(PersonGroupRelation).on_conflict_do_nothing(), added)
+
+
+def _write_ingest(session: Session, batch: List[IngestRows]) -> None:
+    # 同一批中同一用户/群组只写入最后一次的信息
+    persons: Dict[str, dict] = {}
+    groups: Dict[str, dict] = {}
+    group_members: Dict[str, List[dict]] = {}
+    for rows in batch:
+        if rows.person is not None:
+            persons[rows.person["id"]] = rows.person
+        if rows.group is not None:
+            groups[rows.group["id"]] = rows.group
+        if rows.members is not None:
+            group_members[rows.message["group_id"]] = rows.members
+    # 先写入群成员，再写入消息发送者，发送者的完整信息覆盖群成员信息
+    _sync_members(session, group_members)
+    _upsert(session, DbPerson, persons, _PERSON_UPDATE_COLUMNS)
+    _upsert(session, DbGroup, groups, _GROUP_UPDATE_COLUMNS)
+    # 消息 id 由数据库分配，多个进程（如 QQ 和微信机器人）共用同一个数据库时不会冲突
+    message_ids = session.scalars(
+        insert(DbMessage).returning(DbMessage.id, sort_by_parameter_order=True),
+        [rows.message for rows in batch],
+    ).all()
+    for rows, message_id in zip(batch, message_ids):
+        rows.source.id = message_id
+
+
+_ingest_config = config.get("ingest") or {}
+_identity_cache_size = _ingest_config.get("identity_cache_size", 10000)
+# 用户/群组上次写入的信息和群成员列表的指纹，未变化时不再写入，为 None 时每条消息都写入
+person_cache: Optional[IdentityCache] = None
+group_cache: Optional[IdentityCache] = None
+member_cache: Optional[IdentityCache] = None
+if _identity_cache_size:
+    person_cache = IdentityCache(max_size=_identity_cache_size)
+    group_cache = IdentityCache(max_size=_identity_cache_size)
+    member_cache = IdentityCache(max_size=_identity_cache_size)
+
+
+def invalidate_identity(
+    person_ids: Iterable[str] = (), group_ids: Iterable[str] = ()
+) -> None:
+    """
+    使用户/群组的缓存失效，在其他地方修改了数据库中的用户/群组信息后调用，下一条消息会重新写入
+    """
+    if person_cache is not None:
+        person_cache.invalidate(person_ids)
+    if group_cache is not None:
+        group_ids = list(group_ids)
+        group_cache.invalidate(group_ids)
+        member_cache.invalidate(group_ids)
+
+
+def status_lines() -> List[str]:
+    """
+    获取用户/群组信息缓存的状态，用于 /bot 命令，未启用时返回空列表
+    """
+    if person_cache is None:
+        return []
+    return [
+        "🪪 用户信息缓存",
+        f"用户: {len(person_cache)}个，命中率 {person_cache.hit_rate:.1%}",
+        f"群组: {len(group_cache)}个，命中率 {group_cache.hit_rate:.1%}",
+        f"群成员列表: {len(member_cache)}个，命中率 {member_cache.hit_rate:.1%}",
+    ]
+
+
+def _forget_batch(batch: List[IngestRows]) -> None:
+    # 写入失败时已回填的消息 id 没有提交
+    for rows in batch:
+        rows.source.id = None
+    # 写入失败时缓存中的记录与数据库不一致，需要失效
+    invalidate_identity(
+        [rows.person["id"] for rows in batch if rows.person is not None],
+        [
+            rows.message["group_id"]
+            for rows in batch
+            if rows.group is not None or rows.members is not None
+        ],
+    )
+
+
+# 收到的消息由后台线程批量写入数据库，为 None 时同步写入
+ingest_writer: Optional[BatchWriter] = None
+if _ingest_config.get("enabled", True):
+    ingest_writer = BatchWriter(
+        "ingest",
+        _write_ingest,
+        flush_interval=_ingest_config.get("flush_interval", 0.05),
+        max_batch=_ingest_config.get("max_batch", 500),
+        on_error=_forget_batch,
+    )
+
+
+def ingest_message(message: Message) -> None:
+    """
+    保存收到的消息，并添加或更新消息的发送者、所在群组和群成员（线程安全）。
+    数据库写入由后台线程在一个事务中批量完成，写入后 message.id 为数据库分配的消息 id，
+    需要使用消息 id 时先调用 flush_ingest
+    """
+    rows = _ingest_rows(message, person_cache, group_cache, member_cache)
+    if ingest_writer is None:
+        try:
+            with make_db_session() as session:
+                _write_ingest(session, [rows])
+                session.commit()
+        except Exception:
+            _forget_batch([rows])
+            raise
+    else:
+        ingest_writer.submit(rows)
+
+
+def flush_ingest(timeout: float = 5) -> bool:
+    """
+    等待已收到的消息全部写入数据库，需要读取刚收到的消息所在的行时调用
+    :return: 是否在超时前完成
+    """
+    if ingest_writer is None:
+        return True
+    return ingest_writer.flush(timeout)
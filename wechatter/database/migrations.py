@@ -0,0 +1,153 @@
+from typing import Callable, List, NamedTuple, Optional, Union
+
+from loguru import logger
+from sqlalchemy import Connection, Engine, text
+
+
+class Migration(NamedTuple):
+    """
+    数据库迁移：version 从 1 开始递增
+    """
+
+    version: int
+    description: str
+    # SQL 语句，或接收数据库连接的函数（用于没有 IF NOT EXISTS 的语句）
+    statements: List[Union[str, Callable[[Connection], None]]]
+    # 判断数据库是否支持该迁移，不支持时跳过迁移中的语句，只更新版本号
+    supported: Optional[Callable[[Connection], bool]] = None
+
+
+def add_column(
+    table: str, column: str, definition: str
+) -> Callable[[Connection], None]:
+    """
+    添加列的迁移语句，列已存在（新建的数据库由 create_all 建好）时跳过
+    :param table: 表名
+    :param column: 列名
+    :param definition: 列的类型和约束，如 "VARCHAR(11) NOT NULL DEFAULT 'a'"
+    """
+
+    def run(conn: Connection) -> None:
+        columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+
+    return run
+
+
+def fts5_trigram_supported(conn: Connection) -> bool:
+    """
+    SQLite 是否支持 FTS5 全文索引的 trigram 分词（需要 3.34.0 及以上版本）
+    """
+    version = conn.execute(text("SELECT sqlite_version()")).scalar()
+    if tuple(int(part) for part in version.split(".")[:3]) < (3, 34, 0):
+        return False
+    return bool(
+        conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar()
+    )
+
+
+# 新建的数据库由 create_all 按表定义直接建好索引和列，迁移中的语句需要可以重复执行（IF NOT EXISTS）。
+# SQLite 驱动不会为 DDL 开启事务，迁移中途失败时版本号不会更新，下次启动会重新执行整个迁移
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "为常用查询添加索引",
+        [
+            # 引用消息：按 QQ 消息 id 查找
+            "CREATE INDEX IF NOT EXISTS ix_message_msg_id ON message (msg_id)",
+            # 引用回复：按可引用消息的 id 查找
+            "CREATE INDEX IF NOT EXISTS ix_quoted_response_quotable_id ON quoted_response (quotable_id)",
+            # 当前对话：按用户、模型和是否正在对话查找
+            "CREATE INDEX IF NOT EXISTS ix_gpt_chat_info_person_id_model_is_chatting "
+            "ON gpt_chat_info (person_id, model, is_chatting)",
+            # 未结束的游戏：按群或用户查找
+            "CREATE INDEX IF NOT EXISTS ix_game_states_host_group_id_is_over "
+            "ON game_states (host_group_id, is_over)",
+            "CREATE INDEX IF NOT EXISTS ix_game_states_host_person_id_is_over "
+            "ON game_states (host_person_id, is_over)",
+            # 群发消息：按用户名查找
+            "CREATE INDEX IF NOT EXISTS ix_person_name ON person (name)",
+            # 命令统计：按命令名查找
+            "CREATE INDEX IF NOT EXISTS ix_command_stats_command_name ON command_stats (command_name)",
+        ],
+    ),
+    Migration(
+        2,
+        "添加消息全文索引",
+        [
+            # 外部内容表：只保存索引，内容从 message 表读取。trigram 分词按每 3 个字符建索引，
+            # 中文不需要分词，但少于 3 个字的关键词无法使用索引
+            "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+            "content, content='message', content_rowid='id', tokenize='trigram')",
+            # 写入、删除（如归档）和修改消息时同步更新索引
+            "CREATE TRIGGER IF NOT EXISTS message_fts_ai AFTER INSERT ON message BEGIN "
+            "INSERT INTO message_fts (rowid, content) VALUES (new.id, new.content); END",
+            "CREATE TRIGGER IF NOT EXISTS message_fts_ad AFTER DELETE ON message BEGIN "
+            "INSERT INTO message_fts (message_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+            "CREATE TRIGGER IF NOT EXISTS message_fts_au AFTER UPDATE OF content ON message BEGIN "
+            "INSERT INTO message_fts (message_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+            "INSERT INTO message_fts (rowid, content) VALUES (new.id, new.content); END",
+            # 为已有的消息建立索引
+            "INSERT INTO message_fts (message_fts) VALUES ('rebuild')",
+        ],
+        # 不支持时搜索聊天记录逐条匹配
+        supported=fts5_trigram_supported,
+    ),
+    Migration(
+        3,
+        "发件箱保存消息的发送优先级",
+        [
+            # 之前保存的消息按回复用户命令的优先级恢复
+            add_column(
+                "qq_outbox", "priority", "VARCHAR(11) NOT NULL DEFAULT 'interactive'"
+            ),
+        ],
+    ),
+]
+
+
+def get_schema_version(engine: Engine) -> int:
+    """
+    获取数据库当前的结构版本（保存在 SQLite 的 user_version 中）
+    """
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def run_migrations(engine: Engine, migrations: List[Migration] = None) -> int:
+    """
+    按版本顺序执行尚未执行的迁移，每个迁移的语句全部执行成功后才更新版本号
+    :param engine: 数据库引擎
+    :param migrations: 迁移列表，默认为 MIGRATIONS
+    :return: 执行的迁移数量
+    """
+    migrations = sorted(
+        MIGRATIONS if migrations is None else migrations, key=lambda m: m.version
+    )
+    current = get_schema_version(engine)
+    applied = 0
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+        logger.info(f"正在执行数据库迁移 {migration.version}：{migration.description}")
+        with engine.begin() as conn:
+            if migration.supported is not None and not migration.supported(conn):
+                logger.warning(
+                    f"数据库不支持迁移 {migration.version}：{migration.description}，已跳过"
+                )
+            else:
+                for statement in migration.statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(text(statement))
+            conn.execute(text(f"PRAGMA user_version = {int(migration.version)}"))
+        current = migration.version
+        applied += 1
+    if applied:
+        with engine.connect() as conn:
+            # 更新查询优化器使用的统计信息
+            conn.execute(text("PRAGMA optimize"))
+        logger.info(f"数据库迁移完成，当前版本 {current}")
+    return applied
@@ -0,0 +1,231 @@
+import string
+import threading
+from collections import deque
+from typing import Deque, List, Optional
+
+from loguru import logger
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from wechatter.config import config
+from wechatter.database.database import make_db_session
+from wechatter.database.tables.quotable_sequence import QuotableSequence
+from wechatter.database.tables.quoted_response import QuotedResponse as DbQuotedResponse
+from wechatter.models.wechat import QuotedResponse
+from wechatter.utils import LRUCache
+
+# quotable_id 是由 10 个数字加 52 个大小写字母组成的三位字符串
+CHARS = string.digits + string.ascii_letters
+ID_LENGTH = 3
+ID_SPACE = len(CHARS) ** ID_LENGTH
+# 分配进度表中唯一一行的主键
+_SEQUENCE_ROW_ID = 1
+
+
+def encode_quotable_id(value: int) -> str:
+    """
+    将序号转换为可引用消息 id，超过 ZZZ 后从 000 开始
+    """
+    value %= ID_SPACE
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, index = divmod(value, len(CHARS))
+        chars.append(CHARS[index])
+    return "".join(reversed(chars))
+
+
+def decode_quotable_id(quotable_id: str) -> Optional[int]:
+    """
+    将可引用消息 id 转换为序号，不是合法的 id 时返回 None
+    """
+    value = 0
+    for char in quotable_id:
+        index = CHARS.find(char)
+        if index < 0:
+            return None
+        value = value * len(CHARS) + index
+    return value
+
+
+class QuotableIdAllocator:
+    """
+    可引用消息 id 分配器
+
+    每次从数据库预留 block_size 个连续的序号（原子地增加分配进度表中的最高序号），之后在内存中分配，
+    多个线程或进程不会分配到相同的 id。序号超过 id 的数量后回绕，回绕时跳过仍可引用的 id：
+    最近 live_count 条可引用消息使用的 id 不会被再次分配。
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = make_db_session,
+        block_size: int = 100,
+        live_count: int = 100000,
+    ):
+        """
+        :param session_factory: 数据库会话工厂
+        :param block_size: 每次预留的序号数量
+        :param live_count: 最近多少条可引用消息的 id 仍可引用，应小于 id 的数量（62^3）
+        """
+        self.session_factory = session_factory
+        self.block_size = block_size
+        self.live_count = live_count
+        self.reserved_count = 0
+        self.skipped_count = 0
+        self._ids: Deque[str] = deque()
+        self._lock = threading.Lock()
+
+    def allocate(self) -> str:
+        """
+        分配一个可引用消息 id（线程安全）
+        """
+        with self._lock:
+            # 最多预留一轮，所有 id 都仍可引用时使用预留的第一个 id
+            for _ in range(-(-ID_SPACE // self.block_size)):
+                if self._ids:
+                    return self._ids.popleft()
+                fallback = self._reserve()
+            logger.warning(f"所有可引用消息 id 都仍可引用，重复使用 id：{fallback}")
+            return fallback
+
+    def reset(self) -> None:
+        """
+        丢弃已预留但未分配的 id，切换数据库后调用
+        """
+        with self._lock:
+            self._ids.clear()
+
+    def _reserve(self) -> str:
+        """
+        预留一批序号，将其中不是仍可引用的 id 加入待分配队列
+        :return: 预留的第一个 id
+        """
+        with self.session_factory() as session:
+            # 先更新再读取，更新时取得数据库的写锁，其他进程的预留会等待本事务提交
+            end = self._advance(session)
+            if end is None:
+                session.execute(
+                    insert(QuotableSequence)
+                    .values(
+                        id=_SEQUENCE_ROW_ID, next_value=self._initial_value(session)
+                    )
+                    .on_conflict_do_nothing()
+                )
+                end = self._advance(session)
+            candidates = [
+                encode_quotable_id(value) for value in range(end - self.block_size, end)
+            ]
+            live = self._live_ids(session, candidates)
+            session.commit()
+        self.reserved_count += len(candidates)
+        self.skipped_count += len(live)
+        self._ids.extend(
+            quotable_id for quotable_id in candidates if quotable_id not in live
+        )
+        return candidates[0]
+
+    def _advance(self, session: Session) -> Optional[int]:
+        return session.scalar(
+            update(QuotableSequence)
+            .where(QuotableSequence.id == _SEQUENCE_ROW_ID)
+            .values(next_value=QuotableSequence.next_value + self.block_size)
+            .returning(QuotableSequence.next_value)
+        )
+
+    @staticmethod
+    def _initial_value(session: Session) -> int:
+        """
+        第一次预留时从最后一条可引用消息的下一个 id 开始，与之前按最后一条递增的方式衔接
+        """
+        last = session.scalar(
+            select(DbQuotedResponse.quotable_id)
+            .order_by(DbQuotedResponse.id.desc())
+            .limit(1)
+        )
+        value = decode_quotable_id(last) if last else None
+        return 0 if value is None else value + 1
+
+    def _live_ids(self, session: Session, candidates: List[str]) -> set:
+        """
+        返回 candidates 中被最近 live_count 条可引用消息使用的 id
+        """
+        if not self.live_count:
+            return set()
+        last_id = session.scalar(select(func.max(DbQuotedResponse.id)))
+        if last_id is None:
+            return set()
+        return set(
+            session.scalars(
+                select(DbQuotedResponse.quotable_id).where(
+                    DbQuotedResponse.quotable_id.in_(candidates),
+                    DbQuotedResponse.id > last_id - self.live_count,
+                )
+            )
+        )
+
+
+_quotable_config = config.get("quotable") or {}
+quotable_id_allocator = QuotableIdAllocator(
+    block_size=_quotable_config.get("block_size", 100),
+    live_count=_quotable_config.get("live_count", 100000),
+)
+_cache_size = _quotable_config.get("cache_size", 1000)
+# 最近的可引用消息 id 对应的命令和回复，引用回复时不需要查询数据库，为 None 时不缓存
+quoted_response_cache: Optional[LRUCache] = (
+    LRUCache(_cache_size) if _cache_size else None
+)
+
+
+def save_quoted_response(quoted_response: QuotedResponse) -> None:
+    """
+    保存可引用消息的命令和回复，quotable_id 需要已由分配器分配
+    """
+    with make_db_session() as session:
+        db_quoted_response = DbQuotedResponse.from_model(quoted_response)
+        session.add(db_quoted_response)
+        session.commit()
+        quoted_response.id = db_quoted_response.id
+    if quoted_response_cache is not None:
+        quoted_response_cache.put(quoted_response.quotable_id, quoted_response)
+
+
+def get_quoted_response(quotable_id: str) -> Optional[QuotedResponse]:
+    """
+    获取可引用消息 id 最近一次对应的命令和回复，先查找缓存
+    :return: 没有找到时返回 None
+    """
+    if quoted_response_cache is not None:
+        quoted_response = quoted_response_cache.get(quotable_id)
+        if quoted_response is not None:
+            return quoted_response
+    with make_db_session() as session:
+        db_quoted_response = session.scalar(
+            select(DbQuotedResponse)
+            .where(DbQuotedResponse.quotable_id == quotable_id)
+            .order_by(DbQuotedResponse.id.desc())
+            .limit(1)
+        )
+        if db_quoted_response is None:
+            return None
+        quoted_response = db_quoted_response.to_model()
+    if quoted_response_cache is not None:
+        quoted_response_cache.put(quotable_id, quoted_response)
+    return quoted_response
+
+
+def status_lines() -> List[str]:
+    """
+    获取可引用消息 id 分配器和缓存的状态，用于 /bot 命令
+    """
+    lines = [
+        "💬 可引用消息",
+        f"已预留 id: {quotable_id_allocator.reserved_count}个，"
+        f"跳过仍可引用的 id: {quotable_id_allocator.skipped_count}个",
+    ]
+    if quoted_response_cache is not None:
+        lines.append(
+            f"缓存: {len(quoted_response_cache)}条，"
+            f"命中率 {quoted_response_cache.hit_rate:.1%}"
+        )
+    return lines
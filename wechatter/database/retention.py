@@ -0,0 +1,329 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Type
+
+from loguru import logger
+from sqlalchemy import and_, delete, exists, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from wechatter.config import config
+from wechatter.database.database import make_db_session
+from wechatter.database.tables import Base
+from wechatter.database.tables.activity_rollup import ActivityDaily
+from wechatter.database.tables.gpt_chat_message import GptChatMessage
+from wechatter.database.tables.group import Group as DbGroup
+from wechatter.database.tables.message import Message as DbMessage
+from wechatter.utils import get_abs_path
+
+
+class RetentionTable(NamedTuple):
+    """
+    可以按保留期归档的表
+    """
+
+    model: Type[Base]
+    # 按该列的时间判断是否过期，也按该列的月份划分归档文件
+    time_column: str
+    # 按群设置保留期时使用的列，为 None 时不支持按群设置
+    group_column: Optional[str]
+    # 时间列是否为 UTC 时间
+    utc: bool
+    # 返回不归档的行的条件
+    keep: Optional[Callable] = None
+
+
+RETENTION_TABLES: Dict[str, RetentionTable] = {
+    # created_time 由数据库默认值 CURRENT_TIMESTAMP 写入，为 UTC 时间。
+    # GPT 对话记录引用的消息不归档，否则对话历史会缺失
+    "message": RetentionTable(
+        DbMessage,
+        "created_time",
+        "group_id",
+        utc=True,
+        keep=lambda: exists().where(GptChatMessage.message_id == DbMessage.id),
+    ),
+    "activity_daily": RetentionTable(
+        ActivityDaily, "bucket_day", "group_id", utc=False
+    ),
+}
+
+
+class RetentionPolicy(NamedTuple):
+    """
+    表的保留期
+    """
+
+    table: str
+    # 保留天数，为 0 或 None 时永久保留
+    days: Optional[float]
+    # 按群设置的保留天数（群 id 或群名），为 0 时永久保留
+    group_days: Dict[str, float] = {}
+
+
+def parse_policies(policies: Optional[Dict[str, dict]]) -> List[RetentionPolicy]:
+    """
+    解析配置文件中的保留期
+    :param policies: {表名: {"days": 天数, "group_days": {群 id 或群名: 天数}}}
+    """
+    result = []
+    for table, policy in (policies or {}).items():
+        if table not in RETENTION_TABLES:
+            raise ValueError(f"不支持按保留期归档的表：{table}")
+        policy = policy or {}
+        result.append(
+            RetentionPolicy(
+                table=table,
+                days=policy.get("days"),
+                group_days=policy.get("group_days") or {},
+            )
+        )
+    return result
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def iter_archive(path: str) -> Iterator[dict]:
+    """
+    读取归档文件中的行
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Retention:
+    """
+    按保留期将过期的行归档到按月划分的 gzip 文件（JSON Lines），再从数据库中删除。
+
+    每批最多处理 batch_size 行，每批在一个短事务中删除，批之间暂停 batch_pause 秒，
+    不会长时间占用数据库的写锁。归档文件先于删除写入，删除失败时下次会重复归档这些行。
+    """
+
+    def __init__(
+        self,
+        policies: List[RetentionPolicy],
+        archive_dir: str,
+        session_factory: sessionmaker = make_db_session,
+        batch_size: int = 500,
+        batch_pause: float = 0.1,
+        vacuum: str = "incremental",
+        vacuum_pages: int = 1000,
+    ):
+        """
+        :param policies: 各表的保留期
+        :param archive_dir: 归档目录，每个表一个子目录，每月一个文件
+        :param session_factory: 数据库会话工厂
+        :param batch_size: 每批归档的行数
+        :param batch_pause: 每批之间暂停的秒数
+        :param vacuum: 归档后回收空间的方式：incremental（需要数据库为增量自动清理模式）、full 或 none
+        :param vacuum_pages: 增量清理时每次回收的页数
+        """
+        if vacuum not in ("incremental", "full", "none"):
+            raise ValueError(f"不支持的空间回收方式：{vacuum}")
+        self.policies = policies
+        self.archive_dir = archive_dir
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum = vacuum
+        self.vacuum_pages = vacuum_pages
+        self._run_lock = threading.Lock()
+
+    def run(self) -> Dict[str, int]:
+        """
+        归档所有过期的行，并回收数据库空间
+        :return: 各表归档的行数
+        """
+        archived = {}
+        with self._run_lock:
+            for policy in self.policies:
+                count = self._archive_table(policy)
+                if count:
+                    archived[policy.table] = count
+                    logger.info(f"已归档 {policy.table} 表中 {count} 条过期数据")
+            if archived:
+                self._reclaim_space()
+        return archived
+
+    def _expired(self, policy: RetentionPolicy):
+        """
+        过期行的条件，没有需要归档的行时返回 None
+        """
+        table = RETENTION_TABLES[policy.table]
+        time_column = getattr(table.model, table.time_column)
+        now = datetime.utcnow() if table.utc else datetime.now()
+        group_days = (
+            self._resolve_groups(policy.group_days) if table.group_column else {}
+        )
+        clauses = []
+        if policy.days:
+            clause = time_column < now - timedelta(days=policy.days)
+            if group_days:
+                group_column = getattr(table.model, table.group_column)
+                clause = and_(
+                    clause,
+                    or_(group_column.is_(None), group_column.not_in(list(group_days))),
+                )
+            clauses.append(clause)
+        for group_id, days in group_days.items():
+            if days:
+                group_column = getattr(table.model, table.group_column)
+                clauses.append(
+                    and_(
+                        group_column == group_id,
+                        time_column < now - timedelta(days=days),
+                    )
+                )
+        if not clauses:
+            return None
+        expired = or_(*clauses)
+        if table.keep is not None:
+            expired = and_(expired, ~table.keep())
+        return expired
+
+    def _resolve_groups(self, group_days: Dict[str, float]) -> Dict[str, float]:
+        """
+        将群名转换为群 id，找不到同名的群时按群 id 处理
+        """
+        if not group_days:
+            return {}
+        with self.session_factory() as session:
+            ids_by_name: Dict[str, List[str]] = {}
+            for group_id, name in session.execute(
+                select(DbGroup.id, DbGroup.name).where(
+                    DbGroup.name.in_(list(group_days))
+                )
+            ):
+                ids_by_name.setdefault(name, []).append(group_id)
+        resolved = {}
+        for key, days in group_days.items():
+            for group_id in ids_by_name.get(key, [key]):
+                resolved[group_id] = days
+        return resolved
+
+    def _archive_table(self, policy: RetentionPolicy) -> int:
+        expired = self._expired(policy)
+        if expired is None:
+            return 0
+        table = RETENTION_TABLES[policy.table]
+        model = table.model
+        primary_key = model.__mapper__.primary_key[0]
+        total = 0
+        while True:
+            with self.session_factory() as session:
+                ids = session.scalars(
+                    select(primary_key)
+                    .where(expired)
+                    .order_by(primary_key)
+                    .limit(self.batch_size)
+                ).all()
+                if not ids:
+                    break
+                rows = (
+                    session.execute(select(model.__table__).where(primary_key.in_(ids)))
+                    .mappings()
+                    .all()
+                )
+                self._write_archive(policy.table, table.time_column, rows)
+                session.execute(delete(model).where(primary_key.in_(ids)))
+                session.commit()
+            total += len(ids)
+            if len(ids) < self.batch_size:
+                break
+            # 让出写锁，其他线程的写入可以在批之间进行
+            time.sleep(self.batch_pause)
+        return total
+
+    def _write_archive(self, table_name: str, time_column: str, rows) -> None:
+        months: Dict[str, List[dict]] = {}
+        for row in rows:
+            row_time = row[time_column]
+            month = row_time.strftime("%Y-%m") if row_time else "unknown"
+            months.setdefault(month, []).append(dict(row))
+        directory = os.path.join(self.archive_dir, table_name)
+        os.makedirs(directory, exist_ok=True)
+        for month, month_rows in months.items():
+            # 追加写入时每批是一个新的 gzip 成员，读取时会依次解压
+            path = os.path.join(directory, f"{month}.jsonl.gz")
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                for row in month_rows:
+                    f.write(json.dumps(row, ensure_ascii=False, default=_json_default))
+                    f.write("\n")
+
+    def _reclaim_space(self) -> None:
+        if self.vacuum == "none":
+            return
+        engine = self.session_factory.kw["bind"]
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if self.vacuum == "full":
+                # VACUUM 会重建整个数据库，期间其他连接无法写入
+                cursor.execute("VACUUM")
+                return
+            # auto_vacuum: 2 = INCREMENTAL
+            if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logger.info(
+                    "数据库不是增量自动清理模式，跳过空间回收（可手动执行一次 VACUUM 切换）"
+                )
+                return
+            free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            # 分多次回收，每次只短暂占用写锁
+            for _ in range(0, free_pages, self.vacuum_pages):
+                # sqlite3 的 execute 只执行一步（只回收一页），executescript 会执行完整条语句
+                cursor.executescript(
+                    f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});"
+                )
+                time.sleep(self.batch_pause)
+            logger.info(f"已回收 {free_pages} 个数据库空闲页")
+        finally:
+            connection.close()
+
+
+_retention_config = (config.get("database") or {}).get("retention") or {}
+# 为 None 时不归档
+retention: Optional[Retention] = None
+if _retention_config.get("enabled", False):
+    retention = Retention(
+        parse_policies(_retention_config.get("policies")),
+        get_abs_path(_retention_config.get("archive_dir", "data/archive")),
+        batch_size=_retention_config.get("batch_size", 500),
+        batch_pause=_retention_config.get("batch_pause", 0.1),
+        vacuum=_retention_config.get("vacuum", "incremental"),
+    )
+
+_retention_thread: Optional[threading.Thread] = None
+
+
+def start_retention() -> None:
+    """
+    启动后台归档线程，启动后每隔 interval 秒归档一次过期数据
+    """
+    global _retention_thread
+    if retention is None or _retention_thread is not None:
+        return
+    interval = _retention_config.get("interval", 86400)
+
+    def run():
+        while True:
+            try:
+                retention.run()
+            except Exception as e:
+                logger.error(f"归档过期数据失败：{str(e)}")
+            time.sleep(interval)
+
+    _retention_thread = threading.Thread(target=run, name="retention", daemon=True)
+    _retention_thread.start()
+    logger.info("数据归档线程已启动")
@@ -0,0 +1,159 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, desc, func, select, union_all
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from wechatter.database.tables.activity_rollup import ActivityDaily, ActivityHourly
+
+# (group_id, person_id, command)，私聊和不是命令的消息对应的字段为空字符串
+ActivityKey = Tuple[str, str, str]
+
+_UNIQUE_COLUMNS = ("group_id", "person_id", "command")
+
+
+def hour_bucket(time: datetime) -> datetime:
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(time: datetime) -> datetime:
+    return time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_counts(
+    session: Session,
+    table,
+    bucket_column: str,
+    bucket: datetime,
+    delta: Dict[ActivityKey, int],
+) -> None:
+    if not delta:
+        return
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[bucket_column, *_UNIQUE_COLUMNS],
+        set_={"message_count": table.message_count + stmt.excluded.message_count},
+    )
+    session.execute(
+        stmt,
+        [
+            {
+                bucket_column: bucket,
+                "group_id": group_id,
+                "person_id": person_id,
+                "command": command,
+                "message_count": count,
+            }
+            for (group_id, person_id, command), count in delta.items()
+        ],
+    )
+
+
+def add_hourly_counts(
+    session: Session, time: datetime, delta: Dict[ActivityKey, int]
+) -> None:
+    """
+    将消息数量累加到 time 所在小时的汇总中
+    """
+    _add_counts(session, ActivityHourly, "bucket_hour", hour_bucket(time), delta)
+
+
+def compact_hourly(session: Session, before: datetime) -> int:
+    """
+    将 before 所在日期之前的每小时汇总合并为每天的汇总，并删除这些每小时汇总
+    :return: 合并的每小时汇总行数
+    """
+    before = day_bucket(before)
+    days: Dict[datetime, Dict[ActivityKey, int]] = {}
+    rows = session.execute(
+        select(
+            ActivityHourly.bucket_hour,
+            ActivityHourly.group_id,
+            ActivityHourly.person_id,
+            ActivityHourly.command,
+            ActivityHourly.message_count,
+        ).where(ActivityHourly.bucket_hour < before)
+    ).all()
+    for bucket_hour, group_id, person_id, command, count in rows:
+        day = days.setdefault(day_bucket(bucket_hour), {})
+        key = (group_id, person_id, command)
+        day[key] = day.get(key, 0) + count
+    for day, delta in days.items():
+        _add_counts(session, ActivityDaily, "bucket_day", day, delta)
+    session.execute(delete(ActivityHourly).where(ActivityHourly.bucket_hour < before))
+    return len(rows)
+
+
+def _activity(since: datetime, group_id: Optional[str], person_id: Optional[str]):
+    """
+    since 之后的汇总：保留期内的部分按小时统计，更早的部分按天统计（since 按天对齐）
+    """
+    selects = []
+    for table, bucket, start in (
+        (ActivityHourly, ActivityHourly.bucket_hour, since),
+        (ActivityDaily, ActivityDaily.bucket_day, day_bucket(since)),
+    ):
+        stmt = select(
+            table.group_id, table.person_id, table.command, table.message_count
+        ).where(bucket >= start)
+        if group_id is not None:
+            stmt = stmt.where(table.group_id == group_id)
+        if person_id is not None:
+            stmt = stmt.where(table.person_id == person_id)
+        selects.append(stmt)
+    return union_all(*selects).subquery()
+
+
+def count_activity(
+    session: Session,
+    since: datetime,
+    group_id: Optional[str] = None,
+    person_id: Optional[str] = None,
+) -> Tuple[int, int]:
+    """
+    统计 since 之后的消息数量
+    :param group_id: 只统计该群的消息，私聊为空字符串
+    :param person_id: 只统计该用户的消息
+    :return: 消息数量，命令消息数量
+    """
+    activity = _activity(since, group_id, person_id)
+    total, commands = session.execute(
+        select(
+            func.sum(activity.c.message_count),
+            func.sum(
+                case((activity.c.command != "", activity.c.message_count), else_=0)
+            ),
+        )
+    ).one()
+    return total or 0, commands or 0
+
+
+def top_activity(
+    session: Session,
+    by: str,
+    since: datetime,
+    group_id: Optional[str] = None,
+    person_id: Optional[str] = None,
+    limit: int = 5,
+) -> List[Tuple[str, int]]:
+    """
+    按消息数量排序 since 之后最活跃的命令、用户或群
+    :param by: 排序的对象，command、person_id 或 group_id
+    :param group_id: 只统计该群的消息，私聊为空字符串
+    :param person_id: 只统计该用户的消息
+    :return: [(命令名/用户 id/群 id, 消息数量)]
+    """
+    if by not in _UNIQUE_COLUMNS:
+        raise ValueError(f"不支持的统计对象：{by}")
+    activity = _activity(since, group_id, person_id)
+    column = activity.c[by]
+    total = func.sum(activity.c.message_count).label("total")
+    rows = session.execute(
+        select(column, total)
+        .where(column != "")
+        .group_by(column)
+        .order_by(desc(total), column)
+        .limit(limit)
+    ).all()
+    return [(key, count) for key, count in rows]
@@ -0,0 +1,156 @@
+import string
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# trigram 分词的索引单位，更短的关键词无法使用全文索引
+MIN_INDEXED_LENGTH = 3
+# 摘要中高亮关键词的标记
+HIGHLIGHT_START = "【"
+HIGHLIGHT_END = "】"
+# 摘要的最大长度（trigram 分词下约等于字数）
+SNIPPET_LENGTH = 24
+# 只在最近的这么多条匹配的消息中按相关度排序。常见词可能匹配几十万条消息，
+# 全部计算相关度需要数百毫秒，按 id 倒序读取时找到足够的消息即可停止
+RANK_WINDOW = 200
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class SearchHit(NamedTuple):
+    message_id: int
+    person_id: str
+    group_id: Optional[str]
+    # 数据库中保存的 UTC 时间字符串
+    created_time: str
+    snippet: str
+
+
+class SearchPage(NamedTuple):
+    hits: List[SearchHit]
+    page: int
+    has_more: bool
+
+
+def _escape_like(keyword: str) -> str:
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_query(keywords: List[str]) -> str:
+    # 每个关键词作为一个短语，避免关键词中的 FTS5 语法字符（如 - * "）被解析
+    return " ".join('"' + keyword.replace('"', '""') + '"' for keyword in keywords)
+
+
+def _highlight(content: str, keyword: str) -> str:
+    """
+    没有使用全文索引时，在 Python 中截取关键词附近的内容作为摘要
+    """
+    # 与 LIKE 一样只忽略 ASCII 字母的大小写（长度不变），高亮消息中的原文
+    index = content.translate(_ASCII_LOWER).find(keyword.translate(_ASCII_LOWER))
+    if index < 0:
+        return content[:SNIPPET_LENGTH] + ("…" if len(content) > SNIPPET_LENGTH else "")
+    start = max(0, index - (SNIPPET_LENGTH - len(keyword)) // 2)
+    end = min(len(content), start + SNIPPET_LENGTH)
+    snippet = (
+        content[start:index]
+        + HIGHLIGHT_START
+        + content[index : index + len(keyword)]
+        + HIGHLIGHT_END
+        + content[index + len(keyword) : end]
+    )
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(content) else "")
+
+
+def fts_available(session: Session) -> bool:
+    """
+    是否已建立消息全文索引，SQLite 不支持 trigram 分词时全文索引的迁移会被跳过
+    """
+    return (
+        session.execute(
+            text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_fts'"
+            )
+        ).first()
+        is not None
+    )
+
+
+def search_messages(
+    session: Session,
+    keywords: str,
+    group_id: Optional[str] = None,
+    person_id: Optional[str] = None,
+    exclude_prefix: Optional[str] = None,
+    exclude_person_id: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 10,
+) -> SearchPage:
+    """
+    在消息记录中搜索同时包含所有关键词的消息。
+    有 3 个字及以上的关键词时使用全文索引，在最近 RANK_WINDOW 条匹配的消息中按相关度排序；
+    否则（或 SQLite 不支持全文索引时）在范围内逐条匹配，按时间倒序排列
+    :param keywords: 空格分隔的关键词
+    :param group_id: 只搜索该群的消息
+    :param person_id: 只搜索该用户发送的消息
+    :param exclude_prefix: 不搜索以此开头的消息（如命令）
+    :param exclude_person_id: 不搜索该用户发送的消息（如机器人自己）
+    :param page: 页码，从 1 开始
+    :param page_size: 每页的数量
+    """
+    terms = keywords.split()
+    if not terms:
+        return SearchPage([], page, False)
+    if fts_available(session):
+        indexed = [term for term in terms if len(term) >= MIN_INDEXED_LENGTH]
+        unindexed = [term for term in terms if len(term) < MIN_INDEXED_LENGTH]
+    else:
+        indexed, unindexed = [], terms
+
+    conditions = []
+    params = {"limit": page_size + 1, "offset": (page - 1) * page_size}
+    if group_id is not None:
+        conditions.append("m.group_id = :group_id")
+        params["group_id"] = group_id
+    if person_id is not None:
+        conditions.append("m.person_id = :person_id")
+        params["person_id"] = person_id
+    if exclude_person_id is not None:
+        conditions.append("m.person_id != :exclude_person_id")
+        params["exclude_person_id"] = exclude_person_id
+    if exclude_prefix:
+        conditions.append("m.content NOT LIKE :exclude ESCAPE '\\'")
+        params["exclude"] = _escape_like(exclude_prefix) + "%"
+    for i, term in enumerate(unindexed):
+        conditions.append(f"m.content LIKE :term{i} ESCAPE '\\'")
+        params[f"term{i}"] = "%" + _escape_like(term) + "%"
+
+    if indexed:
+        conditions.insert(0, "message_fts MATCH :query")
+        params["query"] = _fts_query(indexed)
+        params["start"] = HIGHLIGHT_START
+        params["end"] = HIGHLIGHT_END
+        # 翻页超过窗口时扩大窗口
+        params["window"] = max(RANK_WINDOW, params["offset"] + params["limit"])
+        sql = (
+            "SELECT id, person_id, group_id, created_time, snippet FROM ("
+            "SELECT m.id, m.person_id, m.group_id, m.created_time, "
+            f"snippet(message_fts, 0, :start, :end, '…', {SNIPPET_LENGTH}) AS snippet, "
+            "bm25(message_fts) AS score "
+            "FROM message_fts JOIN message AS m ON m.id = message_fts.rowid "
+            f"WHERE {' AND '.join(conditions)} "
+            "ORDER BY message_fts.rowid DESC LIMIT :window"
+            ") ORDER BY score, id DESC LIMIT :limit OFFSET :offset"
+        )
+        rows = session.execute(text(sql), params).all()
+    else:
+        sql = (
+            "SELECT m.id, m.person_id, m.group_id, m.created_time, m.content "
+            f"FROM message AS m WHERE {' AND '.join(conditions)} "
+            "ORDER BY m.id DESC LIMIT :limit OFFSET :offset"
+        )
+        rows = [
+            (*row[:4], _highlight(row[4], unindexed[0]))
+            for row in session.execute(text(sql), params).all()
+        ]
+    hits = [SearchHit(*row) for row in rows[:page_size]]
+    return SearchPage(hits, page, len(rows) > page_size)
@@ -18,6 +18,6 @@ class CommandStats(Base):
     __tablename__ = 'command_stats'
 
     id = Column(Integer, primary_key=True)
-    command_name = Column(String(50))  # 命令名称
+    command_name = Column(String(50), index=True)  # 命令名称
     use_count = Column(Integer, default=0)  # 使用次数
     last_used = Column(DateTime)  # 最后使用时间
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from wechatter.database.tables import Base
+
+
+class ActivityHourly(Base):
+    """
+    每小时的消息活跃度汇总表：每个整点、群、用户、命令一行。
+    私聊消息的 group_id 和不是命令的消息的 command 为空字符串
+    """
+
+    __tablename__ = "activity_hourly"
+    __table_args__ = (
+        UniqueConstraint("bucket_hour", "group_id", "person_id", "command"),
+        Index("ix_activity_hourly_group_id_bucket_hour", "group_id", "bucket_hour"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket_hour: Mapped[datetime] = mapped_column(DateTime)
+    group_id: Mapped[str] = mapped_column(String, default="")
+    person_id: Mapped[str] = mapped_column(String)
+    command: Mapped[str] = mapped_column(String, default="")
+    message_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ActivityDaily(Base):
+    """
+    每天的消息活跃度汇总表，由超过保留期的每小时汇总合并而来
+    """
+
+    __tablename__ = "activity_daily"
+    __table_args__ = (
+        UniqueConstraint("bucket_day", "group_id", "person_id", "command"),
+        Index("ix_activity_daily_group_id_bucket_day", "group_id", "bucket_day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket_day: Mapped[datetime] = mapped_column(DateTime)
+    group_id: Mapped[str] = mapped_column(String, default="")
+    person_id: Mapped[str] = mapped_column(String)
+    command: Mapped[str] = mapped_column(String, default="")
+    message_count: Mapped[int] = mapped_column(Integer, default=0)
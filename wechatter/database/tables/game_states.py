@@ -2,7 +2,7 @@ import json
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from wechatter.database.tables import Base
@@ -20,6 +20,10 @@ class GameStates(Base):
     """
 
     __tablename__ = "game_states"
+    __table_args__ = (
+        Index("ix_game_states_host_group_id_is_over", "host_group_id", "is_over"),
+        Index("ix_game_states_host_person_id_is_over", "host_person_id", "is_over"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     host_person_id: Mapped[str] = mapped_column(String, ForeignKey("person.id"))
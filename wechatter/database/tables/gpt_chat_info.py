@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from wechatter.database.tables import Base
@@ -21,6 +21,14 @@ class GptChatInfo(Base):
     """
 
     __tablename__ = "gpt_chat_info"
+    __table_args__ = (
+        Index(
+            "ix_gpt_chat_info_person_id_model_is_chatting",
+            "person_id",
+            "model",
+            "is_chatting",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     person_id: Mapped[str] = mapped_column(String, ForeignKey("person.id"))
@@ -42,6 +42,17 @@ class Group(Base):
             is_gaming=group_model.is_gaming,
         )
 
+    @staticmethod
+    def row_from_model(group_model: GroupModel) -> dict:
+        """
+        转换为批量写入使用的字典
+        """
+        return {
+            "id": group_model.id,
+            "name": group_model.name,
+            "is_gaming": group_model.is_gaming,
+        }
+
     def to_model(self) -> GroupModel:
         member_list = []
         for member in self.members:
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from wechatter.database.tables import Base
+
+
+class InboundEvent(Base):
+    """
+    已处理的收到消息事件表，用于重启后恢复消息去重缓存
+    """
+
+    __tablename__ = "inbound_event"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    expire_time: Mapped[datetime] = mapped_column(DateTime, index=True)
@@ -40,7 +40,7 @@ class Message(Base):
     gpt_chat_message: Mapped[Union["GptChatMessage", None]] = relationship(
         "GptChatMessage", back_populates="message", uselist=False
     )
-    msg_id: Mapped[Union[str, None]] = mapped_column(String, nullable=True)
+    msg_id: Mapped[Union[str, None]] = mapped_column(String, nullable=True, index=True)
 
     @classmethod
     def from_model(cls, message_model: MessageModel):
@@ -59,6 +59,21 @@ class Message(Base):
             msg_id=message_model.msg_id,
         )
 
+    @staticmethod
+    def row_from_model(message_model: MessageModel) -> dict:
+        """
+        转换为批量写入使用的字典，消息 id 由数据库分配
+        """
+        return {
+            "person_id": message_model.person.id,
+            "group_id": message_model.group.id if message_model.is_group else None,
+            "type": message_model.type.value,
+            "content": message_model.content,
+            "is_mentioned": message_model.is_mentioned,
+            "is_quoted": message_model.is_quoted,
+            "msg_id": message_model.msg_id,
+        }
+
     def to_model(self) -> MessageModel:
         return MessageModel(
             id=self.id,
@@ -21,7 +21,7 @@ class Person(Base):
     __tablename__ = "person"
 
     id: Mapped[str] = mapped_column(String(100), primary_key=True)
-    name: Mapped[str]
+    name: Mapped[str] = mapped_column(index=True)
     alias: Mapped[Union[str, None]] = mapped_column(String, nullable=True)
     gender: Mapped[Union[Gender, None]] = mapped_column(String, nullable=True)
     province: Mapped[Union[str, None]] = mapped_column(String, nullable=True)
@@ -68,6 +68,35 @@ class Person(Base):
             alias=member_model.alias,
         )
 
+    @staticmethod
+    def row_from_model(person_model: PersonModel) -> dict:
+        """
+        转换为批量写入使用的字典
+        """
+        return {
+            "id": person_model.id,
+            "name": person_model.name,
+            "alias": person_model.alias,
+            "gender": person_model.gender.value,
+            "province": person_model.province,
+            "city": person_model.city,
+            "is_star": person_model.is_star,
+            "is_friend": person_model.is_friend,
+            "is_official_account": person_model.is_official_account,
+            "is_gaming": person_model.is_gaming,
+        }
+
+    @staticmethod
+    def row_from_member_model(member_model: "GroupMember") -> dict:
+        """
+        群成员转换为批量写入使用的字典
+        """
+        return {
+            "id": member_model.id,
+            "name": member_model.name,
+            "alias": member_model.alias,
+        }
+
     def to_model(self) -> PersonModel:
         return PersonModel(
             id=self.id,
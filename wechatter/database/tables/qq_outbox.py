@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Union
+
+from sqlalchemy import Boolean, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from wechatter.database.tables import Base
+from wechatter.models.qq import OutboundMessage, OutboxState, QQChannel, SendPriority
+from wechatter.models.wechat import Group as GroupModel
+
+
+class QQOutbox(Base):
+    """
+    QQ 发件箱表，持久化待发送和被阻塞的消息，重启后可以恢复
+    """
+
+    __tablename__ = "qq_outbox"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    channel: Mapped[QQChannel]
+    target: Mapped[str]
+    content: Mapped[str]
+    msg_id: Mapped[Union[str, None]] = mapped_column(String, nullable=True)
+    is_image: Mapped[bool] = mapped_column(Boolean, default=False)
+    # 群聊消息附带的群信息（JSON）
+    group: Mapped[Union[str, None]] = mapped_column(String, nullable=True)
+    retry_count: Mapped[int] = mapped_column(Integer, default=0)
+    # 恢复后按原来的优先级发送，不会排在正在回复的消息前面
+    priority: Mapped[SendPriority] = mapped_column(
+        default=SendPriority.interactive, server_default=SendPriority.interactive.name
+    )
+    state: Mapped[OutboxState] = mapped_column(index=True)
+    last_error: Mapped[Union[str, None]] = mapped_column(String, nullable=True)
+    created_time: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_time: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    @staticmethod
+    def row_from_model(
+        model: OutboundMessage, state: OutboxState, last_error: str = None
+    ) -> dict:
+        """
+        转换为批量写入使用的字典
+        """
+        return {
+            "id": model.outbox_id,
+            "channel": model.channel,
+            "target": model.target,
+            "content": model.content,
+            "msg_id": model.msg_id,
+            "is_image": model.is_image,
+            "group": model.group.model_dump_json() if model.group else None,
+            "retry_count": model.retry_count,
+            "priority": model.priority,
+            "state": state,
+            "last_error": last_error,
+        }
+
+    def to_model(self) -> OutboundMessage:
+        return OutboundMessage(
+            channel=self.channel,
+            target=self.target,
+            content=self.content,
+            msg_id=self.msg_id,
+            is_image=self.is_image,
+            group=GroupModel.model_validate_json(self.group) if self.group else None,
+            retry_count=self.retry_count,
+            priority=self.priority,
+            outbox_id=self.id,
+        )
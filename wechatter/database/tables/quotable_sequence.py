@@ -0,0 +1,16 @@
+from sqlalchemy import Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from wechatter.database.tables import Base
+
+
+class QuotableSequence(Base):
+    """
+    可引用消息 id 的分配进度表，只有一行，保存已预留的 id 的最高序号
+    """
+
+    __tablename__ = "quotable_sequence"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 下一个未被预留的序号，可引用消息 id 为该序号对 62^3 取余后的 62 进制表示
+    next_value: Mapped[int] = mapped_column(Integer)
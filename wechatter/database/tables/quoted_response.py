@@ -13,7 +13,7 @@ class QuotedResponse(Base):
     __tablename__ = "quoted_response"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    quotable_id: Mapped[str] = mapped_column(String(10))
+    quotable_id: Mapped[str] = mapped_column(String(10), index=True)
     command: Mapped[str]
     response: Mapped[str]
 
@@ -0,0 +1,19 @@
+from .blocking_queue import BlockingQueues
+from .coalescer import Coalescer
+from .dispatcher import QQDispatcher
+from .outbox import Outbox
+from .rate_limiter import RateLimiter, is_rate_limit_error
+from .reply_window import ReplyWindowIndex
+from .retry import RetryPolicy, is_retryable_error
+
+__all__ = [
+    "BlockingQueues",
+    "Coalescer",
+    "QQDispatcher",
+    "Outbox",
+    "RateLimiter",
+    "ReplyWindowIndex",
+    "RetryPolicy",
+    "is_rate_limit_error",
+    "is_retryable_error",
+]
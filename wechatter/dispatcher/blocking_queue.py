@@ -0,0 +1,68 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+
+class BlockingQueues:
+    """
+    QQ 阻塞消息队列
+
+    没有可用被动回复窗口的消息按 (发送渠道, 发送目标) 分别保存在双端队列中，
+    收到某个目标的新消息时只释放该目标的积压消息。只能在事件循环线程中使用。
+    """
+
+    def __init__(self):
+        # 每条消息与其被阻塞的时间
+        self._queues: Dict[
+            Tuple[QQChannel, str], Deque[Tuple[OutboundMessage, float]]
+        ] = {}
+
+    def push(self, message: OutboundMessage) -> None:
+        """
+        加入一条被阻塞的消息
+        """
+        key = (message.channel, message.target)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append((message, time.time()))
+
+    def pop(self, channel: QQChannel, target: str, limit: int) -> List[OutboundMessage]:
+        """
+        按阻塞顺序取出目标最多 limit 条消息
+        """
+        queue = self._queues.get((channel, target))
+        if not queue:
+            return []
+        messages = [queue.popleft()[0] for _ in range(min(limit, len(queue)))]
+        if not queue:
+            del self._queues[(channel, target)]
+        return messages
+
+    def count(self, channel: QQChannel = None) -> int:
+        """
+        获取阻塞消息数量
+        :param channel: 发送渠道，为 None 时统计全部
+        """
+        return sum(
+            len(queue)
+            for (_channel, _), queue in self._queues.items()
+            if channel is None or _channel == channel
+        )
+
+    def backlog(self, now: float = None) -> List[Tuple[QQChannel, str, int, float]]:
+        """
+        获取各目标的积压情况
+        :return: (发送渠道, 发送目标, 消息数量, 最早一条消息已阻塞的秒数) 列表，按阻塞时间降序
+        """
+        now = time.time() if now is None else now
+        result = [
+            (channel, target, len(queue), now - queue[0][1])
+            for (channel, target), queue in self._queues.items()
+        ]
+        return sorted(result, key=lambda item: item[3], reverse=True)
+
+    def __len__(self) -> int:
+        return self.count()
@@ -0,0 +1,148 @@
+import asyncio
+from typing import Callable, Dict, List, Tuple
+
+from wechatter.models.qq import OutboundMessage, QQChannel
+
+# 合并后的消息和被并入的消息
+EmitCallback = Callable[[OutboundMessage, List[OutboundMessage]], None]
+
+
+class _Window:
+    """
+    目标的合并窗口：发出消息后 window 秒内到达的文本消息被缓冲，窗口结束时合并发出
+    """
+
+    def __init__(self, timer: asyncio.TimerHandle):
+        self.timer = timer
+        self.messages: List[OutboundMessage] = []
+        self.length = 0
+        self.msg_id = None
+
+    def append(self, message: OutboundMessage, separator: str) -> None:
+        if self.messages:
+            self.length += len(separator)
+        self.messages.append(message)
+        self.length += len(message.content)
+        if self.msg_id is None:
+            self.msg_id = message.msg_id
+
+
+class Coalescer:
+    """
+    QQ 消息合并器
+
+    QQ 被动回复每个 msg_id 只能使用约 5 个 msg_seq，一条命令往往会先后发送
+    “正在调用...”、结果等多条消息。目标最近没有发出消息时，新消息立即发出，不增加延迟；
+    发出后 window 秒内该目标到达的文本消息被缓冲，窗口结束时合并为一条发出，
+    合并后的长度不超过 max_length。图片消息和重试消息不参与合并，
+    它们到达时会先把该目标已缓冲的消息发出，以保证发送顺序。
+    所有方法都只能在事件循环线程中调用。
+    """
+
+    def __init__(
+        self, window: float = 0.3, max_length: int = 2000, separator: str = "\n"
+    ):
+        """
+        :param window: 合并窗口（秒），从该目标发出消息时开始计时
+        :param max_length: 合并后消息的最大长度
+        :param separator: 合并时消息之间的分隔符
+        """
+        self.window = window
+        self.max_length = max_length
+        self.separator = separator
+        self.merged_count = 0
+        self._emit: EmitCallback = None
+        self._windows: Dict[Tuple[QQChannel, str], _Window] = {}
+
+    def bind(self, emit: EmitCallback) -> None:
+        """
+        :param emit: 消息可以发送时的回调
+        """
+        self._emit = emit
+
+    def add(self, message: OutboundMessage) -> None:
+        """
+        添加一条待发送消息
+        """
+        key = (message.channel, message.target)
+        if not self._can_coalesce(message):
+            self.flush(key)
+            self._emit(message, [])
+            return
+
+        window = self._windows.get(key)
+        if window is None:
+            # 不在合并窗口内，立即发出并开始计时
+            self._emit(message, [])
+            self._open(key)
+            return
+        if window.messages and not self._fits(window, message):
+            self._emit_buffered(window)
+        window.append(message, self.separator)
+
+    def flush(self, key: Tuple[QQChannel, str] = None) -> None:
+        """
+        立即发出缓冲的消息并结束合并窗口
+        :param key: (发送渠道, 发送目标)，为 None 时发出全部
+        """
+        keys = list(self._windows) if key is None else [key]
+        for k in keys:
+            window = self._windows.pop(k, None)
+            if window is None:
+                continue
+            window.timer.cancel()
+            self._emit_buffered(window)
+
+    def buffered_count(self) -> int:
+        """
+        获取缓冲中的消息数量
+        """
+        return sum(len(window.messages) for window in self._windows.values())
+
+    def _open(self, key: Tuple[QQChannel, str]) -> None:
+        timer = asyncio.get_running_loop().call_later(self.window, self._close, key)
+        self._windows[key] = _Window(timer)
+
+    def _close(self, key: Tuple[QQChannel, str]) -> None:
+        """
+        合并窗口结束，发出缓冲的消息；发出了消息时开始新的窗口，继续合并之后到达的消息
+        """
+        window = self._windows.pop(key, None)
+        if window is None or not window.messages:
+            return
+        self._emit_buffered(window)
+        self._open(key)
+
+    def _emit_buffered(self, window: _Window) -> None:
+        if not window.messages:
+            return
+        first, *rest = window.messages
+        if rest:
+            first = first.model_copy(
+                update={
+                    "content": self.separator.join(m.content for m in window.messages),
+                    "msg_id": window.msg_id,
+                }
+            )
+            self.merged_count += len(rest)
+        window.messages = []
+        window.length = 0
+        window.msg_id = None
+        self._emit(first, rest)
+
+    def _can_coalesce(self, message: OutboundMessage) -> bool:
+        return not message.is_image and message.retry_count == 0
+
+    def _fits(self, window: _Window, message: OutboundMessage) -> bool:
+        # 合并后使用第一条消息的优先级，不同优先级的消息不能合并
+        if message.priority != window.messages[0].priority:
+            return False
+        # 被动回复不同的消息时不能合并
+        if (
+            message.msg_id is not None
+            and window.msg_id is not None
+            and message.msg_id != window.msg_id
+        ):
+            return False
+        length = window.length + len(self.separator) + len(message.content)
+        return length <= self.max_length
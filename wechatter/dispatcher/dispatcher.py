@@ -0,0 +1,307 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+
+from loguru import logger
+
+from wechatter.dispatcher.coalescer import Coalescer
+from wechatter.dispatcher.outbox import Outbox
+from wechatter.dispatcher.priority import PriorityLanes
+from wechatter.dispatcher.rate_limiter import RateLimiter
+from wechatter.dispatcher.retry import RetryPolicy
+from wechatter.models.qq import OutboundMessage, OutboxState, QQChannel, SendPriority
+
+SendHandler = Callable[[OutboundMessage], Awaitable]
+
+
+class QQDispatcher:
+    """
+    QQ 消息发送调度器
+
+    按发送目标（group_openid / user_openid / guild_id）将消息分片到固定数量的工作协程，
+    每个分片对应一个按优先级分道的队列。同一目标、同一优先级的消息总是进入同一分片的同一通道，
+    保证按入队顺序发送；不同目标的消息可以在不同分片中并行发送，一个群的慢上传不会阻塞其他群。
+    分片内按优先级加权轮询，命令回复优先于定时任务和转发消息。
+    发送前会向限流器申请令牌，避免触发 QQ OpenAPI 的频率限制。
+    配置了合并器时，发往同一目标的连续文本消息会先合并再进入分片，节省 msg_seq。
+    发送失败的消息按重试策略延迟后重新入队，无法重试的消息进入死信状态。
+    配置了发件箱时，消息的每次状态变更都会被持久化，重启后可以恢复。
+    enqueue 是线程安全的，可以在 APScheduler 线程或 run_in_thread 线程中调用。
+    """
+
+    def __init__(
+        self,
+        worker_count: int = 4,
+        rate_limiter: RateLimiter = None,
+        outbox: Outbox = None,
+        coalescer: Coalescer = None,
+        retry_policy: RetryPolicy = None,
+        lane_weights: Dict[SendPriority, int] = None,
+        max_lane_wait: float = 30.0,
+    ):
+        """
+        :param worker_count: 工作协程（分片）数量
+        :param rate_limiter: 限流器，为 None 时不限流
+        :param outbox: 发件箱，为 None 时不持久化
+        :param coalescer: 消息合并器，为 None 时不合并
+        :param retry_policy: 重试策略，为 None 时使用默认策略
+        :param lane_weights: 各优先级的权重
+        :param max_lane_wait: 低优先级消息的最长等待时间（秒），超过后优先发送
+        """
+        if worker_count < 1:
+            raise ValueError(f"QQ消息发送工作协程数量必须大于0：{worker_count}")
+        self.worker_count = worker_count
+        self.rate_limiter = rate_limiter
+        self.outbox = outbox
+        self.coalescer = coalescer
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.lane_weights = lane_weights
+        self.max_lane_wait = max_lane_wait
+        self.dead_count = 0
+        # 等待重试的定时器
+        self._retry_timers: Set[asyncio.TimerHandle] = set()
+        self.handlers: Dict[QQChannel, SendHandler] = {}
+        self._loop: asyncio.AbstractEventLoop = None
+        self._loop_thread_id: int = None
+        self._shards: List[PriorityLanes] = []
+        # 各目标已进入合并器或分片、尚未开始发送的消息数量，只在事件循环线程中访问
+        self._queued: Dict[Tuple[QQChannel, str], int] = {}
+        self._tasks: List[asyncio.Task] = []
+        # 调度器启动前入队的消息
+        self._pending: List[OutboundMessage] = []
+        self._pending_lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop is not None
+
+    def start(self, handlers: Dict[QQChannel, SendHandler]) -> None:
+        """
+        启动调度器，必须在机器人的事件循环中调用，已启动时不做任何操作
+        :param handlers: 各发送渠道对应的发送函数
+        """
+        if self.is_running:
+            return
+        self.handlers = handlers
+        self._shards = [
+            PriorityLanes(self.lane_weights, self.max_lane_wait)
+            for _ in range(self.worker_count)
+        ]
+        if self.coalescer is not None:
+            self.coalescer.bind(self._emit)
+        for index in range(self.worker_count):
+            self._tasks.append(asyncio.create_task(self._work(index)))
+        if self.outbox is not None:
+            self._tasks.append(asyncio.create_task(self._purge_outbox()))
+
+        with self._pending_lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            pending, self._pending = self._pending, []
+        for message in pending:
+            self._put(message)
+        logger.info(f"QQ消息发送调度器已启动，工作协程数量：{self.worker_count}")
+
+    async def stop(self) -> None:
+        """
+        停止调度器
+        """
+        if self.coalescer is not None:
+            self.coalescer.flush()
+        # 未到时间的重试仍在发件箱中，重启后恢复
+        for timer in self._retry_timers:
+            timer.cancel()
+        self._retry_timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def enqueue(self, message: OutboundMessage) -> None:
+        """
+        将消息加入发送队列（线程安全）
+        :param message: 待发送消息
+        """
+        message.enqueued_at = time.perf_counter()
+        self._save(message, OutboxState.pending)
+        if self._loop is None:
+            with self._pending_lock:
+                # 双重检查，避免与 start 竞争
+                if self._loop is None:
+                    self._pending.append(message)
+                    return
+        if threading.get_ident() == self._loop_thread_id:
+            self._put(message)
+        else:
+            self._loop.call_soon_threadsafe(self._put, message)
+
+    def shard_of(self, channel: QQChannel, target: str) -> int:
+        """
+        获取发送目标所在的分片
+        """
+        return hash((channel, target)) % self.worker_count
+
+    def _put(self, message: OutboundMessage) -> None:
+        if message.channel not in self.handlers:
+            logger.error(f"未知的QQ消息发送渠道：{message.channel}")
+            return
+        self._count_queued(message, 1)
+        if self.coalescer is not None:
+            self.coalescer.add(message)
+        else:
+            self._emit(message, [])
+
+    def _emit(self, message: OutboundMessage, absorbed: List[OutboundMessage]) -> None:
+        """
+        将消息放入对应分片
+        :param absorbed: 被合并进 message 的其他消息，它们不再单独发送
+        """
+        if absorbed:
+            self._save(message, OutboxState.pending)
+            for part in absorbed:
+                self._save(part, OutboxState.sent)
+            # 合并后只占用一次发送
+            self._count_queued(message, -len(absorbed))
+        self._shards[self.shard_of(message.channel, message.target)].put_nowait(message)
+
+    def _count_queued(self, message: OutboundMessage, delta: int) -> None:
+        key = (message.channel, message.target)
+        count = self._queued.get(key, 0) + delta
+        if count > 0:
+            self._queued[key] = count
+        else:
+            self._queued.pop(key, None)
+
+    def queued_count(self, channel: QQChannel, target: str) -> int:
+        """
+        获取目标已入队、尚未开始发送的消息数量（不含等待重试的消息），只能在事件循环线程中调用。
+        这些消息发送时才会占用被动回复的 msg_seq
+        """
+        return self._queued.get((channel, target), 0)
+
+    def _save(
+        self, message: OutboundMessage, state: OutboxState, error: str = None
+    ) -> None:
+        if self.outbox is not None:
+            self.outbox.save(message, state, error)
+
+    def report_success(self, message: OutboundMessage) -> None:
+        """
+        发送函数在接口调用成功后调用
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_success(message.channel, message.target)
+        self._save(message, OutboxState.sent)
+
+    def report_blocked(self, message: OutboundMessage) -> None:
+        """
+        发送函数在消息因没有可用 msg_id 被放入阻塞队列后调用
+        """
+        self._save(message, OutboxState.blocked)
+
+    def report_dead(self, message: OutboundMessage, error: str) -> None:
+        """
+        发送函数在放弃发送某条消息后调用
+        """
+        self.dead_count += 1
+        self._save(message, OutboxState.dead, error)
+
+    def report_error(self, message: OutboundMessage, e: Exception) -> bool:
+        """
+        发送函数在接口调用失败后调用，按重试策略安排重试，否则放弃发送
+        必须在事件循环线程中调用
+        :return: 是否会重试
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.on_error(message.channel, message.target, e)
+        if not self.retry_policy.should_retry(message, e):
+            logger.error(
+                f"QQ消息发送失败，不再重试（{message.channel.value}，{message.target}，"
+                f"已重试{message.retry_count}次）：{str(e)}"
+            )
+            self.report_dead(message, str(e))
+            return False
+
+        retry_count = message.retry_count + 1
+        delay = self.retry_policy.delay(retry_count)
+        # 重试原始消息，而不是错误信息
+        retry_message = message.model_copy(update={"retry_count": retry_count})
+        timer = None
+
+        def retry():
+            self._retry_timers.discard(timer)
+            self.enqueue(retry_message)
+
+        timer = asyncio.get_running_loop().call_later(delay, retry)
+        self._retry_timers.add(timer)
+        logger.warning(
+            f"QQ消息发送失败，{delay:.1f} 秒后进行第{retry_count}次重试"
+            f"（{message.channel.value}，{message.target}）：{str(e)}"
+        )
+        return True
+
+    @property
+    def retry_pending_count(self) -> int:
+        """
+        等待重试的消息数量
+        """
+        return len(self._retry_timers)
+
+    def shard_depths(self) -> List[int]:
+        """
+        获取每个分片的队列长度
+        """
+        return [shard.qsize() for shard in self._shards]
+
+    def lane_depths(self) -> Dict[SendPriority, int]:
+        """
+        获取所有分片中各优先级的消息数量
+        """
+        depths = {priority: 0 for priority in SendPriority}
+        for shard in self._shards:
+            for priority, depth in shard.lane_depths().items():
+                depths[priority] += depth
+        return depths
+
+    async def join(self) -> None:
+        """
+        等待所有队列中的消息发送完成
+        """
+        if self.coalescer is not None:
+            self.coalescer.flush()
+        await asyncio.gather(*(shard.join() for shard in self._shards))
+
+    async def _purge_outbox(self) -> None:
+        """
+        定期清理发件箱中过期的已发送记录，在线程池中执行，不阻塞事件循环
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.outbox.purge_interval)
+            try:
+                await loop.run_in_executor(None, self.outbox.purge_sent)
+            except Exception as e:
+                logger.error(f"清理QQ发件箱失败：{str(e)}")
+
+    async def _work(self, index: int) -> None:
+        """
+        工作协程，按顺序发送某个分片中的消息
+        """
+        shard = self._shards[index]
+        while True:
+            message = await shard.get()
+            self._count_queued(message, -1)
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire(message.channel, message.target)
+                self._save(message, OutboxState.in_flight)
+                await self.handlers[message.channel](message)
+            except Exception as e:
+                logger.error(
+                    f"处理QQ消息发送任务失败（{message.channel.value}，分片{index}）：{str(e)}"
+                )
+                self.report_dead(message, str(e))
+            finally:
+                shard.task_done()
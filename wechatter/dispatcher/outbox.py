@@ -0,0 +1,151 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from wechatter.database import BatchWriter, QQOutbox as DbQQOutbox, make_db_session
+from wechatter.models.qq import OutboundMessage, OutboxState
+
+# 重启后需要恢复的状态，in_flight 表示发送途中进程退出，按至少一次语义重新发送
+RECOVERABLE_STATES = (OutboxState.pending, OutboxState.in_flight, OutboxState.blocked)
+
+# 状态变更时需要更新的列
+_UPDATE_COLUMNS = ("content", "msg_id", "retry_count", "state", "last_error")
+
+
+class Outbox:
+    """
+    QQ 发件箱
+
+    每次状态变更都以整条消息快照的形式提交给 BatchWriter，由后台线程批量 upsert 并组提交，
+    发送热路径上不会同步提交数据库。同一批中同一条消息的多次变更只写入最后一次。
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = make_db_session,
+        flush_interval: float = 0.05,
+        max_batch: int = 500,
+        retention_days: float = 3,
+        purge_interval: float = 3600,
+    ):
+        """
+        :param session_factory: 数据库会话工厂
+        :param flush_interval: 组提交的最长等待时间（秒）
+        :param max_batch: 每批最多写入的记录数
+        :param retention_days: 已发送记录的保留天数
+        :param purge_interval: 运行期间清理过期的已发送记录的间隔（秒），由调度器定期调用 purge_sent
+        """
+        self.session_factory = session_factory
+        self.retention_days = retention_days
+        self.purge_interval = purge_interval
+        self.writer = BatchWriter(
+            "qq_outbox",
+            self._write_rows,
+            session_factory=session_factory,
+            flush_interval=flush_interval,
+            max_batch=max_batch,
+        )
+        # 恢复前本进程写入的记录 id，恢复时跳过，避免重复入队
+        self._fresh_ids: Set[str] = set()
+        self._fresh_lock = threading.Lock()
+        self._recovered = False
+
+    def save(
+        self, message: OutboundMessage, state: OutboxState, error: str = None
+    ) -> None:
+        """
+        记录消息的最新状态，首次保存时为消息分配 outbox_id
+        """
+        if message.outbox_id is None:
+            message.outbox_id = uuid.uuid4().hex
+            if not self._recovered:
+                with self._fresh_lock:
+                    self._fresh_ids.add(message.outbox_id)
+        self.writer.submit(DbQQOutbox.row_from_model(message, state, error))
+
+    def recover(self) -> List[Tuple[OutboundMessage, OutboxState]]:
+        """
+        读取上次运行时未完成的消息，并清理过期的已发送记录。
+        只在启动时恢复一次，之后的未完成消息都已在本进程的队列中，再次调用时返回空列表
+        :return: 按创建时间排序的 (消息, 状态) 列表
+        """
+        self.writer.flush()
+        with self._fresh_lock:
+            if self._recovered:
+                logger.warning("QQ发件箱已恢复过，不再重复恢复")
+                return []
+            fresh_ids, self._fresh_ids = self._fresh_ids, set()
+            self._recovered = True
+
+        self.purge_sent()
+        with self.session_factory() as session:
+            rows = session.scalars(
+                select(DbQQOutbox)
+                .where(DbQQOutbox.state.in_(RECOVERABLE_STATES))
+                .order_by(DbQQOutbox.created_time)
+            ).all()
+            recovered = [
+                (row.to_model(), row.state) for row in rows if row.id not in fresh_ids
+            ]
+            session.commit()
+
+        if recovered:
+            logger.info(f"从QQ发件箱恢复了 {len(recovered)} 条未完成的消息")
+        return recovered
+
+    def purge_sent(self) -> int:
+        """
+        删除超过保留天数的已发送记录
+        :return: 删除的记录数
+        """
+        expire_time = datetime.utcnow() - timedelta(days=self.retention_days)
+        with self.session_factory() as session:
+            result = session.execute(
+                delete(DbQQOutbox).where(
+                    DbQQOutbox.state == OutboxState.sent,
+                    DbQQOutbox.updated_time < expire_time,
+                )
+            )
+            session.commit()
+        if result.rowcount:
+            logger.info(f"已清理QQ发件箱中 {result.rowcount} 条过期的已发送记录")
+        return result.rowcount
+
+    def dead_letters(
+        self, limit: int = 20, id_prefix: str = None
+    ) -> List[Tuple[OutboundMessage, str, datetime]]:
+        """
+        获取死信消息，最近放弃的在前
+        :param limit: 最多返回的条数
+        :param id_prefix: 只返回 id 以此开头的消息
+        :return: (消息, 失败原因, 放弃时间) 列表
+        """
+        self.writer.flush()
+        stmt = select(DbQQOutbox).where(DbQQOutbox.state == OutboxState.dead)
+        if id_prefix:
+            stmt = stmt.where(DbQQOutbox.id.startswith(id_prefix, autoescape=True))
+        stmt = stmt.order_by(DbQQOutbox.updated_time.desc()).limit(limit)
+        with self.session_factory() as session:
+            rows = session.scalars(stmt).all()
+            return [(row.to_model(), row.last_error, row.updated_time) for row in rows]
+
+    @staticmethod
+    def _write_rows(session: Session, rows: List[dict]) -> None:
+        latest = {}
+        for row in rows:
+            latest[row["id"]] = row
+        stmt = insert(DbQQOutbox)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DbQQOutbox.id],
+            set_={
+                **{column: stmt.excluded[column] for column in _UPDATE_COLUMNS},
+                "updated_time": func.now(),
+            },
+        )
+        session.execute(stmt, list(latest.values()))
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from wechatter.models.qq import OutboundMessage, SendPriority
+
+# 各优先级的默认权重，权重越大获得的发送机会越多
+DEFAULT_LANE_WEIGHTS = {
+    SendPriority.interactive: 8,
+    SendPriority.admin: 4,
+    SendPriority.scheduled: 2,
+    SendPriority.forwarding: 1,
+}
+
+
+class PriorityLanes(asyncio.Queue):
+    """
+    按优先级分道的 asyncio 队列
+
+    每个优先级一条先进先出的通道，取消息时在非空通道之间做平滑加权轮询，
+    高优先级通道获得更多的发送机会，但低优先级通道不会被完全阻塞。
+    若某条通道队首的消息已等待超过 max_wait 秒，则优先发送等待最久的消息（防饿死）。
+    """
+
+    def __init__(
+        self, weights: Optional[Dict[SendPriority, int]] = None, max_wait: float = 30.0
+    ):
+        """
+        :param weights: 各优先级的权重，缺省项使用 DEFAULT_LANE_WEIGHTS
+        :param max_wait: 消息最长等待时间（秒），超过后不再按权重排队
+        """
+        self.weights = {**DEFAULT_LANE_WEIGHTS, **(weights or {})}
+        self.max_wait = max_wait
+        super().__init__()
+
+    def _init(self, maxsize: int) -> None:
+        self._lanes: Dict[SendPriority, Deque[OutboundMessage]] = {
+            priority: deque() for priority in SendPriority
+        }
+        self._credits: Dict[SendPriority, int] = {
+            priority: 0 for priority in SendPriority
+        }
+
+    def qsize(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def empty(self) -> bool:
+        return not any(self._lanes.values())
+
+    def _put(self, message: OutboundMessage) -> None:
+        self._lanes[message.priority].append(message)
+
+    def _get(self) -> OutboundMessage:
+        return self._lanes[self._pick()].popleft()
+
+    def _pick(self) -> SendPriority:
+        active = []
+        for priority, lane in self._lanes.items():
+            if lane:
+                active.append(priority)
+            else:
+                self._credits[priority] = 0
+
+        now = time.perf_counter()
+        starving = [
+            priority
+            for priority in active
+            if now - self._lanes[priority][0].enqueued_at > self.max_wait
+        ]
+        if starving:
+            return min(
+                starving, key=lambda priority: self._lanes[priority][0].enqueued_at
+            )
+
+        # 平滑加权轮询
+        total = 0
+        for priority in active:
+            self._credits[priority] += self.weights[priority]
+            total += self.weights[priority]
+        chosen = max(active, key=lambda priority: self._credits[priority])
+        self._credits[chosen] -= total
+        return chosen
+
+    def lane_depths(self) -> Dict[SendPriority, int]:
+        """
+        获取各优先级通道的队列长度
+        """
+        return {priority: len(lane) for priority, lane in self._lanes.items()}
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from botpy.errors import SequenceNumberError
+from loguru import logger
+
+from wechatter.models.qq import QQChannel
+
+# QQ OpenAPI 中表示发送频率超限的错误码和关键词
+RATE_LIMIT_ERROR_CODES = ("22009", "20028", "304045")
+RATE_LIMIT_ERROR_KEYWORDS = ("超频", "频率", "limit exceed", "rate limit")
+
+# 默认限流配置：rate 为每秒补充的令牌数，burst 为桶容量
+DEFAULT_RATE_LIMIT_CONFIG = {
+    "global": {"rate": 20, "burst": 20},
+    "channel": {"rate": 10, "burst": 10},
+    "target": {"rate": 1, "burst": 5},
+}
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """
+    判断异常是否为 QQ OpenAPI 的频率限制错误
+    """
+    if isinstance(e, SequenceNumberError):
+        # botpy 将 HTTP 429 映射为 SequenceNumberError
+        return True
+    msg = str(e)
+    return any(code in msg for code in RATE_LIMIT_ERROR_CODES) or any(
+        keyword in msg.lower() for keyword in RATE_LIMIT_ERROR_KEYWORDS
+    )
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    scale 为自适应降速系数（0, 1]，实际补充速率为 rate * scale。
+    """
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.scale = 1.0
+        self.updated_at = now
+        # 被限流后的冷却截止时间，冷却期间不发放令牌
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        if now > self.updated_at:
+            self.tokens = min(
+                self.burst,
+                self.tokens + (now - self.updated_at) * self.rate * self.scale,
+            )
+            self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        获取一个令牌还需要等待的时间（秒），0 表示可以立即获取
+        """
+        self.refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / (self.rate * self.scale))
+        return wait
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    @property
+    def is_idle(self) -> bool:
+        return self.tokens >= self.burst and self.scale >= 1.0
+
+
+class RateLimiter:
+    """
+    QQ OpenAPI 分层令牌桶限流器
+
+    发送一条消息需要同时从全局、发送渠道、发送目标三层令牌桶中各取一个令牌。
+    当接口返回频率限制错误时，降低对应渠道和目标的发送速率（乘性减少），并让该目标冷却一段时间，
+    之后每次发送成功再逐步恢复（加性增加）。
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict] = None,
+        min_scale: float = 0.1,
+        cooldown: float = 5.0,
+        max_target_buckets: int = 10000,
+    ):
+        """
+        :param config: 限流配置，格式同 DEFAULT_RATE_LIMIT_CONFIG，缺省项使用默认值
+        :param min_scale: 自适应降速的最小系数
+        :param cooldown: 被限流后的冷却时间（秒）
+        :param max_target_buckets: 最多保留的发送目标令牌桶数量
+        """
+        self.config = {
+            level: {**default, **((config or {}).get(level) or {})}
+            for level, default in DEFAULT_RATE_LIMIT_CONFIG.items()
+        }
+        self.min_scale = min_scale
+        self.cooldown = cooldown
+        self.max_target_buckets = max_target_buckets
+        self.throttled_count = 0
+
+        now = time.monotonic()
+        self._global = self._new_bucket("global", now)
+        self._channels: Dict[QQChannel, TokenBucket] = {
+            channel: self._new_bucket("channel", now) for channel in QQChannel
+        }
+        # 按最近使用顺序排列，便于淘汰空闲的目标令牌桶
+        self._targets: "OrderedDict[Tuple[QQChannel, str], TokenBucket]" = OrderedDict()
+
+    def _new_bucket(self, level: str, now: float) -> TokenBucket:
+        return TokenBucket(self.config[level]["rate"], self.config[level]["burst"], now)
+
+    def _target_bucket(
+        self, channel: QQChannel, target: str, now: float
+    ) -> TokenBucket:
+        key = (channel, target)
+        bucket = self._targets.get(key)
+        if bucket is None:
+            bucket = self._new_bucket("target", now)
+            self._targets[key] = bucket
+            self._evict()
+        else:
+            self._targets.move_to_end(key)
+        return bucket
+
+    def _evict(self) -> None:
+        # 只淘汰最久未使用且已回满、未降速的令牌桶，淘汰后重建的效果与原桶相同
+        while len(self._targets) > self.max_target_buckets:
+            key, bucket = next(iter(self._targets.items()))
+            bucket.refill(time.monotonic())
+            if not bucket.is_idle:
+                break
+            del self._targets[key]
+
+    async def acquire(self, channel: QQChannel, target: str) -> float:
+        """
+        等待直到三层令牌桶都有令牌，并各消耗一个
+        :return: 总等待时间（秒）
+        """
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            buckets = (
+                self._global,
+                self._channels[channel],
+                self._target_bucket(channel, target, now),
+            )
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.consume()
+                return waited
+            waited += wait
+            await asyncio.sleep(wait)
+
+    def on_success(self, channel: QQChannel, target: str) -> None:
+        """
+        发送成功，逐步恢复被降低的发送速率
+        """
+        now = time.monotonic()
+        for bucket in (self._channels[channel], self._targets.get((channel, target))):
+            if bucket is not None and bucket.scale < 1.0:
+                bucket.refill(now)
+                bucket.scale = min(1.0, bucket.scale + 0.1)
+
+    def on_error(self, channel: QQChannel, target: str, e: Exception) -> bool:
+        """
+        发送失败，若为频率限制错误则降低对应渠道和目标的发送速率，并让该目标冷却
+        :return: 是否为频率限制错误
+        """
+        if not is_rate_limit_error(e):
+            return False
+        self.throttled_count += 1
+        now = time.monotonic()
+        target_bucket = self._target_bucket(channel, target, now)
+        for bucket in (self._channels[channel], target_bucket):
+            bucket.refill(now)
+            bucket.scale = max(self.min_scale, bucket.scale / 2)
+        # 只冷却被限流的目标，同一渠道的其他目标只降速，不会因为一个群被限流而全部暂停
+        target_bucket.blocked_until = now + self.cooldown
+        logger.warning(
+            f"QQ消息发送触发频率限制（{channel.value}，{target}），"
+            f"降速并冷却 {self.cooldown} 秒：{str(e)}"
+        )
+        return True
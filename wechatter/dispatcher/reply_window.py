@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from wechatter.models.qq import QQChannel
+
+
+class ReplyWindow:
+    """
+    一条收到的消息对应的被动回复窗口
+    """
+
+    __slots__ = ("msg_id", "key", "received_at", "used_seq")
+
+    def __init__(self, msg_id: str, key: Tuple[QQChannel, str], received_at: float):
+        self.msg_id = msg_id
+        # (发送渠道, 发送目标)
+        self.key = key
+        self.received_at = received_at
+        self.used_seq = 0
+
+
+class ReplyWindowIndex:
+    """
+    QQ 被动回复窗口索引
+
+    QQ 群聊和私聊只能被动回复：每条收到的消息（msg_id）在 ttl 秒内最多可以回复 max_seq 次，
+    每次回复使用递增的 msg_seq。索引按 (发送渠道, 发送目标) 记录未过期的 msg_id，
+    发送时从最新的窗口开始为该目标选出仍然有效的窗口。
+    窗口按收到时间顺序保存在 OrderedDict 和每个目标的双端队列中，过期清理只需从头部弹出。
+    只能在事件循环线程中使用。
+    """
+
+    def __init__(self, ttl: float = 300, max_seq: int = 5):
+        """
+        :param ttl: 被动回复的有效期（秒）
+        :param max_seq: 每个 msg_id 最多可以回复的次数
+        """
+        self.ttl = ttl
+        self.max_seq = max_seq
+        # 每个目标未过期的回复窗口，按收到时间排序
+        self._targets: Dict[Tuple[QQChannel, str], Deque[ReplyWindow]] = {}
+        # 所有未过期的回复窗口，按收到时间排序
+        self._windows: "OrderedDict[str, ReplyWindow]" = OrderedDict()
+
+    def refresh(
+        self, channel: QQChannel, target: str, msg_id: str, now: float = None
+    ) -> None:
+        """
+        收到目标发来的新消息时调用
+        """
+        now = time.time() if now is None else now
+        self._expire(now)
+        if msg_id in self._windows:
+            return
+        key = (channel, target)
+        window = ReplyWindow(msg_id, key, now)
+        self._windows[msg_id] = window
+        windows = self._targets.get(key)
+        if windows is None:
+            windows = self._targets[key] = deque()
+        windows.append(window)
+
+    def acquire(
+        self,
+        channel: QQChannel,
+        target: str,
+        msg_id: Optional[str] = None,
+        now: float = None,
+    ) -> Optional[Tuple[str, int]]:
+        """
+        为一次发送选择回复窗口并占用一个 msg_seq
+        :param msg_id: 指定回复的消息 id，其窗口不可用时从该目标最新的窗口开始查找可用的窗口
+        :return: (msg_id, msg_seq)，没有可用窗口时返回 None
+        """
+        now = time.time() if now is None else now
+        self._expire(now)
+        # 已过期或未记录的 msg_id（例如重启前收到的消息）查不到窗口，退回到该目标的其他窗口
+        window = self._windows.get(msg_id) if msg_id is not None else None
+        if (
+            window is None
+            or window.key != (channel, target)
+            or not self._usable(window, now)
+        ):
+            window = next(
+                (
+                    window
+                    for window in reversed(self._targets.get((channel, target), ()))
+                    if self._usable(window, now)
+                ),
+                None,
+            )
+        if window is None:
+            return None
+        window.used_seq += 1
+        return window.msg_id, window.used_seq
+
+    def remaining(self, channel: QQChannel, target: str, now: float = None) -> int:
+        """
+        获取目标所有未过期窗口剩余的回复次数之和
+        """
+        now = time.time() if now is None else now
+        return sum(
+            self.max_seq - window.used_seq
+            for window in self._targets.get((channel, target), ())
+            if self._usable(window, now)
+        )
+
+    def _usable(self, window: ReplyWindow, now: float) -> bool:
+        return now - window.received_at < self.ttl and window.used_seq < self.max_seq
+
+    def _expire(self, now: float) -> None:
+        while self._windows:
+            msg_id, window = next(iter(self._windows.items()))
+            if now - window.received_at < self.ttl:
+                break
+            del self._windows[msg_id]
+            # 同一目标的窗口也按收到时间排序，过期的窗口在队首
+            windows = self._targets[window.key]
+            windows.popleft()
+            if not windows:
+                del self._targets[window.key]
@@ -0,0 +1,67 @@
+import random
+
+from botpy.errors import (
+    AuthenticationFailedError,
+    ForbiddenError,
+    MethodNotAllowedError,
+    NotFoundError,
+)
+
+from wechatter.dispatcher.rate_limiter import is_rate_limit_error
+from wechatter.models.qq import OutboundMessage
+
+# 重试也不会成功的错误
+PERMANENT_ERRORS = (
+    AuthenticationFailedError,
+    ForbiddenError,
+    MethodNotAllowedError,
+    NotFoundError,
+)
+# botpy 将 400 等错误都映射为 ServerError，只能根据错误信息判断是否为请求本身的问题
+PERMANENT_ERROR_KEYWORDS = ("违规", "去重", "越权", "不存在", "参数错误", "invalid")
+
+
+def is_retryable_error(e: Exception) -> bool:
+    """
+    判断发送失败的异常是否值得重试
+    """
+    if is_rate_limit_error(e):
+        return True
+    if isinstance(e, PERMANENT_ERRORS):
+        return False
+    msg = str(e).lower()
+    return not any(keyword in msg for keyword in PERMANENT_ERROR_KEYWORDS)
+
+
+class RetryPolicy:
+    """
+    QQ 消息发送重试策略：指数退避加随机抖动
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.5,
+    ):
+        """
+        :param max_retries: 最大重试次数
+        :param base_delay: 第一次重试的延迟（秒），之后每次翻倍
+        :param max_delay: 最大延迟（秒）
+        :param jitter: 随机抖动比例，实际延迟在 [delay * (1 - jitter), delay] 之间均匀分布
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def should_retry(self, message: OutboundMessage, e: Exception) -> bool:
+        return message.retry_count < self.max_retries and is_retryable_error(e)
+
+    def delay(self, retry_count: int) -> float:
+        """
+        获取第 retry_count 次重试（从 1 开始）前的等待时间（秒）
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (retry_count - 1))
+        return delay * (1 - self.jitter * random.random())
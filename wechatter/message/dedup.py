@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from wechatter.config import config
+from wechatter.database import BatchWriter, InboundEvent, make_db_session
+from wechatter.utils import DedupCache
+
+_dedup_config = config.get("inbound_dedup") or {}
+
+
+def _write_events(session: Session, events: List[Tuple[str, float]]) -> None:
+    rows = {
+        key: {"key": key, "expire_time": datetime.fromtimestamp(expire_at)}
+        for key, expire_at in events
+    }
+    stmt = insert(InboundEvent)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InboundEvent.key],
+        set_={"expire_time": stmt.excluded.expire_time},
+    )
+    session.execute(stmt, list(rows.values()))
+
+
+# 持久化去重记录，重启后恢复，为 None 时只在内存中去重
+event_writer: Optional[BatchWriter] = None
+if _dedup_config.get("persist", False):
+    event_writer = BatchWriter(
+        "inbound_event",
+        _write_events,
+        flush_interval=_dedup_config.get("flush_interval", 0.5),
+    )
+
+# 收到消息事件的去重缓存，为 None 时不去重
+inbound_dedup: Optional[DedupCache] = None
+if _dedup_config.get("enabled", True):
+    inbound_dedup = DedupCache(
+        ttl=_dedup_config.get("ttl", 600),
+        max_size=_dedup_config.get("max_size", 10000),
+        on_add=(
+            (lambda key, expire_at: event_writer.submit((key, expire_at)))
+            if event_writer is not None
+            else None
+        ),
+    )
+
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def _load_persisted_events() -> None:
+    """
+    首次检查时从数据库加载未过期的去重记录，并清理已过期的记录
+    """
+    global _loaded
+    with _load_lock:
+        if _loaded:
+            return
+        _loaded = True
+        now = datetime.now()
+        try:
+            with make_db_session() as session:
+                session.execute(
+                    delete(InboundEvent).where(InboundEvent.expire_time <= now)
+                )
+                rows = session.execute(
+                    select(InboundEvent.key, InboundEvent.expire_time)
+                    .order_by(InboundEvent.expire_time)
+                    .limit(inbound_dedup.max_size)
+                ).all()
+                session.commit()
+        except Exception as e:
+            logger.error(f"加载消息去重记录失败：{str(e)}")
+            return
+        loaded = inbound_dedup.load((key, t.timestamp()) for key, t in rows)
+        if loaded:
+            logger.info(f"已恢复 {loaded} 条消息去重记录")
+
+
+def is_duplicate_event(key: str, ttl: float = None) -> bool:
+    """
+    判断收到的消息事件是否已处理过，未处理过时记录该事件（线程安全）
+    :param key: 事件标识，如 QQ 消息 id
+    :param ttl: 去重时间窗口（秒），为 None 时使用配置的默认值
+    :return: 是否为重复事件
+    """
+    if inbound_dedup is None:
+        return False
+    if event_writer is not None and not _loaded:
+        _load_persisted_events()
+    return inbound_dedup.seen(key, ttl)
+
+
+def status_lines() -> List[str]:
+    """
+    获取消息去重的状态，用于 /bot 命令，未启用时返回空列表
+    """
+    if inbound_dedup is None:
+        return []
+    return [
+        "🔁 消息去重",
+        f"已记录: {len(inbound_dedup)}条",
+        f"重复消息: {inbound_dedup.hit_count}条",
+        f"新消息: {inbound_dedup.miss_count}条",
+    ]
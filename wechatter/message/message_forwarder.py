@@ -7,6 +7,7 @@ from wechatter.config.parsers import (
     parse_message_forwarding_rule_list,
     parse_official_account_reminder_rule_list,
 )
+from wechatter.models.qq import SendPriority
 from wechatter.models.wechat import (
     GROUP_FORWARDING_MESSAGE_FORMAT,
     PERSON_FORWARDING_MESSAGE_FORMAT,
@@ -28,19 +29,31 @@ def _forwarding_by_rule(message_obj: Message, rule: Dict):
         return
     if to_person_list:
         msg = _construct_forwarding_message(message_obj)
-        sender.mass_send_msg(to_person_list, msg, is_group=False)
+        sender.mass_send_msg(
+            to_person_list, msg, is_group=False, priority=SendPriority.forwarding
+        )
         if message_obj.is_sticky:
             sender.mass_send_msg(
-                to_person_list, message_obj.sticky_url, is_group=False, type="text"
+                to_person_list,
+                message_obj.sticky_url,
+                is_group=False,
+                type="text",
+                priority=SendPriority.forwarding,
             )
         logger.info(f"转发消息：{message_obj.sender_name} -> {to_person_list}")
     to_group_list = rule["to_group_list"]
     if to_group_list:
         msg = _construct_forwarding_message(message_obj)
-        sender.mass_send_msg(to_group_list, msg, is_group=True)
+        sender.mass_send_msg(
+            to_group_list, msg, is_group=True, priority=SendPriority.forwarding
+        )
         if message_obj.is_sticky:
             sender.mass_send_msg(
-                to_person_list, message_obj.sticky_url, is_group=True, type="text"
+                to_person_list,
+                message_obj.sticky_url,
+                is_group=True,
+                type="text",
+                priority=SendPriority.forwarding,
             )
         logger.info(f"转发消息：{message_obj.sender_name} -> {to_group_list}")
 
@@ -161,7 +174,11 @@ class MessageForwarder:
                             message_obj
                         )
                         sender.mass_send_msg(
-                            recipient_list, response, type="text", is_group=is_group
+                            recipient_list,
+                            response,
+                            type="text",
+                            is_group=is_group,
+                            priority=SendPriority.forwarding,
                         )
                     elif self.official_account_reminder_type == "image":
                         response = _construct_official_account_reminder_image(
@@ -175,6 +192,7 @@ class MessageForwarder:
                             response,
                             type="localfile",
                             is_group=is_group,
+                            priority=SendPriority.forwarding,
                         )
 
     def forwarding_to_discord(self, message_obj: Message):
@@ -1,15 +1,15 @@
 import re
 from typing import Dict
 import inspect
-from datetime import datetime
 
 from loguru import logger
 
 from wechatter.bot import BotInfo
 from wechatter.config import config
-from wechatter.database import QuotedResponse, make_db_session, MessageStats, CommandStats
+from wechatter.database import get_quoted_response
 from wechatter.message.message_forwarder import MessageForwarder
-from wechatter.models.wechat import Message, SendTo
+from wechatter.message.stats import record_message
+from wechatter.models.wechat import Message, QuotedResponse, SendTo
 
 message_forwarder = MessageForwarder()
 if config["message_forwarding_enabled"]:
@@ -117,7 +117,10 @@ class MessageHandler:
 
         # 是可引用的命令消息
         if message_obj.quotable_id:
-            quoted_response = _get_quoted_response(message_obj.quotable_id)
+            quoted_response = get_quoted_response(message_obj.quotable_id)
+            if quoted_response is None:
+                logger.warning(f"未找到可引用的命令消息: {message_obj.quotable_id}")
+                return
             quoted_handler = self.quoted_handlers.get(quoted_response.command, None)
             _execute_quoted_handler(
                 quoted_handler, to, message_obj, quoted_response=quoted_response
@@ -158,41 +161,11 @@ class MessageHandler:
                 await _execute_command(cmd_dict, to, message_obj)
             logger.debug("该消息不是命令类型")
 
-        # 更新消息统计
-        with make_db_session() as session:
-            msg_stats = session.query(MessageStats).first()
-            if not msg_stats:
-                msg_stats = MessageStats(
-                    total_messages=0,
-                    command_messages=0,
-                    group_messages=0,
-                    private_messages=0,
-                    last_updated=datetime.now()
-                )
-                session.add(msg_stats)
-            
-            msg_stats.total_messages += 1
-            if message_obj.is_group:
-                msg_stats.group_messages += 1
-            else:
-                msg_stats.private_messages += 1
-            
-            if not cmd_dict["command"] == "None":
-                msg_stats.command_messages += 1
-                # 更新命令统计
-                cmd_stat = session.query(CommandStats).filter_by(command_name=cmd_dict["command"]).first()
-                if not cmd_stat:
-                    cmd_stat = CommandStats(
-                        command_name=cmd_dict["command"],
-                        use_count=0,
-                        last_used=datetime.now()
-                    )
-                    session.add(cmd_stat)
-                cmd_stat.use_count += 1
-                cmd_stat.last_used = datetime.now()
-            
-            msg_stats.last_updated = datetime.now()
-            session.commit()
+        # 更新消息统计（内存计数，定时写入数据库）
+        record_message(
+            message_obj,
+            None if cmd_dict["command"] == "None" else cmd_dict["command"],
+        )
 
     def __parse_command(self, content: str, is_mentioned: bool, is_group: bool) -> Dict:
         """
@@ -290,21 +263,3 @@ def _execute_quoted_handler(
         )
     else:
         logger.warning(f"未找到可引用的命令消息处理函数: {quoted_response.command}")
-
-
-def _get_quoted_response(quotable_id: str) -> QuotedResponse:
-    """
-    获取可引用的命令消息
-    :param quotable_id: 可引用的命令消息id
-    :return: 可引用的命令消息
-    """
-
-    with make_db_session() as session:
-        _quoted_response = (
-            session.query(QuotedResponse)
-            .filter_by(quotable_id=quotable_id)
-            .order_by(QuotedResponse.id.desc())
-            .first()
-        )
-        quoted_response = _quoted_response.to_model()
-    return quoted_response
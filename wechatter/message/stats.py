@@ -0,0 +1,177 @@
+import atexit
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+from loguru import logger
+from sqlalchemy import func, insert, select, update
+
+from wechatter.config import config
+from wechatter.database import CommandStats, MessageStats, make_db_session
+from wechatter.database.rollup import add_hourly_counts, compact_hourly
+from wechatter.models.wechat import Message
+from wechatter.utils import ShardedCounter
+
+_stats_config = config.get("stats") or {}
+FLUSH_INTERVAL = _stats_config.get("flush_interval", 5)
+# 每小时汇总保留的天数，更早的合并为每天的汇总
+HOURLY_RETENTION_DAYS = _stats_config.get("hourly_retention_days", 7)
+
+# 计数的 key：("message", 字段名) 对应 MessageStats 的字段，("command", 命令名) 对应 CommandStats，
+# ("activity", (群 id, 用户 id, 命令名)) 对应活跃度汇总表。
+# 活跃度的 key 不含时间，增量计入写入时所在的小时，误差不超过一个写入间隔
+# 每次写入时取出计数，内存中只保存一个写入间隔内出现的 key
+message_counter = ShardedCounter()
+
+_flush_lock = threading.Lock()
+_last_compacted: datetime = None
+_start_lock = threading.Lock()
+_flush_thread: threading.Thread = None
+_stop = threading.Event()
+
+
+def record_message(message: Message, command: str = None) -> None:
+    """
+    记录一条收到的消息（线程安全，不访问数据库）
+    :param message: 收到的消息
+    :param command: 触发的命令，没有触发命令时为 None
+    """
+    message_counter.add(("message", "total_messages"))
+    message_counter.add(
+        ("message", "group_messages" if message.is_group else "private_messages")
+    )
+    if command is not None:
+        message_counter.add(("message", "command_messages"))
+        message_counter.add(("command", command))
+    group_id = message.group.id if message.is_group else ""
+    message_counter.add(("activity", (group_id, message.person.id, command or "")))
+    _ensure_started()
+
+
+def live_stats() -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    尚未写入数据库的计数
+    :return: MessageStats 各字段的增量，各命令使用次数的增量
+    """
+    message_delta = {}
+    command_delta = {}
+    for (kind, name), value in message_counter.pending().items():
+        if kind == "message":
+            message_delta[name] = value
+        elif kind == "command":
+            command_delta[name] = value
+    return message_delta, command_delta
+
+
+def flush_stats() -> None:
+    """
+    将计数增量写入统计表和活跃度汇总表，写入失败时保留增量，下次重新写入。
+    每天第一次写入时将超过保留期的每小时汇总合并为每天的汇总
+    """
+    global _last_compacted
+    with _flush_lock:
+        now = datetime.now()
+        delta = message_counter.collect()
+        if delta:
+            deltas = {"message": {}, "command": {}, "activity": {}}
+            for (kind, key), value in delta.items():
+                deltas[kind][key] = value
+            message_delta, command_delta, activity_delta = deltas.values()
+            try:
+                with make_db_session() as session:
+                    _apply_message_delta(session, message_delta, now)
+                    for command_name, value in command_delta.items():
+                        _apply_command_delta(session, command_name, value, now)
+                    add_hourly_counts(session, now, activity_delta)
+                    session.commit()
+            except Exception as e:
+                logger.error(f"写入消息统计失败：{str(e)}")
+                message_counter.restore(delta)
+        if _last_compacted is None or _last_compacted.date() != now.date():
+            try:
+                with make_db_session() as session:
+                    compacted = compact_hourly(
+                        session, now - timedelta(days=HOURLY_RETENTION_DAYS)
+                    )
+                    session.commit()
+                _last_compacted = now
+                if compacted:
+                    logger.info(f"已将 {compacted} 条每小时活跃度汇总合并为每天的汇总")
+            except Exception as e:
+                logger.error(f"合并活跃度汇总失败：{str(e)}")
+
+
+def _apply_message_delta(session, message_delta: Dict[str, int], now: datetime) -> None:
+    if not message_delta:
+        return
+    # 消息统计表只有一行
+    stats_id = (
+        session.query(MessageStats.id).order_by(MessageStats.id).limit(1).scalar()
+    )
+    if stats_id is None:
+        session.execute(
+            insert(MessageStats).values(
+                total_messages=message_delta.get("total_messages", 0),
+                command_messages=message_delta.get("command_messages", 0),
+                group_messages=message_delta.get("group_messages", 0),
+                private_messages=message_delta.get("private_messages", 0),
+                last_updated=now,
+            )
+        )
+        return
+    values = {
+        name: getattr(MessageStats, name) + value
+        for name, value in message_delta.items()
+    }
+    session.execute(
+        update(MessageStats)
+        .where(MessageStats.id == stats_id)
+        .values(last_updated=now, **values)
+    )
+
+
+def _apply_command_delta(session, command_name: str, value: int, now: datetime) -> None:
+    # 只更新同名命令的第一行，与逐条更新时一致
+    first_id = (
+        select(func.min(CommandStats.id))
+        .where(CommandStats.command_name == command_name)
+        .scalar_subquery()
+    )
+    result = session.execute(
+        update(CommandStats)
+        .where(CommandStats.id == first_id)
+        .values(use_count=CommandStats.use_count + value, last_used=now)
+    )
+    if result.rowcount == 0:
+        session.execute(
+            insert(CommandStats).values(
+                command_name=command_name, use_count=value, last_used=now
+            )
+        )
+
+
+def _run() -> None:
+    while not _stop.wait(FLUSH_INTERVAL):
+        flush_stats()
+
+
+def _ensure_started() -> None:
+    global _flush_thread
+    if _flush_thread is not None:
+        return
+    with _start_lock:
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(
+                target=_run, name="stats-flusher", daemon=True
+            )
+            _flush_thread.start()
+            # 进程退出前写入剩余计数
+            atexit.register(stop_stats)
+
+
+def stop_stats() -> None:
+    """
+    停止定时写入并写入剩余计数
+    """
+    _stop.set()
+    flush_stats()
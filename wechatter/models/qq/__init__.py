@@ -0,0 +1,3 @@
+from .outbound_message import OutboundMessage, OutboxState, QQChannel, SendPriority
+
+__all__ = ["OutboundMessage", "OutboxState", "QQChannel", "SendPriority"]
@@ -0,0 +1,59 @@
+import enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+from wechatter.models.wechat.group import Group
+
+
+class QQChannel(enum.Enum):
+    """
+    QQ 消息发送渠道枚举类
+    """
+
+    direct = "direct"  # qq频道私信
+    group = "group"  # qq群聊
+    c2c = "c2c"  # qq私聊
+
+
+class SendPriority(enum.Enum):
+    """
+    QQ 消息发送优先级枚举类，按优先级从高到低排列
+    """
+
+    interactive = "interactive"  # 回复用户命令
+    admin = "admin"  # 管理员通知
+    scheduled = "scheduled"  # 定时任务
+    forwarding = "forwarding"  # 消息转发、Webhook 推送
+
+
+class OutboxState(enum.Enum):
+    """
+    QQ 发件箱消息状态枚举类
+    """
+
+    pending = "pending"  # 等待发送
+    blocked = "blocked"  # 没有可用的 msg_id，等待新消息激活
+    in_flight = "in_flight"  # 正在发送
+    sent = "sent"  # 已发送
+    dead = "dead"  # 重试耗尽，放弃发送
+
+
+class OutboundMessage(BaseModel):
+    """
+    QQ 待发送消息类
+    """
+
+    channel: QQChannel
+    # 发送目标：频道私信为 guild_id，群聊为 group_openid，私聊为 user_openid
+    target: str
+    content: str
+    msg_id: Optional[str] = None
+    is_image: bool = False
+    group: Optional[Group] = None
+    retry_count: int = 0
+    priority: SendPriority = SendPriority.interactive
+    # 发件箱记录 id，首次入队时分配
+    outbox_id: Optional[str] = None
+    # 入队时间（time.perf_counter），用于统计发送延迟
+    enqueued_at: float = 0.0
@@ -5,6 +5,7 @@ from functools import cached_property
 from typing import Optional, Tuple
 
 from botpy.message import DirectMessage, GroupMessage, C2CMessage
+from botpy.robot import Robot
 from loguru import logger
 from pydantic import BaseModel, computed_field
 from wechatter.models.wechat.group import Group
@@ -411,6 +412,135 @@ class Message(BaseModel):
             qq_c2cmessage=qq_c2cmessage,
             attachments=attachments,
         )
+
+    @classmethod
+    def from_qq_direct_message(
+            cls,
+            type: MessageType,
+            qq_directmessage: DirectMessage,
+            robot: Optional[Robot] = None,
+    ):
+        """
+        直接从 botpy 的 DirectMessage 创建消息对象，不经过 source 的 JSON 序列化
+        结果与 from_api_direct_message 相同
+        :param type: 消息类型
+        :param qq_directmessage: qq的DirectMessage
+        :param robot: 机器人信息，用作消息接收者
+        :return: 消息对象
+        """
+        # message.author.id没有用，guild_id才有用，用作qq频道私信发送信息的guild_id
+        guild_id = qq_directmessage.guild_id
+        name = qq_directmessage.author.username
+        _person = Person(
+            id=guild_id,
+            name=name,
+            alias="",
+            gender="male",
+            signature="",
+            province="",
+            city="",
+            is_star=False,
+            is_friend=True,
+            is_official_account=_is_official_account(guild_id, name),
+            guild_id=guild_id,
+            msg_id=qq_directmessage.id,
+        )
+        return cls(
+            type=type,
+            person=_person,
+            receiver=_robot_person(robot),
+            content=(qq_directmessage.content or ".").lstrip(),
+            qq_directmessage=qq_directmessage,
+            msg_id=qq_directmessage.id,
+            attachments=qq_directmessage.attachments,
+        )
+
+    @classmethod
+    def from_qq_group_message(
+            cls,
+            type: MessageType,
+            qq_groupmessage: GroupMessage,
+    ):
+        """
+        直接从 botpy 的 GroupMessage 创建消息对象，不经过 source 的 JSON 序列化
+        结果与 from_api_group_at_message 相同
+        :param type: 消息类型
+        :param qq_groupmessage: qq的GroupMessage
+        :return: 消息对象
+        """
+        member_openid = qq_groupmessage.author.member_openid
+        msg_id = qq_groupmessage.id
+        _person = Person(
+            id=member_openid,
+            name="",
+            alias="",
+            gender="male",
+            signature="",
+            province="",
+            city="",
+            is_star=False,
+            is_friend=True,
+            is_official_account=_is_official_account(member_openid, ""),
+            msg_id=msg_id,
+            member_openid=member_openid,
+        )
+        _group = Group(
+            id=qq_groupmessage.group_openid,
+            # qq不支持查看群名，因此暂时把群名设置成群id
+            name=qq_groupmessage.group_openid,
+            admin_id_list=[],
+            member_list=[],
+            msg_id=msg_id,
+        )
+        return cls(
+            type=type,
+            person=_person,
+            group=_group,
+            content=(qq_groupmessage.content or ".").lstrip(),
+            is_mentioned=True,
+            qq_groupmessage=qq_groupmessage,
+            attachments=qq_groupmessage.attachments,
+        )
+
+    @classmethod
+    def from_qq_c2c_message(
+            cls,
+            type: MessageType,
+            qq_c2cmessage: C2CMessage,
+            robot: Optional[Robot] = None,
+    ):
+        """
+        直接从 botpy 的 C2CMessage 创建消息对象，不经过 source 的 JSON 序列化
+        结果与 from_api_c2c_message 相同
+        :param type: 消息类型
+        :param qq_c2cmessage: qq的C2CMessage
+        :param robot: 机器人信息，用作消息接收者
+        :return: 消息对象
+        """
+        user_openid = qq_c2cmessage.author.user_openid
+        _person = Person(
+            id=user_openid,
+            name=user_openid,
+            alias="",
+            gender="male",
+            signature="",
+            province="",
+            city="",
+            is_star=False,
+            is_friend=True,
+            is_official_account=_is_official_account(user_openid, user_openid),
+            msg_id=qq_c2cmessage.id,
+            user_openid=user_openid,
+        )
+        return cls(
+            type=type,
+            person=_person,
+            receiver=_robot_person(robot),
+            content=(qq_c2cmessage.content or ".").lstrip(),
+            qq_c2cmessage=qq_c2cmessage,
+            attachments=qq_c2cmessage.attachments,
+        )
+
     @classmethod
     def from_api_msg(
         cls,
@@ -725,3 +855,25 @@ def from_content_get_quotable_id(content):
         return re.search(pattern, content).group(1)
     except AttributeError:
         return None
+
+
+def _is_official_account(id: Optional[str], name: str) -> bool:
+    # 判断 id 长度：个人用户为65位，公众号为33位（包括@符号）
+    # 暂时通过名字判断是否为央视新闻公众号
+    return len(id or "") == 33 or name == "央视新闻"
+
+
+def _robot_person(robot: Optional[Robot]) -> Optional[Person]:
+    """
+    将机器人信息转换为消息接收者
+    """
+    if robot is None:
+        return None
+    return Person(
+        id=str(robot.id),
+        name=str(robot.name),
+        alias="",
+        gender="unknown",
+        is_star=False,
+        is_friend=False,
+    )
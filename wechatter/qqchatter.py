@@ -70,6 +70,8 @@ def main():
 
     # 初始化数据库
     db.create_tables()
+    db.migrate_tables()
+    db.start_retention()
 
     # 加载游戏
     load_games()
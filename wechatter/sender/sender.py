@@ -1,8 +1,10 @@
 import json
+import os
 import time
 import random
+import uuid
 from functools import singledispatch
-from typing import List, Union
+from typing import List, Tuple, Union
 
 import requests
 import tenacity
@@ -13,9 +15,47 @@ from wechatter.app.routers.upload import upload_image
 from wechatter.commands._commands.qrcode import get_qrcode_saved_path
 from wechatter.config import config
 from wechatter.models import Person
+from wechatter.models.qq import OutboundMessage, QQChannel, SendPriority
 from wechatter.models.wechat import QuotedResponse, SendTo, Group
 from wechatter.sender.quotable import make_quotable
+from wechatter.sender.splitter import split_message
 from wechatter.utils import join_urls, post_request
+from wechatter.utils.text_to_image import text_to_image
+
+
+_split_config = config.get("qq_bot", {}).get("split") or {}
+# QQ 单条消息的最大长度
+QQ_MESSAGE_MAX_LENGTH = _split_config.get("max_length", 2000)
+# 一段文本最多切分的消息条数，超过时转为图片发送，以免耗尽被动回复次数
+QQ_MESSAGE_MAX_CHUNKS = _split_config.get("max_chunks", 3)
+
+
+def _pack_qq_message(message: str, is_image: bool) -> List[Tuple[str, bool]]:
+    """
+    将消息转换为一条或多条 QQ 消息
+    :return: (消息内容, 是否为图片) 列表
+    """
+    if is_image:
+        return [(message, True)]
+    chunks = split_message(message, QQ_MESSAGE_MAX_LENGTH)
+    if len(chunks) <= QQ_MESSAGE_MAX_CHUNKS:
+        return [(chunk, False) for chunk in chunks]
+
+    logger.info(f"消息过长（{len(message)}字，{len(chunks)}段），转为图片发送")
+    image_path = None
+    try:
+        image_path = text_to_image(
+            message, file_name=f"long_text_{uuid.uuid4().hex}.png", num_columns=1, wrap_width=36
+        )
+        image_url = upload_image(image_path)
+        return [(image_url, True)]
+    except Exception as e:
+        logger.error(f"长消息转图片失败，改为分段发送：{str(e)}")
+        return [(chunk, False) for chunk in chunks]
+    finally:
+        # 上传失败时也删除生成的图片，避免每次失败都残留一个文件
+        if image_path is not None and os.path.exists(image_path):
+            os.remove(image_path)
 
 
 # 对retry装饰器重新包装，增加日志输出
@@ -148,6 +188,7 @@ def send_msg(
     is_group: bool = False,
     type: str = "text",
     quoted_response: QuotedResponse = None,
+    priority: SendPriority = SendPriority.interactive,
 ):
     """
     发送消息
@@ -163,6 +204,7 @@ def send_msg(
     :param is_group: 是否为群组（默认值根据 to 的类型而定）
     :param type: 消息类型，可选 text、fileUrl（默认值为 text）
     :param quoted_response: 被引用后的回复消息（默认值为 None）
+    :param priority: QQ 消息发送优先级（默认值为 interactive）
     """
     pass
 
@@ -178,6 +220,7 @@ def _send_msg1(
     platform = "qq",
     person: Person = None,
     group: Group = None,
+    priority: SendPriority = SendPriority.interactive,
 ):
     """
     发送消息
@@ -186,6 +229,7 @@ def _send_msg1(
     :param is_group: 是否为群组（默认为个人，False）
     :param type: 消息类型（text、fileUrl）
     :param quoted_response: 被引用后的回复消息（默认值为 None）
+    :param priority: QQ 消息发送优先级（默认值为 interactive）
     """    
     # 一般只要是引用的消息，message都是url，但是qq机器人需要配置https才可以发送url，
     # 因此如果是引用消息，就可以把它变成二维码，这样就很好的解决问题
@@ -218,6 +262,8 @@ def _send_msg1(
         from wechatter.app.routers.qq_bot import qq_bot_instance
         print("QQ消息发送中...")
         if qq_bot_instance:
+            # 过长的文本切分为多条消息，条数过多时转为图片
+            payloads = _pack_qq_message(message, is_image)
             # 如果要发送给个人就有person
             if person:
                 logger.debug(f"这是person:{person}")
@@ -226,23 +272,26 @@ def _send_msg1(
                 if person.guild_id is not None:
                     guild_id = person.guild_id
                         # 添加到发送队列
-                    qq_bot_instance._direct_message_queue.append((message, guild_id, msg_id, is_image))
-                    logger.info(f"QQ消息已加入qq频道私信队列(_direct_message_queue)，信息是：{message}，guild_id：{guild_id}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                    for content, content_is_image in payloads:
+                        qq_bot_instance.enqueue_message(OutboundMessage(channel=QQChannel.direct, target=guild_id, content=content, msg_id=msg_id, is_image=content_is_image, priority=priority))
+                    logger.info(f"QQ消息已加入qq频道私信队列，信息是：{message}，guild_id：{guild_id}，msg_id：{msg_id}，是否为图片：{is_image}。")
                     
                 # 如果person有user_openid，说明是在qq私信
                 elif person.user_openid is not None:
                     user_openid = person.user_openid
                     # 添加到发送队列
-                    qq_bot_instance._c2c_message_queue.append((message, user_openid, msg_id, is_image))
-                    logger.info(f"QQ消息已加入qq私信队列(_c2c_message_queue)，信息是：{message}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                    for content, content_is_image in payloads:
+                        qq_bot_instance.enqueue_message(OutboundMessage(channel=QQChannel.c2c, target=user_openid, content=content, msg_id=msg_id, is_image=content_is_image, priority=priority))
+                    logger.info(f"QQ消息已加入qq私信队列，信息是：{message}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
                 
             if group:
                 logger.debug(f"这是group:{group}")
                 group_openid = group.id
                 msg_id = group.msg_id
                 # 添加到发送队列
-                qq_bot_instance._group_at_message_queue.append((message, group_openid, msg_id, group, is_image))
-                logger.info(f"QQ消息已加入qq群消息队列(_group_at_message_queue)，信息是：{message}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
+                for content, content_is_image in payloads:
+                    qq_bot_instance.enqueue_message(OutboundMessage(channel=QQChannel.group, target=group_openid, content=content, msg_id=msg_id, group=group, is_image=content_is_image, priority=priority))
+                logger.info(f"QQ消息已加入qq群消息队列，信息是：{message}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
                 
     return
 
@@ -253,6 +302,7 @@ def _send_msg2(
     is_group: bool = True,
     type: str = "text",
     quoted_response: QuotedResponse = None,
+    priority: SendPriority = SendPriority.interactive,
 ):
     """
     发送消息
@@ -261,6 +311,7 @@ def _send_msg2(
     :param is_group: 是否为群组（默认为群组，True）
     :param type: 消息类型（text、fileUrl）
     :param quoted_response: 被引用后的回复消息（默认值为 None）
+    :param priority: QQ 消息发送优先级（默认值为 interactive）
     """
     if not is_group:
         return _send_msg1(
@@ -269,6 +320,7 @@ def _send_msg2(
             is_group=False,
             type=type,
             quoted_response=quoted_response,
+            priority=priority,
         )
 
     if to.g_id and to.g_name:
@@ -278,7 +330,8 @@ def _send_msg2(
             is_group=True,
             type=type,
             quoted_response=quoted_response,
-            group=to.group
+            group=to.group,
+            priority=priority,
         )   
     elif to.person:
         return _send_msg1(
@@ -287,7 +340,8 @@ def _send_msg2(
             is_group=False,
             type=type,
             quoted_response=quoted_response,
-            person=to.person
+            person=to.person,
+            priority=priority,
         )
     else:
         logger.error("发送消息失败，接收者为空")
@@ -361,6 +415,7 @@ def mass_send_msg(
     type: str = "text",
     quoted_response: QuotedResponse = None,
     is_qq_c2c_list: bool = False,
+    priority: SendPriority = SendPriority.scheduled,
 ):
     """
     群发消息，给多个人发送一条消息
@@ -369,6 +424,7 @@ def mass_send_msg(
     :param is_group: 是否为群组
     :param type: 消息类型（text、fileUrl、localfile）
     :param quoted_response: 被引用后的回复消息（默认值为 None）
+    :param priority: QQ 消息发送优先级（默认值为 scheduled）
     """
     global qq_bot_instance  # 声明引用全局变量
 
@@ -406,7 +462,8 @@ def mass_send_msg(
         url_image_path = upload_image(abs_image_path)
         message = url_image_path
 
-
+    # 过长的文本切分为多条消息，条数过多时转为图片
+    payloads = _pack_qq_message(message, is_image)
 
     for name in name_list:
         # 只有qq频道才可以主动发送信息
@@ -417,16 +474,18 @@ def mass_send_msg(
         if not is_group:
             if is_qq_c2c_list:
                 user_openid = name
-                qq_bot_instance._c2c_message_queue.append((message, user_openid, msg_id, is_image))
-                logger.info(f"QQ消息已加入qq私信队列(_c2c_message_queue)，信息是：{message}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                for content, content_is_image in payloads:
+                    qq_bot_instance.enqueue_message(OutboundMessage(channel=QQChannel.c2c, target=user_openid, content=content, msg_id=msg_id, is_image=content_is_image, priority=priority))
+                logger.info(f"QQ消息已加入qq私信队列，信息是：{message}，user_openid：{user_openid}，msg_id：{msg_id}，是否为图片：{is_image}。")
             else:
                 with make_db_session() as session:
                     person = session.query(DbPerson).filter(DbPerson.name == name).first()
                     if person and person.id is not None:
                         guild_id = str(person.id)                  
                         # 添加到发送队列
-                        qq_bot_instance._direct_message_queue.append((message, guild_id, msg_id, is_image))
-                        logger.info(f"QQ消息已加入qq频道私信队列(_direct_message_queue)，信息是：{message}，guild_id：{guild_id}，msg_id：{msg_id}，是否为图片：{is_image}。")
+                        for content, content_is_image in payloads:
+                            qq_bot_instance.enqueue_message(OutboundMessage(channel=QQChannel.direct, target=guild_id, content=content, msg_id=msg_id, is_image=content_is_image, priority=priority))
+                        logger.info(f"QQ消息已加入qq频道私信队列，信息是：{message}，guild_id：{guild_id}，msg_id：{msg_id}，是否为图片：{is_image}。")
         else:
             # 是群，因此name就是群group_openid
             group_openid = name
@@ -436,8 +495,9 @@ def mass_send_msg(
                 member_list=[],
             )
             # 添加到发送队列
-            qq_bot_instance._group_at_message_queue.append((message, group_openid, msg_id, group, is_image))
-            logger.info(f"QQ消息已加入qq群消息队列(_group_at_message_queue)，信息是：{message}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
+            for content, content_is_image in payloads:
+                qq_bot_instance.enqueue_message(OutboundMessage(channel=QQChannel.group, target=group_openid, content=content, msg_id=msg_id, group=group, is_image=content_is_image, priority=priority))
+            logger.info(f"QQ消息已加入qq群消息队列，信息是：{message}，group_openid：{group_openid}，msg_id：{msg_id}，group：{group}，是否为图片：{is_image}。")
             
                 
         
@@ -512,16 +572,28 @@ def mass_send_msg_to_admins(
     admin_qq_c2c_list = config.get("admin_qq_c2c_list")
     if admin_list:
         logger.info(f"发送消息给管理员：{admin_list}")
-        mass_send_msg(admin_list, message, type=type)
+        mass_send_msg(admin_list, message, type=type, priority=SendPriority.admin)
     
     if admin_qq_c2c_list:
         logger.info(f"发送qq私信消息给管理员：{admin_qq_c2c_list}")
-        mass_send_msg(admin_qq_c2c_list, message, type=type, is_qq_c2c_list=True)
+        mass_send_msg(
+            admin_qq_c2c_list,
+            message,
+            type=type,
+            is_qq_c2c_list=True,
+            priority=SendPriority.admin,
+        )
 
     admin_group_list = config.get("admin_group_list")
     if admin_group_list:
         logger.info(f"发送消息给管理员群组：{admin_group_list}")
-        mass_send_msg(admin_group_list, message, is_group=True, type=type)
+        mass_send_msg(
+            admin_group_list,
+            message,
+            is_group=True,
+            type=type,
+            priority=SendPriority.admin,
+        )
 
 
 def mass_send_msg_to_github_webhook_receivers(
@@ -546,6 +618,7 @@ def mass_send_msg_to_github_webhook_receivers(
             message,
             is_group=False,
             type=type,
+            priority=SendPriority.forwarding,
         )
     if person_qq_c2c_list:
         logger.info(f"发送消息给 GitHub Webhook 接收者：{person_qq_c2c_list}")
@@ -555,6 +628,7 @@ def mass_send_msg_to_github_webhook_receivers(
             is_group=False,
             type=type,
             is_qq_c2c_list=True,
+            priority=SendPriority.forwarding,
         )
     if group_list:
         logger.info(f"发送消息给 GitHub Webhook 接收者：{group_list}")
@@ -563,6 +637,7 @@ def mass_send_msg_to_github_webhook_receivers(
             message,
             is_group=True,
             type=type,
+            priority=SendPriority.forwarding,
         )
 
 
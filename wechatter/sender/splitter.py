@@ -0,0 +1,57 @@
+from typing import List
+
+# 按优先级从高到低尝试的切分边界
+SEPARATORS = ("\n\n", "\n")
+
+
+def split_message(message: str, max_length: int) -> List[str]:
+    """
+    将过长的文本切分为不超过 max_length 的若干段
+
+    优先在段落边界切分，其次在行边界切分，单行仍然过长时才按长度硬切分。
+    切分后的小段会被依次装入尽量少的消息中，每条消息不超过 max_length。
+    :param message: 消息内容
+    :param max_length: 每段的最大长度
+    :return: 切分后的消息列表
+    """
+    if len(message) <= max_length:
+        return [message]
+    return _pack(_split(message, max_length, 0), max_length)
+
+
+def _split(text: str, max_length: int, level: int) -> List[str]:
+    """
+    递归切分，返回的每一段都不超过 max_length，段与段之间保留原来的分隔符
+    """
+    if len(text) <= max_length:
+        return [text]
+    if level >= len(SEPARATORS):
+        return [text[i : i + max_length] for i in range(0, len(text), max_length)]
+
+    separator = SEPARATORS[level]
+    parts = text.split(separator)
+    pieces = []
+    for i, part in enumerate(parts):
+        # 分隔符留在前一段的末尾，合并时不会丢失格式
+        if i < len(parts) - 1:
+            part += separator
+        if part:
+            pieces.extend(_split(part, max_length, level + 1))
+    return pieces
+
+
+def _pack(pieces: List[str], max_length: int) -> List[str]:
+    """
+    按顺序将小段装入尽量少的消息
+    """
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if len(current) + len(piece) > max_length:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current:
+        chunks.append(current)
+    # 去掉每条消息末尾多余的分隔符
+    return [chunk.rstrip("\n") for chunk in chunks if chunk.strip()]
@@ -8,6 +8,11 @@ from .unique_list import UniqueList, UniqueListDecoder, UniqueListEncoder
 from .url_codec import url_decode, url_encode
 from .url_joiner import join_urls
 from .threading_util import run_in_thread
+from .worker_pool import ConversationWorkerPool, ShedPolicy
+from .dedup_cache import DedupCache
+from .identity_cache import IdentityCache
+from .lru_cache import LRUCache
+from .sharded_counter import ShardedCounter
 from .download_file import download_file
 from .encode_image import encode_image
 from .extract_text_from_file import extract_text_from_file
@@ -32,6 +37,12 @@ __all__ = [
     "UniqueListEncoder",
     "UniqueListDecoder",
     "run_in_thread",
+    "ConversationWorkerPool",
+    "ShedPolicy",
+    "DedupCache",
+    "IdentityCache",
+    "LRUCache",
+    "ShardedCounter",
     "download_file",
     "encode_image",
     "extract_text_from_file",
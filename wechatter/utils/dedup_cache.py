@@ -0,0 +1,76 @@
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+from wechatter.utils.lru_cache import LRUCache
+
+
+class DedupCache(LRUCache):
+    """
+    有界的时间窗口去重缓存（LRU + TTL）
+
+    记录最近见过的 key 及其过期时间（Unix 时间戳），过期前再次出现的 key 视为重复。
+    超过 max_size 时淘汰最久未出现的 key。过期时间使用墙上时间，便于持久化后在重启时恢复。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 600,
+        max_size: int = 10000,
+        on_add: Optional[Callable[[str, float], None]] = None,
+    ):
+        """
+        :param ttl: 默认的去重时间窗口（秒）
+        :param max_size: 最多保留的 key 数量
+        :param on_add: 记录新 key 时的回调，参数为 key 和过期时间，可用于持久化
+        """
+        super().__init__(max_size)
+        self.ttl = ttl
+        self.on_add = on_add
+
+    def seen(self, key: str, ttl: float = None, now: float = None) -> bool:
+        """
+        判断 key 是否在时间窗口内出现过，未出现过时记录该 key（线程安全）
+        :param key: 事件标识
+        :param ttl: 本条记录的去重时间窗口（秒），为 None 时使用默认值
+        :return: 是否重复
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expire_at = self._lookup(key)
+            if expire_at is not None and expire_at > now:
+                self.hit_count += 1
+                return True
+            self.miss_count += 1
+            expire_at = now + (self.ttl if ttl is None else ttl)
+            self._entries[key] = expire_at
+            self._entries.move_to_end(key)
+            self._evict(now)
+        if self.on_add is not None:
+            self.on_add(key, expire_at)
+        return False
+
+    def load(self, entries: Iterable[Tuple[str, float]], now: float = None) -> int:
+        """
+        加载持久化的记录，跳过已过期的记录
+        :param entries: (key, 过期时间) 列表，按出现时间先后排列
+        :return: 加载的记录数量
+        """
+        now = time.time() if now is None else now
+        loaded = 0
+        with self._lock:
+            for key, expire_at in entries:
+                if expire_at > now and key not in self._entries:
+                    self._entries[key] = expire_at
+                    loaded += 1
+            self._evict(now)
+        return loaded
+
+    def _evict(self, now: float = None) -> None:
+        # 先淘汰最旧的过期记录，仍超出上限时再按 LRU 淘汰
+        now = time.time() if now is None else now
+        while self._entries:
+            key, expire_at = next(iter(self._entries.items()))
+            if expire_at > now and len(self._entries) <= self.max_size:
+                break
+            del self._entries[key]
+            self.evicted_count += 1
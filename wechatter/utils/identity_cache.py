@@ -0,0 +1,31 @@
+from typing import Hashable
+
+from wechatter.utils.lru_cache import LRUCache
+
+
+class IdentityCache(LRUCache):
+    """
+    有界的身份信息缓存（LRU）
+
+    记录每个用户/群组最近一次写入数据库的字段指纹，指纹未变化时不需要再次写入。
+    超过 max_size 时淘汰最久未出现的记录，被淘汰或失效的记录下次出现时会重新写入。
+    数据库中的数据被其他地方修改或写入失败时调用 invalidate 删除记录。
+    """
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__(max_size)
+
+    def changed(self, key: str, fingerprint: Hashable) -> bool:
+        """
+        判断 key 的指纹是否与记录的不同（或没有记录），不同时记录新的指纹（线程安全）
+        :param key: 用户/群组 id
+        :param fingerprint: 需要写入数据库的字段组成的指纹
+        :return: 是否需要写入数据库
+        """
+        with self._lock:
+            if self._lookup(key) == fingerprint:
+                self.hit_count += 1
+                return False
+            self.miss_count += 1
+            self._store(key, fingerprint)
+            return True
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """
+    有界的键值缓存（LRU）
+
+    超过 max_size 时淘汰最久未访问的记录。
+    子类在持有 _lock 时使用 _lookup 和 _store 实现自己的读写规则。
+    """
+
+    def __init__(self, max_size: int = 1000):
+        """
+        :param max_size: 最多保留的记录数量
+        """
+        self.max_size = max_size
+        self.hit_count = 0
+        self.miss_count = 0
+        self.evicted_count = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        读取记录（线程安全）
+        :return: 记录的值，没有记录时返回 None
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.miss_count += 1
+            else:
+                self.hit_count += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        写入记录，已有记录时覆盖（线程安全）
+        """
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> None:
+        """
+        删除记录（线程安全）
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: Hashable) -> Optional[Any]:
+        # 需要持有 _lock，读到的记录移到最近访问的位置
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        # 需要持有 _lock
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted_count += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hit_count + self.miss_count
+        return self.hit_count / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,90 @@
+import threading
+from typing import Dict, Hashable, List, Tuple
+
+
+class _Shard:
+    """
+    单个线程的计数分片
+    """
+
+    def __init__(self):
+        self.counts: Dict[Hashable, int] = {}
+        # 只在汇总取出计数时才会与其他线程竞争
+        self.lock = threading.Lock()
+
+
+class ShardedCounter:
+    """
+    按线程分片的计数器
+
+    每个线程只累加自己的分片，多个线程之间不会互相等待。
+    汇总时取出每个分片中的计数并换上空的分片，内存只保存上次汇总之后出现的 key。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        # (线程, 该线程的分片)，分片只由所属线程累加
+        self._shards: List[Tuple[threading.Thread, _Shard]] = []
+        self._shards_lock = threading.Lock()
+        # 取出后未能保存、放回的计数，下次汇总时一起取出
+        self._restored: Dict[Hashable, int] = {}
+        self._collect_lock = threading.Lock()
+
+    def add(self, key: Hashable, n: int = 1) -> None:
+        """
+        累加计数（线程安全）
+        """
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+        with shard.lock:
+            shard.counts[key] = shard.counts.get(key, 0) + n
+
+    def pending(self) -> Dict[Hashable, int]:
+        """
+        上次汇总之后的计数（不取出）
+        """
+        with self._collect_lock:
+            with self._shards_lock:
+                shards = [shard for _, shard in self._shards]
+            pending = dict(self._restored)
+            for shard in shards:
+                with shard.lock:
+                    counts = dict(shard.counts)
+                _merge(pending, counts)
+            return pending
+
+    def collect(self) -> Dict[Hashable, int]:
+        """
+        取出上次汇总之后的计数，各分片从零重新开始计数
+        """
+        with self._collect_lock:
+            with self._shards_lock:
+                shards = [shard for _, shard in self._shards]
+                # 已结束的线程不会再累加，本次取出后丢弃其分片
+                self._shards = [
+                    (thread, shard)
+                    for thread, shard in self._shards
+                    if thread.is_alive()
+                ]
+            collected = self._restored
+            self._restored = {}
+            for shard in shards:
+                with shard.lock:
+                    counts, shard.counts = shard.counts, {}
+                _merge(collected, counts)
+            return {key: value for key, value in collected.items() if value}
+
+    def restore(self, delta: Dict[Hashable, int]) -> None:
+        """
+        放回取出但未能保存的计数，下次汇总时重新取出
+        """
+        with self._collect_lock:
+            _merge(self._restored, delta)
+
+
+def _merge(target: Dict[Hashable, int], counts: Dict[Hashable, int]) -> None:
+    for key, value in counts.items():
+        target[key] = target.get(key, 0) + value
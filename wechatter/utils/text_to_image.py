@@ -1,22 +1,45 @@
+import textwrap
+
 from PIL import Image, ImageDraw, ImageFont
 
 from wechatter.utils import get_abs_path
 
 
-def text_to_image(data: str) -> str:
+def text_to_image(
+    data: str,
+    file_name: str = "help.png",
+    num_columns: int = 2,
+    wrap_width: int = None,
+) -> str:
+    """
+    将文本绘制为图片
+    :param data: 文本内容
+    :param file_name: 保存在 data/text_image 下的文件名
+    :param num_columns: 列数
+    :param wrap_width: 每行最多字符数，超过时自动换行，为 None 时不换行
+    :return: 图片的绝对路径
+    """
     image_width = 1000  # 图片宽度
     line_height = 30  # 行高
-    num_columns = 2  # 列数
 
     background_color = (255, 255, 255)  # 白色
 
     # 根据换行符(\n)将文本分成几行
     lines = data.split("\n")
+    if wrap_width:
+        lines = [
+            wrapped
+            for line in lines
+            for wrapped in (textwrap.wrap(line, wrap_width) or [""])
+        ]
     num_lines = len(lines)
 
     # 根据行数和行高计算图像高度
     max_lines_per_column = (num_lines + num_columns - 1) // num_columns
     image_height = max_lines_per_column * line_height
+    if wrap_width:
+        # 留出上下边距，避免最后几行被截断
+        image_height += 100
     image = Image.new("RGB", (image_width, image_height), background_color)
 
     # 选择字体和字体大小
@@ -47,6 +70,6 @@ def text_to_image(data: str) -> str:
         y_position = 50  # 重置下一列的y_position
 
     # 保存图像
-    output_image_path = get_abs_path("data/text_image/help.png")
+    output_image_path = get_abs_path(f"data/text_image/{file_name}")
     image.save(output_image_path)
     return output_image_path
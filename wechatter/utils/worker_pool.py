@@ -0,0 +1,254 @@
+import asyncio
+import enum
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from loguru import logger
+
+
+class ShedPolicy(enum.Enum):
+    """
+    工作协程队列已满时的处理策略
+    """
+
+    # 丢弃新到的消息
+    drop_newest = "drop_newest"
+    # 丢弃队列中最早的消息，保证新消息能被处理
+    drop_oldest = "drop_oldest"
+    # 阻塞入队方，最多等待 block_timeout 秒，超时后丢弃新到的消息。
+    # 在事件循环中入队时使用 submit_async，等待期间不会阻塞事件循环
+    block = "block"
+
+
+class _Worker:
+    """
+    单个工作协程的有界队列
+    """
+
+    def __init__(self):
+        self.items: Deque = deque()
+        # 队列中的消息数量加上正在处理的消息数量
+        self.unfinished = 0
+        self.cond = threading.Condition()
+        self.wakeup: asyncio.Event = None
+
+
+class ConversationWorkerPool:
+    """
+    按会话分配的消息处理器
+
+    消息在一个独立的处理线程中处理，该线程运行一个事件循环，循环中的每个工作协程按顺序处理
+    分配给它的消息。会话（群或用户）按 key 固定分配到一个工作协程，保证同一会话的消息按到达顺序处理；
+    不同会话的消息在等待（await）时交替处理，与在网关事件循环中直接处理时相同，
+    命令之间不会在多个线程中并发执行。耗时的命令只会阻塞处理线程，不会阻塞机器人的网关事件循环。
+    每个工作协程的队列长度有上限，队列满时按 shed_policy 丢弃消息。
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable],
+        worker_count: int = 4,
+        queue_size: int = 100,
+        shed_policy: ShedPolicy = ShedPolicy.drop_oldest,
+        block_timeout: float = 1.0,
+        name: str = "message-worker",
+    ):
+        """
+        :param handler: 处理单条消息的协程函数，在处理线程的事件循环中执行
+        :param worker_count: 工作协程数量
+        :param queue_size: 每个工作协程的队列长度上限
+        :param shed_policy: 队列已满时的处理策略
+        :param block_timeout: shed_policy 为 block 时入队的最长等待时间（秒）
+        :param name: 处理线程名称
+        """
+        if worker_count < 1:
+            raise ValueError(f"消息处理协程数量必须大于0：{worker_count}")
+        self.handler = handler
+        self.worker_count = worker_count
+        self.queue_size = queue_size
+        self.shed_policy = shed_policy
+        self.block_timeout = block_timeout
+        self.name = name
+        self.processed_count = 0
+        self.shed_count = 0
+        self._workers: List[_Worker] = [_Worker() for _ in range(worker_count)]
+        # 处理线程及其事件循环
+        self._loop: asyncio.AbstractEventLoop = None
+        self._thread: threading.Thread = None
+        # submit_async 等待入队时按工作协程排队的锁，在入队方的事件循环中使用
+        self._submit_locks: Dict[int, asyncio.Lock] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """
+        启动处理线程，返回时其事件循环已就绪
+        """
+        if self.is_running:
+            return
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(ready,), name=self.name, daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+        logger.info(f"消息处理线程已启动，工作协程数量：{self.worker_count}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止处理线程，未处理的消息将被丢弃
+        """
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def worker_of(self, key: str) -> int:
+        """
+        获取会话所在的工作协程
+        """
+        return hash(key) % self.worker_count
+
+    def submit(self, key: str, item: Any) -> bool:
+        """
+        将消息加入会话对应工作协程的队列（线程安全）。
+        shed_policy 为 block 时可能阻塞调用方，在事件循环中应使用 submit_async
+        :param key: 会话标识，如群 openid 或用户 openid
+        :param item: 交给 handler 处理的消息
+        :return: 消息是否被接受
+        """
+        worker = self._workers[self.worker_of(key)]
+        with worker.cond:
+            if len(worker.items) >= self.queue_size:
+                if self.shed_policy == ShedPolicy.drop_newest:
+                    self._shed(key, "丢弃新消息")
+                    return False
+                if self.shed_policy == ShedPolicy.block:
+                    if not worker.cond.wait_for(
+                        lambda: len(worker.items) < self.queue_size, self.block_timeout
+                    ):
+                        self._shed(key, "等待超时，丢弃新消息")
+                        return False
+                else:
+                    worker.items.popleft()
+                    worker.unfinished -= 1
+                    self._shed(key, "丢弃最早的消息")
+            worker.items.append(item)
+            worker.unfinished += 1
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(worker.wakeup.set)
+        return True
+
+    async def submit_async(self, key: str, item: Any) -> bool:
+        """
+        在事件循环中将消息加入会话对应工作协程的队列。
+        shed_policy 为 block 且队列已满时在线程池中等待，不阻塞事件循环（如机器人的网关心跳）；
+        等待期间同一工作协程后到的消息排在后面，保证同一会话的消息按到达顺序入队
+        :param key: 会话标识，如群 openid 或用户 openid
+        :param item: 交给 handler 处理的消息
+        :return: 消息是否被接受
+        """
+        if self.shed_policy != ShedPolicy.block:
+            return self.submit(key, item)
+        index = self.worker_of(key)
+        lock = self._submit_locks.get(index)
+        if lock is None:
+            # 在第一次使用时创建，绑定到入队方的事件循环
+            lock = self._submit_locks[index] = asyncio.Lock()
+        async with lock:
+            worker = self._workers[index]
+            with worker.cond:
+                full = len(worker.items) >= self.queue_size
+            if not full:
+                return self.submit(key, item)
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.submit, key, item
+            )
+
+    def _shed(self, key: str, action: str) -> None:
+        self.shed_count += 1
+        logger.warning(
+            f"消息处理队列已满（会话 {key}，上限 {self.queue_size}），{action}，"
+            f"累计丢弃 {self.shed_count} 条"
+        )
+
+    def depths(self) -> List[int]:
+        """
+        获取每个工作协程的队列长度
+        """
+        return [len(worker.items) for worker in self._workers]
+
+    def status_lines(self) -> List[str]:
+        """
+        获取消息处理器的状态，用于 /bot 命令
+        """
+        return [
+            "🧵 消息处理",
+            f"工作协程: {self.worker_count}个",
+            f"各协程积压: {self.depths()}",
+            f"已处理: {self.processed_count}条",
+            f"已丢弃: {self.shed_count}条",
+        ]
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        等待所有已入队的消息处理完成
+        :return: 是否在超时前全部处理完成
+        """
+        for worker in self._workers:
+            with worker.cond:
+                if not worker.cond.wait_for(lambda: worker.unfinished == 0, timeout):
+                    return False
+        return True
+
+    def _run(self, ready: threading.Event) -> None:
+        """
+        处理线程入口，所有工作协程在同一个事件循环中运行
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        tasks = []
+        for index, worker in enumerate(self._workers):
+            worker.wakeup = asyncio.Event()
+            tasks.append(loop.create_task(self._consume(worker, index)))
+        self._loop = loop
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            self._loop = None
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    async def _consume(self, worker: _Worker, index: int) -> None:
+        """
+        按顺序处理工作协程队列中的消息
+        """
+        while True:
+            with worker.cond:
+                if worker.items:
+                    item = worker.items.popleft()
+                    worker.cond.notify_all()
+                else:
+                    item = None
+                    worker.wakeup.clear()
+            if item is None:
+                await worker.wakeup.wait()
+                continue
+            try:
+                await self.handler(item)
+                self.processed_count += 1
+            except Exception as e:
+                logger.error(f"消息处理协程 {index} 处理消息失败：{str(e)}")
+            finally:
+                with worker.cond:
+                    worker.unfinished -= 1
+                    worker.cond.notify_all()
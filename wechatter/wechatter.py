@@ -30,6 +30,8 @@ def main():
     check_and_create_folder("data/screenshots")
 
     db.create_tables()
+    db.migrate_tables()
+    db.start_retention()
     load_games()
 
     # 启动uvicorn